@@ -1,19 +1,135 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
+from decimal import Decimal
 
 
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
+    # Optional read replica; reads stick to the primary for a while after a write
+    READ_DATABASE_URL: Optional[str] = None
+    REPLICA_STICKY_SECONDS: float = 5.0
+    REPLICA_RETRY_SECONDS: float = 30.0
+    # Server-side prepared statements after N executions (postgresql+psycopg driver only)
+    DB_PREPARE_THRESHOLD: Optional[int] = 5
+    # Connection pool per engine and process; a negative overflow means unbounded
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # Postgres only: hash partitions for expenses, plus companies given their own partition
+    EXPENSE_HASH_PARTITIONS: int = 0
+    EXPENSE_DEDICATED_PARTITIONS: list[int] = []
+    # Expenses reviewed this many months ago move to expenses_archive, in batches
+    EXPENSE_ARCHIVE_AFTER_MONTHS: int = 12
+    EXPENSE_ARCHIVE_BATCH_SIZE: int = 1000
+    # Over-budget submissions: "flag" keeps them with an over_budget violation, "reject" refuses them
+    BUDGET_ENFORCEMENT: str = "flag"
+    BUDGET_CACHE_TTL_SECONDS: float = 60.0
+    # Recurring expense templates processed per transaction (scripts/generate_recurring_expenses.py)
+    RECURRING_BATCH_SIZE: int = 5000
+    # Incremental Parquet export for analytics (scripts/export_analytics.py, needs pyarrow)
+    EXPORT_DIR: str = "exports"
+    EXPORT_CHUNK_SIZE: int = 10000  # Rows per read and per Parquet row group
+    EXPORT_SETTLE_SECONDS: int = 60  # Changes newer than this wait for the next run
+    # How long each process keeps a company's compiled approval rules
+    APPROVAL_POLICY_TTL_SECONDS: float = 60.0
+    # Policy checks: per-expense limits by category, categories flagged when submitted
+    # on a weekend, and how close two submissions must be to count as duplicates
+    POLICY_CATEGORY_LIMITS: dict[str, Decimal] = {}
+    POLICY_WEEKEND_CATEGORIES: list[str] = ["meals", "office", "equipment", "software", "other"]
+    POLICY_DUPLICATE_WINDOW_HOURS: float = 72.0
+    POLICY_DUPLICATE_AMOUNT_TOLERANCE: Decimal = Decimal("0.01")  # Relative difference
+    # Pre-rendered monthly reports (scripts/generate_reports.py)
+    REPORTS_DIR: str = "reports"
+    REPORT_TOP_SPENDERS: int = 10
+    # Deleted companies and users are purged in the background, this many rows per transaction
+    OFFBOARDING_BATCH_SIZE: int = 1000
+    # Each process's offboarding worker also checks for jobs queued elsewhere this often,
+    # and waits this long on shutdown for the batch in progress
+    OFFBOARDING_POLL_SECONDS: float = 30.0
+    OFFBOARDING_STOP_TIMEOUT_SECONDS: float = 10.0
     
     # JWT
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
+    # RS256/ES256 signing: PEM text or a path to a PEM file (public key is published as JWKS)
+    JWT_PRIVATE_KEY: Optional[str] = None
+    JWT_PUBLIC_KEY: Optional[str] = None
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+    
+    # Password hashing: the first scheme hashes new passwords, the others are still
+    # accepted and rehashed on login. argon2 needs the argon2-cffi package.
+    # Pick costs with scripts/calibrate_password_hash.py
+    PASSWORD_SCHEMES: list[str] = ["bcrypt"]
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 4
+    # How often each process reloads, in a background thread, revocations made by other workers
+    TOKEN_REVOCATION_REFRESH_SECONDS: float = 30.0
     
     # API
     API_V1_PREFIX: str = "/api/v1"
     PROJECT_NAME: str = "ExesMan API"
+    BATCH_GET_MAX_IDS: int = 100  # ids per batch read (POST /users/batch-get, POST /expenses/batch-get)
+    
+    # Production server (python -m api.server); 0 workers = one per available CPU
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0
+    SERVER_KEEPALIVE_SECONDS: int = 5
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: int = 30  # Time in-flight requests get to finish on shutdown
+    
+    # Rate limiting (token buckets, quotas are requests per minute per route)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # "memory" or "redis"
+    RATE_LIMIT_REDIS_URL: Optional[str] = None
+    RATE_LIMIT_ROLE_QUOTAS: dict[str, int] = {"admin": 600, "manager": 300, "employee": 120}
+    RATE_LIMIT_COMPANY_QUOTA: int = 3000
+    RATE_LIMIT_ANONYMOUS_QUOTA: int = 60
+    
+    # Load shedding: adaptive per-worker limit on in-flight requests. Route prefixes
+    # ("METHOD /path", ids shown as {id}) pick which requests are refused first
+    LOAD_SHEDDING_ENABLED: bool = True
+    CONCURRENCY_LIMIT_INITIAL: int = 32
+    CONCURRENCY_LIMIT_MIN: int = 4
+    CONCURRENCY_LIMIT_MAX: int = 256
+    CONCURRENCY_LATENCY_TOLERANCE: float = 2.0  # Slower than this x the route's baseline = congestion
+    LOAD_SHEDDING_RETRY_AFTER_SECONDS: int = 1
+    LOAD_SHEDDING_LOW_PRIORITY_ROUTES: list[str] = [
+        "GET /api/reports/", "GET /api/expenses/stats", "GET /api/expenses/violations",
+    ]
+    LOAD_SHEDDING_HIGH_PRIORITY_ROUTES: list[str] = [
+        "POST /api/auth/login", "POST /api/auth/refresh", "PATCH /api/expenses/{id}/status",
+    ]
+    # Statement timeouts in ms per route key (as above), else STATEMENT_TIMEOUT_MS; 0 = none.
+    # GET and HEAD requests to routes with a timeout also stop their queries when the client disconnects
+    STATEMENT_TIMEOUT_MS: int = 0
+    ROUTE_STATEMENT_TIMEOUTS_MS: dict[str, int] = {
+        "GET /api/expenses/": 10000, "GET /api/expenses/stats": 10000, "GET /api/expenses/violations": 10000,
+    }
+    CANCEL_QUERIES_ON_DISCONNECT: bool = True
+    # /health reports not ready once this share of the primary pool is checked out
+    READINESS_POOL_SATURATION: float = 1.0
+    
+    # JSON access and audit logs, written by a background thread per file (empty LOG_DIR
+    # disables them). Records are dropped, never waited for, once LOG_QUEUE_SIZE are queued
+    LOG_DIR: str = "logs"
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_BATCH_SIZE: int = 500  # Records per write
+    LOG_MAX_BYTES: int = 100 * 1024 * 1024
+    LOG_ROTATE_HOURS: float = 24.0  # 0 = rotate by size only
+    LOG_BACKUP_COUNT: int = 7
+    # Share of successful requests written to the access log; 4xx, 5xx and slow requests always are
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0
+    ACCESS_LOG_SLOW_MS: float = 1000.0
+    
+    # Response compression, in server preference order; br and zstd are used only
+    # when the brotli / zstandard packages are installed
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # bytes
+    COMPRESSION_ENCODINGS: list[str] = ["zstd", "br", "gzip"]
     
     class Config:
         env_file = ".env"
@@ -25,4 +141,11 @@ def get_settings() -> Settings:
     return Settings()
 
 
-settings = get_settings()
+class _LazySettings:
+    """Stand-in for Settings that reads the environment on first attribute access"""
+    
+    def __getattr__(self, name):
+        return getattr(get_settings(), name)
+
+
+settings = _LazySettings()
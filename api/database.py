@@ -1,18 +1,390 @@
-from sqlalchemy import create_engine
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Optional
+from fastapi import Request, Response
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session, with_loader_criteria
+from sqlalchemy.pool import QueuePool
 from .config import settings
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _engine_options(url: str) -> dict:
+    """Pool sizing and driver-specific engine options"""
+    url = make_url(url)
+    options = {}
+    # In-memory SQLite keeps one connection per thread instead of a sized pool
+    if url.get_backend_name() != "sqlite" or url.database not in (None, "", ":memory:"):
+        options.update(pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW)
+    if url.get_driver_name() == "psycopg":
+        # psycopg 3 prepares repeated statements server-side; psycopg2 cannot
+        options["connect_args"] = {"prepare_threshold": settings.DB_PREPARE_THRESHOLD}
+    return options
+
+
+@lru_cache()
+def get_engine() -> Engine:
+    """Primary engine, created on first use (importing the DBAPI driver is not free)"""
+    return create_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL))
+
+
+@lru_cache()
+def get_read_engine() -> Optional[Engine]:
+    """Optional replica for read-only handlers"""
+    if not settings.READ_DATABASE_URL:
+        return None
+    return create_engine(
+        settings.READ_DATABASE_URL, pool_pre_ping=True, **_engine_options(settings.READ_DATABASE_URL)
+    )
+
+
+def __getattr__(name):
+    # Keep `from api.database import engine` working without creating it at import time
+    if name == "engine":
+        return get_engine()
+    if name == "read_engine":
+        return get_read_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class _LazySessionmaker(sessionmaker):
+    """sessionmaker that binds to the primary engine when the first session is made"""
+    
+    def __call__(self, **local_kw):
+        if "bind" not in local_kw and self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+
+# Objects stay loaded after commit: handlers return what they wrote without a refresh
+# SELECT (server-generated values come back through INSERT/UPDATE ... RETURNING)
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False, expire_on_commit=False)
+# Replica sessions are bound to a connection checked out per request
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+# Commit timestamp handed to clients so their next reads can stick to the primary
+LAST_WRITE_COOKIE = "last_write"
+LAST_WRITE_HEADER = "X-Last-Write"
+
+logger = logging.getLogger(__name__)
+_replica_down_until = 0.0
 
 Base = declarative_base()
 
+# SQL statements run for the current request ([count]), set by the access log middleware
+request_sql_count: ContextVar[Optional[list]] = ContextVar("request_sql_count", default=None)
+# Statement timeout and cancellation of the current request, set by the query guard middleware
+request_query_guard: ContextVar[Optional["QueryGuard"]] = ContextVar("request_query_guard", default=None)
+
+# SQLite progress handler granularity, in virtual machine instructions
+SQLITE_PROGRESS_STEPS = 10000
+
+
+class TenantScoped:
+    """Mixin for models whose rows belong to exactly one company (via company_id)"""
+
+
+class SoftDeletable:
+    """Mixin for models that are hidden (not removed) on delete; they set deleted_at"""
+
+
+class RequestTenant:
+    """Company a request is scoped to, shared by every session the request opens"""
+    __slots__ = ("company_id",)
+
+    def __init__(self):
+        self.company_id: Optional[int] = None
+
+
+def request_tenant(request: Request) -> RequestTenant:
+    tenant = getattr(request.state, "tenant", None)
+    if tenant is None:
+        tenant = request.state.tenant = RequestTenant()
+    return tenant
+
+
+def set_tenant(db: Session, company_id: Optional[int]) -> None:
+    """Scope every ORM query on this session (and the other sessions of its request) to one company"""
+    db.info["tenant_id"] = company_id
+    if "request_tenant" in db.info:
+        db.info["request_tenant"].company_id = company_id
+
+
+class QueryCancelled(Exception):
+    """Raised instead of running a statement for a request whose client went away"""
+
+
+class QueryGuard:
+    """Statement timeout and cancellation for one request's queries
+
+    PostgreSQL enforces the timeout itself (SET LOCAL statement_timeout, once per
+    transaction) and cancel() sends a cancel request for the statement in flight.
+    SQLite checks the guard from a progress handler and interrupts the statement.
+    """
+
+    def __init__(self, timeout_ms: int = 0):
+        self.timeout_ms = timeout_ms
+        self.cancelled = False
+        self.timed_out = False
+        self._deadline: Optional[float] = None
+        self._executing = None  # DBAPI connection running a statement for this request
+        self._lock = threading.Lock()
+
+    def statement_started(self, dbapi_connection) -> None:
+        if self.cancelled:
+            raise QueryCancelled("Client disconnected")
+        with self._lock:
+            self._executing = dbapi_connection
+        if self.timeout_ms:
+            self._deadline = time.monotonic() + self.timeout_ms / 1000
+
+    def statement_finished(self) -> None:
+        # Under the lock: cancel() must never reach a connection already back in the pool
+        with self._lock:
+            self._executing = None
+        self._deadline = None
+
+    def should_interrupt(self) -> bool:
+        """Polled by the SQLite progress handler"""
+        if self.cancelled:
+            return True
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            self.timed_out = True
+            return True
+        return False
+
+    def cancel(self) -> None:
+        """Stop the request's queries (blocking: psycopg sends the cancel over a new socket)"""
+        self.cancelled = True
+        with self._lock:
+            if self._executing is not None and hasattr(self._executing, "cancel"):
+                self._executing.cancel()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_request_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = request_sql_count.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _guard_request_statement(conn, cursor, statement, parameters, context, executemany):
+    guard = request_query_guard.get()
+    if guard is None:
+        return
+    if guard.timeout_ms and conn.dialect.name == "postgresql" and conn.info.get("statement_timeout") != guard.timeout_ms:
+        # LOCAL: the pooled connection returns to the server default when the transaction ends
+        cursor.execute(f"SET LOCAL statement_timeout = {int(guard.timeout_ms)}")
+        conn.info["statement_timeout"] = guard.timeout_ms
+    guard.statement_started(conn.connection.dbapi_connection)
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _release_request_statement(conn, cursor, statement, parameters, context, executemany):
+    guard = request_query_guard.get()
+    if guard is not None:
+        guard.statement_finished()
+
 
-def get_db():
+@event.listens_for(Engine, "handle_error")
+def _fail_request_statement(exception_context):
+    guard = request_query_guard.get()
+    if guard is None:
+        return
+    guard.statement_finished()
+    # PostgreSQL reports its own timeout as query_canceled (57014)
+    if getattr(exception_context.original_exception, "pgcode", None) == "57014" and not guard.cancelled:
+        guard.timed_out = True
+
+
+@event.listens_for(Engine, "begin")
+def _forget_statement_timeout(conn):
+    conn.info.pop("statement_timeout", None)
+
+
+def _sqlite_progress() -> int:
+    guard = request_query_guard.get()
+    return 1 if guard is not None and guard.should_interrupt() else 0
+
+
+@event.listens_for(Engine, "connect")
+def _install_sqlite_progress_handler(dbapi_connection, connection_record):
+    if hasattr(dbapi_connection, "set_progress_handler"):
+        dbapi_connection.set_progress_handler(_sqlite_progress, SQLITE_PROGRESS_STEPS)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _apply_tenant_scope(execute_state):
+    """Add a company_id predicate for TenantScoped models to every ORM statement"""
+    if not (execute_state.is_select or execute_state.is_update or execute_state.is_delete):
+        return
+    if execute_state.is_column_load or execute_state.is_relationship_load:
+        return
+    # Background jobs and cross-tenant admin tooling opt out explicitly
+    if execute_state.execution_options.get("all_tenants", False):
+        return
+    
+    # Only sessions scoped explicitly: set_tenant, or opened by get_db/get_read_db for a
+    # request whose caller is authenticated. Background jobs open their own and opt in.
+    info = execute_state.session.info
+    tenant_id = info["tenant_id"] if "tenant_id" in info else getattr(info.get("request_tenant"), "company_id", None)
+    if tenant_id is None:
+        return
+    
+    execute_state.statement = execute_state.statement.options(*(
+        with_loader_criteria(
+            model,
+            lambda cls: cls.company_id == tenant_id,
+            include_aliases=True,
+        )
+        for model in TenantScoped.__subclasses__()
+    ))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _hide_soft_deleted(execute_state):
+    """Leave rows with deleted_at set out of every ORM statement, relationship loads included"""
+    if not (execute_state.is_select or execute_state.is_update or execute_state.is_delete):
+        return
+    if execute_state.is_column_load:
+        return
+    # Restores, audits and uniqueness checks opt in explicitly
+    if execute_state.execution_options.get("include_deleted", False):
+        return
+    
+    execute_state.statement = execute_state.statement.options(*(
+        with_loader_criteria(model, lambda cls: cls.deleted_at.is_(None), include_aliases=True)
+        for model in SoftDeletable.__subclasses__()
+    ))
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _mark_flush_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _mark_statement_write(execute_state):
+    if execute_state.is_insert or execute_state.is_update or execute_state.is_delete:
+        execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _stamp_last_write(session):
+    """Tell the client when it last wrote so its next reads avoid a lagging replica"""
+    response = session.info.get("response")
+    if not session.info.pop("wrote", False) or response is None:
+        return
+    
+    stamp = f"{time.time():.3f}"
+    response.headers[LAST_WRITE_HEADER] = stamp
+    response.set_cookie(
+        LAST_WRITE_COOKIE,
+        stamp,
+        max_age=max(1, int(settings.REPLICA_STICKY_SECONDS)),
+        httponly=True,
+        samesite="lax",
+    )
+
+
+def _wrote_recently(request: Request) -> bool:
+    stamp = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE)
+    if not stamp:
+        return False
+    try:
+        return time.time() - float(stamp) < settings.REPLICA_STICKY_SECONDS
+    except ValueError:
+        return False
+
+
+def _replica_connection(request: Request):
+    """Check out a replica connection, or None when reads should go to the primary"""
+    global _replica_down_until
+    
+    read_engine = get_read_engine()
+    if read_engine is None or _wrote_recently(request) or time.monotonic() < _replica_down_until:
+        return None
+    
+    try:
+        return read_engine.connect()
+    except DBAPIError:
+        logger.warning("Read replica unavailable, routing reads to the primary", exc_info=True)
+        _replica_down_until = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+        return None
+
+
+def warm_up_engines() -> None:
+    """Create the engines and open a pooled connection before traffic arrives"""
+    for db_engine in (get_engine(), get_read_engine()):
+        if db_engine is None:
+            continue
+        try:
+            with db_engine.connect():
+                pass
+        except DBAPIError:
+            logger.warning("Could not connect to %s during warm-up", db_engine.url, exc_info=True)
+
+
+def dispose_engines() -> None:
+    """Close pooled connections"""
+    for db_engine in (get_engine(), get_read_engine()):
+        if db_engine is not None:
+            db_engine.dispose()
+
+
+def pool_usage(db_engine: Engine) -> dict:
+    """Checked-out connections and capacity of an engine's pool (capacity is None when unbounded)"""
+    pool = db_engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"checked_out": None, "capacity": None}
+    # Engines are built with DB_MAX_OVERFLOW (_engine_options); negative means the pool never blocks
+    capacity = pool.size() + settings.DB_MAX_OVERFLOW if settings.DB_MAX_OVERFLOW >= 0 else None
+    return {"checked_out": pool.checkedout(), "capacity": capacity}
+
+
+def _dispose_inherited_pools() -> None:
+    """Drop pooled connections a forked worker inherited from its parent
+
+    close=False leaves the parent's sockets alone; the child opens its own on first use.
+    """
+    for factory in (get_engine, get_read_engine):
+        if factory.cache_info().currsize:
+            db_engine = factory()
+            if db_engine is not None:
+                db_engine.dispose(close=False)
+
+
+# Pre-forking servers (gunicorn --preload, ...) may fork after the parent used an engine
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_inherited_pools)
+
+
+def get_db(request: Request, response: Response):
     """Dependency for getting database session"""
     db = SessionLocal()
+    db.info["response"] = response
+    db.info["request_tenant"] = request_tenant(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_read_db(request: Request):
+    """Dependency for read-only handlers: a replica session, falling back to the primary"""
+    connection = _replica_connection(request)
+    db = ReadSessionLocal(bind=connection) if connection is not None else SessionLocal()
+    db.info["request_tenant"] = request_tenant(request)
     try:
         yield db
     finally:
         db.close()
+        if connection is not None:
+            connection.close()
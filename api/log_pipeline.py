@@ -0,0 +1,217 @@
+"""
+Non-blocking JSON logging for access and audit logs
+
+Request handlers only put a record on a bounded in-memory queue (QueueHandler); a
+writer thread per log file formats records as JSON lines and writes whatever has
+queued up in one write, rotating the file by size and age. When the queue is full
+(the disk is slower than the traffic) records are dropped and counted, so logging
+never blocks a request.
+
+Several worker processes may share a file: writes are appends, and a worker that
+finds the file already rotated by another one reopens it instead of rotating again.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler
+from typing import Optional
+from api.config import settings
+
+access_logger = logging.getLogger("api.access")
+audit_logger = logging.getLogger("api.audit")
+
+_STOP = object()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and the record's fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of blocking"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the writer thread; only resolve what cannot wait
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchingFileWriter(threading.Thread):
+    """Writer thread: drains the queue in batches and rotates the file by size and age"""
+
+    def __init__(
+        self,
+        log_queue: queue.Queue,
+        path: str,
+        batch_size: int,
+        max_bytes: int,
+        backup_count: int,
+        rotate_seconds: float,
+    ):
+        super().__init__(name=f"log-writer:{os.path.basename(path)}", daemon=True)
+        self.queue = log_queue
+        self.path = path
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_seconds = rotate_seconds
+        self.formatter = JsonFormatter()
+        self.written = 0
+        self._stream = None
+        self._rotate_at = 0.0
+
+    def _open(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._stream = open(self.path, "a", encoding="utf-8")
+        self._rotate_at = time.time() + self.rotate_seconds if self.rotate_seconds > 0 else float("inf")
+
+    def _rotated_elsewhere(self) -> bool:
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self._stream.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def _maybe_rotate(self) -> None:
+        size = self._stream.tell()
+        if size == 0 or (size < self.max_bytes and time.time() < self._rotate_at):
+            return
+        rotated_elsewhere = self._rotated_elsewhere()
+        self._stream.close()
+        if not rotated_elsewhere:
+            if self.backup_count > 0:
+                for index in range(self.backup_count - 1, 0, -1):
+                    older = f"{self.path}.{index}"
+                    if os.path.exists(older):
+                        os.replace(older, f"{self.path}.{index + 1}")
+                os.replace(self.path, f"{self.path}.1")
+            else:
+                os.truncate(self.path, 0)
+        self._open()
+
+    def _write(self, batch: list) -> None:
+        lines = []
+        for record in batch:
+            try:
+                lines.append(self.formatter.format(record))
+            except Exception:
+                pass  # One unserializable record must not cost the rest of the batch
+        if lines:
+            self._stream.write("\n".join(lines) + "\n")
+            self._stream.flush()
+            self.written += len(lines)
+
+    def run(self) -> None:
+        self._open()
+        stopping = False
+        while not stopping:
+            try:
+                record = self.queue.get(timeout=1.0)
+            except queue.Empty:
+                self._maybe_rotate()
+                continue
+            batch = []
+            while True:
+                if record is _STOP:
+                    stopping = True
+                else:
+                    batch.append(record)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._write(batch)
+            self._maybe_rotate()
+        self._stream.close()
+
+
+class LogPipeline:
+    """A logger's queue, queue handler and writer thread"""
+
+    def __init__(self, logger: logging.Logger, path: str):
+        self.logger = logger
+        self.queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        self.handler = DroppingQueueHandler(self.queue)
+        self.writer = BatchingFileWriter(
+            self.queue,
+            path,
+            batch_size=settings.LOG_BATCH_SIZE,
+            max_bytes=settings.LOG_MAX_BYTES,
+            backup_count=settings.LOG_BACKUP_COUNT,
+            rotate_seconds=settings.LOG_ROTATE_HOURS * 3600,
+        )
+
+    def start(self) -> None:
+        self.writer.start()
+        self.logger.addHandler(self.handler)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Detach the handler and let the writer flush what is queued"""
+        self.logger.removeHandler(self.handler)
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self.writer.join(timeout)
+
+    def stats(self) -> dict:
+        return {"queued": self.queue.qsize(), "written": self.writer.written, "dropped": self.handler.dropped}
+
+
+_pipelines: list[LogPipeline] = []
+
+
+def start_logging() -> None:
+    """Start the access and audit log writers of this process (app lifespan)"""
+    if _pipelines or not settings.LOG_DIR:
+        return
+    for logger, filename in ((access_logger, "access.log"), (audit_logger, "audit.log")):
+        logger.setLevel(logging.INFO)
+        # Kept out of the console: these go to their own files only
+        logger.propagate = False
+        pipeline = LogPipeline(logger, os.path.join(settings.LOG_DIR, filename))
+        pipeline.start()
+        _pipelines.append(pipeline)
+
+
+def stop_logging() -> None:
+    while _pipelines:
+        _pipelines.pop().stop()
+
+
+def logging_stats() -> dict:
+    return {pipeline.logger.name: pipeline.stats() for pipeline in _pipelines}
+
+
+def audit(event: str, actor_id: Optional[int], company_id: Optional[int], **fields) -> None:
+    """Record a security-relevant change; audit records are never sampled"""
+    audit_logger.info(event, extra={"fields": {"actor_id": actor_id, "company_id": company_id, **fields}})
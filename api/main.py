@@ -1,12 +1,64 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm.exc import StaleDataError
 from api.config import settings
+from api.database import warm_up_engines, dispose_engines, get_engine, pool_usage, request_query_guard, QueryCancelled
+from api.log_pipeline import start_logging, stop_logging, logging_stats
+from api.middleware import (
+    RateLimitMiddleware, CompressionMiddleware, LoadSheddingMiddleware, AccessLogMiddleware, QueryGuardMiddleware
+)
 from api.routers.auth import router as auth_router
 from api.routers.companies import router as companies_router
 from api.routers.users import router as users_router
 from api.routers.expenses import router as expenses_router
+from api.routers.approval_rules import router as approval_rules_router
+from api.routers.reports import router as reports_router
+from api.routers.offboarding import router as offboarding_router
+from api.routers.budgets import router as budgets_router
+from api.routers.recurring_expenses import router as recurring_expenses_router
+from api.services.offboarding import start_offboarding_worker, stop_offboarding_worker
+from api.utils.auth import warm_up_auth, start_revocation_refresh, stop_revocation_refresh
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Set here rather than in FastAPI(), which would load the settings at import
+    app.title = settings.PROJECT_NAME
+    # Heavy dependencies load lazily; warm them here instead of on the first request
+    await run_in_threadpool(warm_up_engines)
+    await run_in_threadpool(warm_up_auth)
+    start_revocation_refresh()
+    # Purges of deleted companies and users run here, not in the requests that queue them
+    start_offboarding_worker()
+    # Log writer threads are per process, so each worker starts its own
+    start_logging()
+    yield
+    stop_offboarding_worker()
+    stop_revocation_refresh()
+    dispose_engines()
+    stop_logging()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Statement timeouts and cancellation on disconnect, innermost: it owns receive for read requests
+app.add_middleware(QueryGuardMiddleware)
+
+# Rate limiting sits inside CORS so 429 responses still carry CORS headers
+app.add_middleware(RateLimitMiddleware)
 
-app = FastAPI(title=settings.PROJECT_NAME)
+# Compression wraps the app and the rate limiter; CORS stays outermost
+app.add_middleware(CompressionMiddleware)
+
+# Load shedding refuses excess requests before they reach compression or rate limiting
+app.add_middleware(LoadSheddingMiddleware)
+
+# Access log outside load shedding, so refused requests are logged too
+app.add_middleware(AccessLogMiddleware)
 
 # CORS configuration
 app.add_middleware(
@@ -15,6 +67,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 # FIX: Explicitly set prefix to "/api" to match the frontend requests (e.g., /api/auth/login)
@@ -22,6 +75,36 @@ app.include_router(auth_router, prefix="/api")
 app.include_router(companies_router, prefix="/api")
 app.include_router(users_router, prefix="/api")
 app.include_router(expenses_router, prefix="/api")
+app.include_router(approval_rules_router, prefix="/api")
+app.include_router(reports_router, prefix="/api")
+app.include_router(offboarding_router, prefix="/api")
+app.include_router(budgets_router, prefix="/api")
+app.include_router(recurring_expenses_router, prefix="/api")
+
+@app.exception_handler(StaleDataError)
+async def stale_data_handler(request: Request, exc: StaleDataError):
+    """A version-checked flush found the row changed by a concurrent request"""
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={"detail": "The resource was modified concurrently; reload it and retry"},
+    )
+
+
+@app.exception_handler(OperationalError)
+@app.exception_handler(QueryCancelled)
+async def query_guard_handler(request: Request, exc: Exception):
+    """A statement hit the route's timeout, or was cancelled because the client left"""
+    guard = request_query_guard.get()
+    if guard is not None and guard.cancelled:
+        # Nobody reads it; the status (nginx's "client closed request") is for the access log
+        return JSONResponse(status_code=499, content={"detail": "Client closed request"})
+    if guard is not None and guard.timed_out:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "The query took too long; narrow the filters and retry"},
+        )
+    raise exc
+
 
 @app.get("/")
 async def root():
@@ -29,8 +112,23 @@ async def root():
 
 
 @app.get("/health")
-async def health_check():
-    return {"status": "healthy"}
+async def health_check(request: Request, response: Response):
+    """Readiness probe: 503 while the concurrency limit or the database pool is saturated"""
+    limiter = request.state.concurrency_limiter
+    pool = pool_usage(get_engine())
+    pool_saturated = pool["capacity"] is not None and (
+        pool["checked_out"] >= pool["capacity"] * settings.READINESS_POOL_SATURATION
+    )
+    ready = not (limiter.saturated or pool_saturated)
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        response.headers["Retry-After"] = str(settings.LOAD_SHEDDING_RETRY_AFTER_SECONDS)
+    return {
+        "status": "healthy" if ready else "overloaded",
+        "requests": limiter.snapshot(),
+        "database_pool": pool,
+        "logs": logging_stats(),
+    }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,11 @@
+from .rate_limit import RateLimitMiddleware, RateLimitStore, InMemoryRateLimitStore, RedisRateLimitStore
+from .compression import CompressionMiddleware
+from .load_shedding import LoadSheddingMiddleware, ConcurrencyLimiter
+from .access_log import AccessLogMiddleware
+from .query_guard import QueryGuardMiddleware
+
+__all__ = [
+    "RateLimitMiddleware", "RateLimitStore", "InMemoryRateLimitStore", "RedisRateLimitStore",
+    "CompressionMiddleware", "LoadSheddingMiddleware", "ConcurrencyLimiter", "AccessLogMiddleware",
+    "QueryGuardMiddleware"
+]
@@ -0,0 +1,78 @@
+import random
+import time
+from typing import Optional
+from jose import JWTError
+from api.config import settings
+from api.database import request_sql_count
+from api.log_pipeline import access_logger
+from api.utils.auth import decode_access_token
+from .routes import bearer_token, route_key
+
+
+def _claims(scope) -> Optional[dict]:
+    """Token claims the rate limiter already verified, else the (cached) decode"""
+    claims = scope.get("state", {}).get("token_claims")
+    if claims is None:
+        token = bearer_token(scope)
+        if token:
+            try:
+                claims = decode_access_token(token)
+            except JWTError:
+                return None
+    return claims
+
+
+class AccessLogMiddleware:
+    """ASGI middleware writing one structured access log record per request
+
+    Records go through the queue in api/log_pipeline.py, so the request never waits
+    on the disk. Successful requests are sampled at ACCESS_LOG_SAMPLE_RATE; errors and
+    requests slower than ACCESS_LOG_SLOW_MS are always kept.
+    """
+
+    def __init__(self, app, sample_rate: Optional[float] = None):
+        self.app = app
+        self.enabled = bool(settings.LOG_DIR)
+        self.sample_rate = settings.ACCESS_LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.slow_seconds = settings.ACCESS_LOG_SLOW_MS / 1000
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        response_bytes = 0
+        statements = [0]
+        counter = request_sql_count.set(statements)
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            request_sql_count.reset(counter)
+            if status_code >= 400 or elapsed >= self.slow_seconds or random.random() < self.sample_rate:
+                claims = _claims(scope) or {}
+                client = scope.get("client")
+                access_logger.info("request", extra={"fields": {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": route_key(scope["method"], scope["path"]),
+                    "status": status_code,
+                    "latency_ms": round(elapsed * 1000, 2),
+                    "sql_statements": statements[0],
+                    "response_bytes": response_bytes,
+                    "user_id": claims.get("user_id"),
+                    "company_id": claims.get("company_id"),
+                    "client": client[0] if client else None,
+                    "sample_rate": self.sample_rate,
+                }})
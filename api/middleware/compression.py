@@ -0,0 +1,168 @@
+import zlib
+from functools import lru_cache
+from typing import Callable, Optional
+from api.config import settings
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # Brotli's higher qualities are too slow for per-request compression
+ZSTD_LEVEL = 3
+
+# Only text-like bodies shrink; images, archives and the like are sent as they are
+COMPRESSIBLE_TYPES = (
+    b"application/json", b"application/problem+json", b"application/javascript",
+    b"application/xml", b"image/svg+xml", b"text/",
+)
+
+
+class _Compressor:
+    """Streaming compressor: compress() for each chunk, finish() once at the end"""
+
+    def __init__(self, compress: Callable[[bytes], bytes], finish: Callable[[], bytes]):
+        self.compress = compress
+        self.finish = finish
+
+
+def _gzip() -> _Compressor:
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return _Compressor(compressor.compress, compressor.flush)
+
+
+def _brotli() -> _Compressor:
+    import brotli
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    return _Compressor(compressor.process, compressor.finish)
+
+
+def _zstd() -> _Compressor:
+    import zstandard
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    return _Compressor(compressor.compress, compressor.flush)
+
+
+def available_encodings(preferred: list[str]) -> list[str]:
+    """The preferred encodings whose compression library is installed (br and zstd are optional)"""
+    modules = {"gzip": "zlib", "br": "brotli", "zstd": "zstandard"}
+    available = []
+    for encoding in preferred:
+        module = modules.get(encoding)
+        if module is None:
+            raise ValueError(f"Unsupported compression encoding: {encoding}")
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        available.append(encoding)
+    return available
+
+
+_COMPRESSORS = {"gzip": _gzip, "br": _brotli, "zstd": _zstd}
+
+
+@lru_cache(maxsize=256)
+def negotiate_encoding(accept_encoding: str, supported: tuple[str, ...]) -> Optional[str]:
+    """Pick the client's highest-q supported encoding; ties go to the server's preference order"""
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in supported:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _header(headers, name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing text responses with gzip, brotli or zstd per Accept-Encoding"""
+
+    def __init__(self, app, minimum_size: Optional[int] = None, encodings: Optional[list[str]] = None):
+        self.app = app
+        self.enabled = settings.COMPRESSION_ENABLED
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+        self.encodings = tuple(available_encodings(encodings or settings.COMPRESSION_ENCODINGS))
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+
+        accept = _header(scope["headers"], b"accept-encoding")
+        encoding = negotiate_encoding(accept.decode("latin-1"), self.encodings) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None  # Set once the response is being compressed
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                # Hold the headers until the first body chunk shows whether to compress
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                headers = list(start_message.get("headers", []))
+                content_type = _header(headers, b"content-type") or b""
+                if (
+                    _header(headers, b"content-encoding") is not None
+                    or start_message["status"] in (204, 304)
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                ):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                headers = [(key, value) for key, value in headers if key.lower() != b"vary"]
+                vary = _header(start_message.get("headers", []), b"vary")
+                headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+
+                if not more_body and len(body) < self.minimum_size:
+                    # Small enough that compressing costs more than it saves
+                    passthrough = True
+                    await send({**start_message, "headers": headers})
+                    await send(message)
+                    return
+
+                compressor = _COMPRESSORS[encoding]()
+                headers = [(key, value) for key, value in headers if key.lower() != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode()))
+                if not more_body:
+                    body = compressor.compress(body) + compressor.finish()
+                    headers.append((b"content-length", str(len(body)).encode()))
+                    await send({**start_message, "headers": headers})
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send({**start_message, "headers": headers})
+
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
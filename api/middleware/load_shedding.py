@@ -0,0 +1,153 @@
+import time
+from functools import lru_cache
+from typing import Optional
+from api.config import settings
+from .routes import EXEMPT_PATHS, route_key
+
+LOW, NORMAL, HIGH = 0, 1, 2
+# Share of the concurrency limit each priority may fill: low-priority work is shed
+# first, and logins and approvals keep some headroom when everything else is refused
+PRIORITY_SHARES = {LOW: 0.5, NORMAL: 0.85, HIGH: 1.0}
+
+# Routes tracked individually; anything beyond (scanners, typos) shares one entry
+MAX_TRACKED_ROUTES = 1024
+
+
+class _RouteLatency:
+    """Latency baseline of one route: follows drops quickly and rises slowly,
+    so sustained overload does not become the new normal"""
+
+    __slots__ = ("baseline",)
+
+    def __init__(self):
+        self.baseline: Optional[float] = None
+
+    def observe(self, seconds: float) -> float:
+        """Record a sample; returns the baseline it is judged against"""
+        baseline = self.baseline
+        if baseline is None:
+            self.baseline = seconds
+            return seconds
+        self.baseline = baseline + (seconds - baseline) * (0.05 if seconds < baseline else 0.001)
+        return baseline
+
+
+class ConcurrencyLimiter:
+    """Adaptive (AIMD) limit on in-flight requests in one worker
+
+    The limit grows by about one per limit's worth of requests completing at their
+    route's usual latency while the limit is in use, and shrinks by BACKOFF (at most
+    once per round trip) when a request takes more than latency_tolerance times its
+    route's baseline or fails with a 5xx.
+    """
+
+    BACKOFF = 0.9
+
+    def __init__(
+        self,
+        initial: Optional[int] = None,
+        minimum: Optional[int] = None,
+        maximum: Optional[int] = None,
+        latency_tolerance: Optional[float] = None,
+    ):
+        self.minimum = minimum or settings.CONCURRENCY_LIMIT_MIN
+        self.maximum = maximum or settings.CONCURRENCY_LIMIT_MAX
+        self.limit = float(initial or settings.CONCURRENCY_LIMIT_INITIAL)
+        self.latency_tolerance = latency_tolerance or settings.CONCURRENCY_LATENCY_TOLERANCE
+        self.in_flight = 0
+        self.shed = 0
+        self._routes: dict[str, _RouteLatency] = {}
+        self._next_decrease = 0.0
+
+    def try_acquire(self, priority: int) -> bool:
+        if self.in_flight >= self.limit * PRIORITY_SHARES[priority]:
+            self.shed += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, route: str, seconds: float, failed: bool) -> None:
+        in_use = self.in_flight
+        self.in_flight -= 1
+        latency = self._routes.get(route)
+        if latency is None:
+            if len(self._routes) >= MAX_TRACKED_ROUTES:
+                route = "*"
+            latency = self._routes.setdefault(route, _RouteLatency())
+        baseline = latency.observe(seconds)
+
+        if failed or seconds > baseline * self.latency_tolerance:
+            now = time.monotonic()
+            if now >= self._next_decrease:
+                self.limit = max(self.minimum, self.limit * self.BACKOFF)
+                # Requests already in flight saw the same congestion; let them drain first
+                self._next_decrease = now + seconds
+        elif in_use >= self.limit / 2:
+            # Only grow when the limit is actually being used
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+    @property
+    def saturated(self) -> bool:
+        return self.in_flight >= self.limit
+
+    def snapshot(self) -> dict:
+        return {"in_flight": self.in_flight, "limit": int(self.limit), "shed": self.shed}
+
+
+@lru_cache(maxsize=4096)
+def route_priority(route: str) -> int:
+    """Priority of a route key ("METHOD /path/{id}") from the configured prefixes"""
+    if route.startswith(tuple(settings.LOAD_SHEDDING_HIGH_PRIORITY_ROUTES)):
+        return HIGH
+    if route.startswith(tuple(settings.LOAD_SHEDDING_LOW_PRIORITY_ROUTES)):
+        return LOW
+    return NORMAL
+
+
+class LoadSheddingMiddleware:
+    """ASGI middleware admitting requests under an adaptive concurrency limit
+
+    Requests over their priority's share of the limit are refused at once with 503
+    and Retry-After, instead of queueing for the threadpool and the database pool.
+    The limiter is exposed on request.state for the readiness probe.
+    """
+
+    def __init__(self, app, limiter: Optional[ConcurrencyLimiter] = None):
+        self.app = app
+        self.enabled = settings.LOAD_SHEDDING_ENABLED
+        self.limiter = limiter or ConcurrencyLimiter()
+        self.retry_after = str(settings.LOAD_SHEDDING_RETRY_AFTER_SECONDS).encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        scope.setdefault("state", {})["concurrency_limiter"] = self.limiter
+        if not self.enabled or scope["method"] == "OPTIONS" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        route = route_key(scope["method"], scope["path"])
+        if not self.limiter.try_acquire(route_priority(route)):
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [(b"retry-after", self.retry_after), (b"content-type", b"application/json")],
+            })
+            await send({"type": "http.response.body", "body": b'{"detail":"Server overloaded, retry later"}'})
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.limiter.release(route, time.perf_counter() - started, status_code >= 500)
+
@@ -0,0 +1,90 @@
+import math
+from functools import lru_cache
+import anyio
+from api.config import settings
+from api.database import QueryGuard, request_query_guard
+from .routes import EXEMPT_PATHS, route_key
+
+# Only read-only requests are stopped on disconnect: a half-done write is not worth saving a query
+CANCELLABLE_METHODS = {"GET", "HEAD"}
+# Threads sending PostgreSQL cancel requests, apart from the (possibly saturated) request threadpool
+CANCEL_THREADS = 4
+
+
+@lru_cache(maxsize=4096)
+def route_statement_timeout(route: str) -> int:
+    """Statement timeout in ms of a route key ("METHOD /path/{id}"); 0 = none"""
+    return settings.ROUTE_STATEMENT_TIMEOUTS_MS.get(route, settings.STATEMENT_TIMEOUT_MS)
+
+
+class QueryGuardMiddleware:
+    """ASGI middleware bounding the SQL a request can run
+
+    Sets a QueryGuard (api/database.py) with the route's statement timeout. On those
+    routes, GET and HEAD requests are also watched for the client disconnecting, which
+    cancels the statement in flight and refuses further ones, so an abandoned heavy
+    query stops using the database. Routes without a timeout pass straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.cancel_on_disconnect = settings.CANCEL_QUERIES_ON_DISCONNECT
+        self._cancel_limiter = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        timeout_ms = route_statement_timeout(route_key(scope["method"], scope["path"]))
+        if not timeout_ms:
+            await self.app(scope, receive, send)
+            return
+
+        watch = self.cancel_on_disconnect and scope["method"] in CANCELLABLE_METHODS
+        guard = QueryGuard(timeout_ms)
+        token = request_query_guard.set(guard)
+        try:
+            if watch:
+                await self._run_watched(guard, scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+        finally:
+            request_query_guard.reset(token)
+
+    async def _run_watched(self, guard: QueryGuard, scope, receive, send):
+        # The watcher is the only reader of receive; the app gets the messages it forwards
+        forward, messages = anyio.create_memory_object_stream(math.inf)
+        response_complete = False
+
+        async def send_tracking(message):
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        async def watch_disconnect():
+            while True:
+                message = await receive()
+                forward.send_nowait(message)
+                if message["type"] == "http.disconnect":
+                    # Servers also report a disconnect once the response is sent
+                    if not response_complete:
+                        await self._cancel(guard)
+                    return
+
+        error = None
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(watch_disconnect)
+            try:
+                await self.app(scope, messages.receive, send_tracking)
+            except Exception as exc:
+                error = exc  # Raised below, so it is not wrapped in an ExceptionGroup
+            task_group.cancel_scope.cancel()
+        if error is not None:
+            raise error
+
+    async def _cancel(self, guard: QueryGuard) -> None:
+        if self._cancel_limiter is None:
+            self._cancel_limiter = anyio.CapacityLimiter(CANCEL_THREADS)
+        await anyio.to_thread.run_sync(guard.cancel, limiter=self._cancel_limiter)
@@ -0,0 +1,185 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+from jose import JWTError
+from api.config import settings
+from api.utils.auth import decode_access_token
+from .routes import EXEMPT_PATHS, bearer_token, route_key
+
+
+
+class RateLimitStore(ABC):
+    """Token bucket storage backend"""
+
+    @abstractmethod
+    async def consume(self, buckets: list[tuple[str, int, float]]) -> tuple[bool, list[float]]:
+        """Take one token from every (key, capacity, refill_per_second) bucket, or from none
+        when any of them is empty; returns (allowed, tokens left per bucket)"""
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """Per-process token buckets; the least recently used is dropped beyond max_keys"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+
+    async def consume(self, buckets: list[tuple[str, int, float]]) -> tuple[bool, list[float]]:
+        now = time.monotonic()
+        states = []
+        allowed = True
+        for key, capacity, refill_per_second in buckets:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(capacity), now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                tokens = bucket[0] + (now - bucket[1]) * refill_per_second
+                bucket[0] = tokens if tokens < capacity else float(capacity)
+                bucket[1] = now
+            allowed = allowed and bucket[0] >= 1.0
+            states.append(bucket)
+
+        if allowed:
+            for bucket in states:
+                bucket[0] -= 1.0
+        return allowed, [bucket[0] for bucket in states]
+
+
+# Atomic all-or-nothing token buckets for Redis: KEYS the buckets,
+# ARGV now then capacity and refill/s per bucket
+_REDIS_TOKEN_BUCKETS = """
+local now = tonumber(ARGV[1])
+local tokens = {}
+local allowed = 1
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i])
+    local rate = tonumber(ARGV[2 * i + 1])
+    local bucket = redis.call('HMGET', key, 't', 'ts')
+    local t = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens[i] = math.min(capacity, t + (now - ts) * rate)
+    if tokens[i] < 1 then
+        allowed = 0
+    end
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i])
+    local rate = tonumber(ARGV[2 * i + 1])
+    if allowed == 1 then
+        tokens[i] = tokens[i] - 1
+    end
+    redis.call('HSET', key, 't', tokens[i], 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+    tokens[i] = tostring(tokens[i])
+end
+return {allowed, tokens}
+"""
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """Token buckets shared between workers through Redis"""
+
+    def __init__(self, client):
+        self._script = client.register_script(_REDIS_TOKEN_BUCKETS)
+
+    async def consume(self, buckets: list[tuple[str, int, float]]) -> tuple[bool, list[float]]:
+        args = [time.time()]
+        for _, capacity, refill_per_second in buckets:
+            args += [capacity, refill_per_second]
+        allowed, tokens = await self._script(keys=[f"ratelimit:{key}" for key, _, _ in buckets], args=args)
+        return bool(allowed), [float(left) for left in tokens]
+
+
+def build_rate_limit_store() -> RateLimitStore:
+    """Create the store selected by RATE_LIMIT_BACKEND"""
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as exc:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package") from exc
+        if not settings.RATE_LIMIT_REDIS_URL:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires RATE_LIMIT_REDIS_URL")
+        return RedisRateLimitStore(redis_asyncio.from_url(settings.RATE_LIMIT_REDIS_URL))
+    return InMemoryRateLimitStore()
+
+
+class RateLimitMiddleware:
+    """ASGI middleware enforcing per-user and per-company token buckets per route"""
+
+    def __init__(self, app, store: Optional[RateLimitStore] = None):
+        self.app = app
+        self.store = store or build_rate_limit_store()
+        self.enabled = settings.RATE_LIMIT_ENABLED
+        self.role_quotas = settings.RATE_LIMIT_ROLE_QUOTAS
+        self.company_quota = settings.RATE_LIMIT_COMPANY_QUOTA
+        self.anonymous_quota = settings.RATE_LIMIT_ANONYMOUS_QUOTA
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not self.enabled
+            or scope["type"] != "http"
+            or scope["method"] == "OPTIONS"
+            or scope["path"] in EXEMPT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        route = route_key(scope["method"], scope["path"])
+        claims = None
+        token = bearer_token(scope)
+        if token:
+            try:
+                claims = decode_access_token(token)
+            except JWTError:
+                claims = None  # The auth dependency rejects the request later
+
+        # Check every applicable bucket and report on the most restrictive one
+        if claims is not None:
+            quota = self.role_quotas.get(claims.get("role"), self.anonymous_quota)
+            buckets = [(f"u:{claims.get('user_id')}:{route}", quota)]
+            company_id = claims.get("company_id")
+            if company_id is not None:
+                buckets.append((f"c:{company_id}:{route}", self.company_quota))
+            scope.setdefault("state", {})["token_claims"] = claims
+        else:
+            client = scope.get("client")
+            buckets = [(f"ip:{client[0] if client else '-'}:{route}", self.anonymous_quota)]
+
+        # All or nothing: a request refused by one bucket is not charged to the others
+        buckets = [(key, capacity, capacity / 60.0) for key, capacity in buckets]
+        allowed, tokens_left = await self.store.consume(buckets)
+        limit, remaining, rate = 0, math.inf, 1.0
+        for (_, capacity, refill), tokens in zip(buckets, tokens_left):
+            if tokens < remaining:
+                limit, remaining, rate = capacity, tokens, refill
+
+        headers = [
+            (b"ratelimit-limit", str(limit).encode()),
+            (b"ratelimit-remaining", str(int(remaining)).encode()),
+            (b"ratelimit-reset", str(math.ceil((limit - remaining) / rate)).encode()),
+        ]
+
+        if not allowed:
+            retry_after = str(math.ceil((1.0 - remaining) / rate)).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": headers + [
+                    (b"retry-after", retry_after),
+                    (b"content-type", b"application/json"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": b'{"detail":"Rate limit exceeded"}'})
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
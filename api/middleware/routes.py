@@ -0,0 +1,22 @@
+"""Request helpers shared by the middlewares (rate limiting, load shedding, access log, query guard)"""
+from functools import lru_cache
+from typing import Optional
+
+# Paths left alone by rate limiting, load shedding and the query guard (probes and docs)
+EXEMPT_PATHS = {"/", "/health", "/docs", "/redoc", "/openapi.json"}
+
+
+@lru_cache(maxsize=4096)
+def route_key(method: str, path: str) -> str:
+    """Collapse ids in the path so /expenses/1 and /expenses/2 share a key ("GET /expenses/{id}")"""
+    segments = ["{id}" if segment.isdigit() else segment for segment in path.split("/")]
+    return f"{method} {'/'.join(segments)}"
+
+
+def bearer_token(scope) -> Optional[str]:
+    """The bearer token of an ASGI request's Authorization header, if any"""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return token if scheme.lower() == "bearer" and token else None
+    return None
@@ -1,5 +1,15 @@
 from .company import Company
 from .user import User
-from .expense import Expense
+from .expense import Expense, ArchivedExpense
+from .refresh_token import RefreshToken
+from .approval_rule import ApprovalRule, ApproverType
+from .policy_violation import PolicyViolation, ViolationKind
+from .offboarding_job import OffboardingJob, OffboardingKind, OffboardingStatus
+from .budget import Budget, BudgetBalance, BudgetCharge, BudgetPeriod
+from .recurring_expense import RecurringExpense, RecurrenceFrequency
 
-__all__ = ["Company", "User", "Expense"]
+__all__ = [
+    "Company", "User", "Expense", "ArchivedExpense", "RefreshToken", "ApprovalRule", "ApproverType",
+    "PolicyViolation", "ViolationKind", "OffboardingJob", "OffboardingKind", "OffboardingStatus",
+    "Budget", "BudgetBalance", "BudgetCharge", "BudgetPeriod", "RecurringExpense", "RecurrenceFrequency"
+]
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, Numeric, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from ..database import Base, TenantScoped
+from .expense import ExpenseCategory
+import enum
+
+
+class ApproverType(str, enum.Enum):
+    MANAGER_CHAIN = "manager_chain"  # The submitter's manager N levels up
+    USER = "user"                    # A fixed approver
+
+
+class ApprovalRule(TenantScoped, Base):
+    """Extra approval step for a company's expenses at or above min_amount (optionally one category)"""
+    __tablename__ = "approval_rules"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False, index=True)
+    category = Column(SQLEnum(ExpenseCategory), nullable=True)  # None applies to every category
+    min_amount = Column(Numeric(10, 2), nullable=False, default=0)
+    
+    approver_type = Column(SQLEnum(ApproverType), nullable=False)
+    manager_level = Column(Integer, nullable=True)  # 2 = the manager's manager
+    approver_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    # Relationships
+    approver = relationship("User")
+    
+    def __repr__(self):
+        return f"<ApprovalRule(id={self.id}, category='{self.category}', min_amount={self.min_amount})>"
@@ -0,0 +1,60 @@
+from sqlalchemy import Column, Integer, Numeric, Date, DateTime, ForeignKey, UniqueConstraint, Enum as SQLEnum
+from sqlalchemy.sql import func
+from ..database import Base, TenantScoped
+from .expense import ExpenseCategory
+import enum
+
+
+class BudgetPeriod(str, enum.Enum):
+    MONTHLY = "monthly"
+    QUARTERLY = "quarterly"
+    YEARLY = "yearly"
+
+
+class Budget(TenantScoped, Base):
+    """Spending cap per period for a company, optionally narrowed to one user and/or category"""
+    __tablename__ = "budgets"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)  # None = every user
+    category = Column(SQLEnum(ExpenseCategory), nullable=True)  # None = every category
+    period = Column(SQLEnum(BudgetPeriod), nullable=False, default=BudgetPeriod.MONTHLY)
+    amount = Column(Numeric(12, 2), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<Budget(id={self.id}, user_id={self.user_id}, category='{self.category}', amount={self.amount})>"
+
+
+class BudgetBalance(TenantScoped, Base):
+    """Running totals of one budget for one period, updated in place on every expense change"""
+    __tablename__ = "budget_balances"
+    __table_args__ = (
+        UniqueConstraint("budget_id", "period_start", name="uq_budget_balances_budget_period"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    budget_id = Column(Integer, ForeignKey("budgets.id", ondelete="CASCADE"), nullable=False)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False, index=True)
+    period_start = Column(Date, nullable=False)
+    reserved = Column(Numeric(12, 2), nullable=False, default=0, server_default="0")  # Pending expenses
+    spent = Column(Numeric(12, 2), nullable=False, default=0, server_default="0")  # Approved expenses
+    
+    def __repr__(self):
+        return f"<BudgetBalance(budget_id={self.budget_id}, period_start={self.period_start}, reserved={self.reserved}, spent={self.spent})>"
+
+
+class BudgetCharge(TenantScoped, Base):
+    """Amount a pending expense holds on a balance, so it can be released or settled exactly"""
+    __tablename__ = "budget_charges"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False, index=True)
+    # No foreign key, as for policy violations: expenses may be partitioned
+    expense_id = Column(Integer, nullable=False, index=True)
+    balance_id = Column(Integer, ForeignKey("budget_balances.id", ondelete="CASCADE"), nullable=False)
+    amount = Column(Numeric(12, 2), nullable=False)
+    
+    def __repr__(self):
+        return f"<BudgetCharge(expense_id={self.expense_id}, balance_id={self.balance_id}, amount={self.amount})>"
@@ -1,20 +1,22 @@
 from sqlalchemy import Column, Integer, String, DateTime
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from ..database import Base
+from ..database import Base, SoftDeletable
 
 
-class Company(Base):
+class Company(SoftDeletable, Base):
     __tablename__ = "companies"
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, nullable=False, index=True)
     currency = Column(String, default="USD", nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
     
-    # Relationships
-    users = relationship("User", back_populates="company", cascade="all, delete-orphan")
-    expenses = relationship("Expense", back_populates="company", cascade="all, delete-orphan")
+    # Relationships; passive_deletes leaves the cascade to ON DELETE CASCADE, so deleting
+    # a company never loads its users and expenses (large tenants go through offboarding)
+    users = relationship("User", back_populates="company", cascade="all, delete-orphan", passive_deletes=True)
+    expenses = relationship("Expense", back_populates="company", cascade="all, delete-orphan", passive_deletes=True)
     
     def __repr__(self):
         return f"<Company(id={self.id}, name='{self.name}')>"
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Text, Enum as SQLEnum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, ForeignKey, Text, JSON, Index, Enum as SQLEnum
+from sqlalchemy.orm import relationship, declared_attr
 from sqlalchemy.sql import func
-from ..database import Base
+from ..database import Base, TenantScoped, SoftDeletable
 import enum
 
 
@@ -20,10 +20,8 @@ class ExpenseCategory(str, enum.Enum):
     OTHER = "other"
 
 
-class Expense(Base):
-    __tablename__ = "expenses"
-    
-    id = Column(Integer, primary_key=True, index=True)
+class ExpenseColumns:
+    """Columns shared by the hot expenses table and the expenses_archive table"""
     title = Column(String, nullable=False)
     amount = Column(Numeric(10, 2), nullable=False)
     category = Column(SQLEnum(ExpenseCategory), nullable=False)
@@ -32,17 +30,66 @@ class Expense(Base):
     status = Column(SQLEnum(ExpenseStatus), nullable=False, default=ExpenseStatus.PENDING)
     
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False, index=True)
     manager_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    # Approvers in order, fixed at submission by the company's approval rules;
+    # current_approver_id is approval_chain[approval_step] while the expense is pending
+    approval_chain = Column(JSON, nullable=False, default=list)
+    approval_step = Column(Integer, nullable=False, default=0, server_default="0")
+    current_approver_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    # Set on expenses generated from a recurring template: which template, for which date
+    recurring_id = Column(Integer, ForeignKey("recurring_expenses.id", ondelete="SET NULL"), nullable=True)
+    occurrence_on = Column(Date, nullable=True)
     
     submitted_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     reviewed_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Bumped by every update (ORM or Core), so reports and the analytics export can tell what changed
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+    # Incremented by every update; clients send it back in If-Match (see api/utils/etag.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+
+class Expense(ExpenseColumns, TenantScoped, SoftDeletable, Base):
+    __tablename__ = "expenses"
+    __table_args__ = (
+        # Duplicate checks look up a user's recent submissions
+        Index("ix_expenses_user_id_submitted_at", "user_id", "submitted_at"),
+        # The analytics export reads the rows changed since its last run
+        Index("ix_expenses_updated_at", "updated_at"),
+        # One expense per template occurrence, however often generation runs (company_id
+        # is included so the index survives partitioning)
+        Index("uq_expenses_recurring_occurrence", "company_id", "recurring_id", "occurrence_on", unique=True),
+    )
+    
+    @declared_attr
+    def __mapper_args__(cls):
+        return {
+            # Fetch updated_at through UPDATE ... RETURNING instead of a SELECT on next access
+            "eager_defaults": True,
+            # ORM flushes update WHERE version = <loaded version> and raise StaleDataError
+            # when another request changed the row in between
+            "version_id_col": cls.version,
+        }
+    
+    id = Column(Integer, primary_key=True, index=True)
     
     # Relationships
-    user = relationship("User", back_populates="expenses", foreign_keys=[user_id])
+    user = relationship("User", back_populates="expenses", foreign_keys="Expense.user_id")
     company = relationship("Company", back_populates="expenses")
-    manager = relationship("User", back_populates="managed_expenses", foreign_keys=[manager_id])
+    manager = relationship("User", back_populates="managed_expenses", foreign_keys="Expense.manager_id")
     
     def __repr__(self):
         return f"<Expense(id={self.id}, title='{self.title}', amount={self.amount}, status='{self.status}')>"
+
+
+class ArchivedExpense(ExpenseColumns, TenantScoped, SoftDeletable, Base):
+    """Expense reviewed long ago, moved out of the hot table by the archival job (same id)"""
+    __tablename__ = "expenses_archive"
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<ArchivedExpense(id={self.id}, title='{self.title}', status='{self.status}')>"
@@ -0,0 +1,40 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Enum as SQLEnum
+from sqlalchemy.sql import func
+from ..database import Base
+import enum
+
+
+class OffboardingKind(str, enum.Enum):
+    COMPANY = "company"
+    USER = "user"
+
+
+class OffboardingStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class OffboardingJob(Base):
+    """Background purge of a deleted company or user, done in bounded batches (services/offboarding.py)"""
+    __tablename__ = "offboarding_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(SQLEnum(OffboardingKind), nullable=False)
+    target_id = Column(Integer, nullable=False)
+    # No foreign keys: the job outlives the rows it deletes
+    company_id = Column(Integer, nullable=False, index=True)
+    requested_by = Column(Integer, nullable=True)
+    status = Column(SQLEnum(OffboardingStatus), nullable=False, default=OffboardingStatus.PENDING)
+    current_step = Column(String, nullable=True)
+    # Rows deleted or detached so far, per step
+    progress = Column(JSON, nullable=False, default=dict)
+    deleted_rows = Column(Integer, nullable=False, default=0, server_default="0")
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    
+    def __repr__(self):
+        return f"<OffboardingJob(id={self.id}, kind='{self.kind}', target_id={self.target_id}, status='{self.status}')>"
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy.sql import func
+from ..database import Base, TenantScoped
+import enum
+
+
+class ViolationKind(str, enum.Enum):
+    DUPLICATE = "duplicate"
+    CATEGORY_LIMIT = "category_limit"
+    WEEKEND = "weekend"
+    OVER_BUDGET = "over_budget"  # Managed by api/services/budgets.py
+
+
+class PolicyViolation(TenantScoped, Base):
+    """Policy check finding for one expense, rewritten whenever the expense is checked again"""
+    __tablename__ = "policy_violations"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False, index=True)
+    # No foreign keys to expenses: archival moves expenses and partitioning forbids them
+    expense_id = Column(Integer, nullable=False, index=True)
+    kind = Column(SQLEnum(ViolationKind), nullable=False)
+    related_expense_id = Column(Integer, nullable=True)  # The earlier expense a duplicate matches
+    detail = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<PolicyViolation(expense_id={self.expense_id}, kind='{self.kind}')>"
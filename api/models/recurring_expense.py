@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, Boolean, ForeignKey, Text, true, Enum as SQLEnum
+from sqlalchemy.sql import func
+from ..database import Base, TenantScoped
+from .expense import ExpenseCategory
+import enum
+
+
+class RecurrenceFrequency(str, enum.Enum):
+    WEEKLY = "weekly"
+    MONTHLY = "monthly"
+    QUARTERLY = "quarterly"
+    YEARLY = "yearly"
+
+
+class RecurringExpense(TenantScoped, Base):
+    """Template an expense is generated from on a schedule (services/recurring.py)"""
+    __tablename__ = "recurring_expenses"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    title = Column(String, nullable=False)
+    amount = Column(Numeric(10, 2), nullable=False)
+    category = Column(SQLEnum(ExpenseCategory), nullable=False)
+    description = Column(Text, nullable=True)
+    
+    frequency = Column(SQLEnum(RecurrenceFrequency), nullable=False, default=RecurrenceFrequency.MONTHLY)
+    # Occurrence n falls n periods after start_on (clamped to the end of shorter months)
+    start_on = Column(Date, nullable=False)
+    end_on = Column(Date, nullable=True)
+    active = Column(Boolean, nullable=False, default=True, server_default=true())
+    occurrences = Column(Integer, nullable=False, default=0, server_default="0")  # Generated so far
+    # Date of the next occurrence; NULL once the template is paused or past end_on
+    next_run_on = Column(Date, nullable=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    # Fetch created_at through INSERT ... RETURNING instead of a SELECT on next access
+    __mapper_args__ = {"eager_defaults": True}
+    
+    def __repr__(self):
+        return f"<RecurringExpense(id={self.id}, title='{self.title}', frequency='{self.frequency}', next_run_on={self.next_run_on})>"
@@ -1,7 +1,7 @@
 from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, backref
 from sqlalchemy.sql import func
-from ..database import Base  # Correct relative import for database
+from ..database import Base, TenantScoped, SoftDeletable  # Correct relative import for database
 import enum
 
 
@@ -12,7 +12,7 @@ class UserRole(str, enum.Enum):
     EMPLOYEE = "employee"
 
 
-class User(Base):
+class User(TenantScoped, SoftDeletable, Base):
     __tablename__ = "users"
     
     id = Column(Integer, primary_key=True, index=True)
@@ -20,10 +20,20 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     full_name = Column(String, nullable=False)
     role = Column(SQLEnum(UserRole), nullable=False, default=UserRole.EMPLOYEE)
-    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False, index=True)
     # This is the foreign key column that points to the manager's ID
     manager_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True) 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Bumped on role changes and logout; tokens carrying an older version are rejected
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # When token_version was last bumped; workers reload only revocations younger than a token
+    tokens_revoked_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    # Row version for optimistic concurrency (If-Match on updates)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Set on delete; the offboarding job removes the row and its data later
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+    
+    __mapper_args__ = {"version_id_col": version}
     
     # Relationships
     
@@ -35,13 +45,18 @@ class User(Base):
     manager = relationship(
         "User", 
         remote_side=[id],              # The column on the "remote" (manager) side
-        backref="subordinates",        # Creates a 'subordinates' list on the manager User object
+        # Creates a 'subordinates' list on the manager User object; deleting a manager
+        # leaves the SET NULL to the database instead of loading every subordinate
+        backref=backref("subordinates", passive_deletes=True),
         foreign_keys=[manager_id]      # Explicitly states which column to use for the join
     )
     
     # 3. Expense Relationships (User submitted expenses and expenses managed by user)
-    expenses = relationship("Expense", back_populates="user", foreign_keys="Expense.user_id")
-    managed_expenses = relationship("Expense", back_populates="manager", foreign_keys="Expense.manager_id")
+    # passive_deletes: ON DELETE CASCADE / SET NULL do the work, the ORM loads nothing
+    expenses = relationship("Expense", back_populates="user", foreign_keys="Expense.user_id", passive_deletes=True)
+    managed_expenses = relationship(
+        "Expense", back_populates="manager", foreign_keys="Expense.manager_id", passive_deletes=True
+    )
     
     def __repr__(self):
         return f"<User(id={self.id}, email='{self.email}', role='{self.role}')>"
\ No newline at end of file
@@ -0,0 +1,281 @@
+"""
+Prebuilt statements for the hot router queries
+
+Each variant is built once and reused with bound parameters, so handlers skip
+rebuilding the Query chain and SQLAlchemy reuses its compiled form. Tenant
+scoping and soft-delete filtering are still added per execution by the session
+(see database.py).
+"""
+from functools import lru_cache
+from typing import Optional
+from sqlalchemy import select, update, bindparam, literal, or_, func, case, union_all, Integer
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import selectinload, joinedload, noload, load_only, aliased
+from sqlalchemy.sql.functions import FunctionElement
+from api.models.user import User, UserRole
+from api.models.expense import Expense, ArchivedExpense, ExpenseStatus
+
+# Visibility scopes: admins see the whole company, managers their own and their
+# subordinates' expenses, employees only their own
+SCOPE_COMPANY = "company"
+SCOPE_MANAGER = "manager"
+SCOPE_OWN = "own"
+
+# Relations a client can embed with ?include=, with the foreign key each loads through
+EXPENSE_RELATIONS = {"user": "user_id", "manager": "manager_id", "company": "company_id"}
+NO_INCLUDES: frozenset[str] = frozenset()
+
+
+def expense_scope(role: UserRole) -> str:
+    if role == UserRole.ADMIN:
+        return SCOPE_COMPANY
+    if role == UserRole.MANAGER:
+        return SCOPE_MANAGER
+    return SCOPE_OWN
+
+
+@lru_cache(maxsize=None)
+def _expense_entity(with_archive: bool):
+    """Expense, or Expense mapped over the hot table UNION ALL expenses_archive"""
+    if not with_archive:
+        return Expense
+    names = [column.name for column in Expense.__table__.columns]
+    hot_and_archive = union_all(
+        select(*(Expense.__table__.c[name] for name in names)),
+        select(*(ArchivedExpense.__table__.c[name] for name in names)),
+    ).subquery("expenses_all")
+    return aliased(Expense, hot_and_archive)
+
+
+def _visibility_clause(scope: str, entity=Expense):
+    if scope == SCOPE_MANAGER:
+        return or_(
+            entity.user_id == bindparam("user_id"),
+            entity.manager_id == bindparam("user_id"),
+            entity.current_approver_id == bindparam("user_id"),
+        )
+    if scope == SCOPE_OWN:
+        return entity.user_id == bindparam("user_id")
+    return None
+
+
+def _relation_options(includes: frozenset[str], loader, entity=Expense):
+    """Load the requested relations with one query each (or a join); never lazy-load the rest"""
+    return [
+        loader(getattr(entity, name)) if name in includes else noload(getattr(entity, name))
+        for name in EXPENSE_RELATIONS
+    ]
+
+
+def _column_options(fields: Optional[frozenset[str]], includes: frozenset[str], entity=Expense):
+    """Restrict the SELECT to the requested columns (plus the keys the included relations need)"""
+    if fields is None:
+        return []
+    columns = fields | {EXPENSE_RELATIONS[name] for name in includes}
+    return [load_only(*(getattr(entity, name) for name in sorted(columns)))]
+
+
+@lru_cache(maxsize=None)
+def list_expenses_statement(
+    scope: str,
+    by_status: bool,
+    by_category: bool,
+    includes: frozenset[str] = NO_INCLUDES,
+    fields: Optional[frozenset[str]] = None,
+    with_archive: bool = False,
+):
+    """Params: user_id, status, category, skip, limit"""
+    entity = _expense_entity(with_archive)
+    # selectinload fetches each distinct related row once, however many expenses share it
+    stmt = select(entity).options(
+        *_relation_options(includes, selectinload, entity), *_column_options(fields, includes, entity)
+    )
+    visibility = _visibility_clause(scope, entity)
+    if visibility is not None:
+        stmt = stmt.where(visibility)
+    if by_status:
+        stmt = stmt.where(entity.status == bindparam("status"))
+    if by_category:
+        stmt = stmt.where(entity.category == bindparam("category"))
+    return stmt.offset(bindparam("skip")).limit(bindparam("limit"))
+
+
+@lru_cache(maxsize=None)
+def pending_expenses_statement(
+    scope: str, includes: frozenset[str] = NO_INCLUDES, fields: Optional[frozenset[str]] = None
+):
+    """Params: user_id, skip, limit"""
+    stmt = (
+        select(Expense)
+        .options(*_relation_options(includes, selectinload), *_column_options(fields, includes))
+        .where(Expense.status == ExpenseStatus.PENDING)
+    )
+    if scope != SCOPE_COMPANY:
+        # Managers only see expenses waiting on them at the current approval step
+        stmt = stmt.where(Expense.current_approver_id == bindparam("user_id"))
+    return stmt.offset(bindparam("skip")).limit(bindparam("limit"))
+
+
+@lru_cache(maxsize=None)
+def expense_stats_statement(scope: str):
+    """All dashboard counters in one aggregate instead of one query each. Params: user_id"""
+    approved = Expense.status == ExpenseStatus.APPROVED
+    stmt = select(
+        func.count(Expense.id).label("total_expenses"),
+        func.count(case((Expense.status == ExpenseStatus.PENDING, 1))).label("pending_count"),
+        func.count(case((approved, 1))).label("approved_count"),
+        func.count(case((Expense.status == ExpenseStatus.REJECTED, 1))).label("rejected_count"),
+        func.coalesce(func.sum(Expense.amount), 0).label("total_amount"),
+        func.coalesce(func.sum(case((approved, Expense.amount))), 0).label("approved_amount"),
+    ).select_from(Expense)
+    visibility = _visibility_clause(scope)
+    if visibility is not None:
+        stmt = stmt.where(visibility)
+    return stmt
+
+
+def _in_period(stmt):
+    """Restrict to expenses submitted in [start, end)"""
+    return stmt.where(Expense.submitted_at >= bindparam("start"), Expense.submitted_at < bindparam("end"))
+
+
+@lru_cache(maxsize=None)
+def period_stats_statement(scope: str):
+    """Dashboard counters for one period. Params: user_id, start, end"""
+    return _in_period(expense_stats_statement(scope))
+
+
+@lru_cache(maxsize=None)
+def category_breakdown_statement(scope: str):
+    """Count and total per category for one period. Params: user_id, start, end"""
+    stmt = select(
+        Expense.category,
+        func.count(Expense.id).label("count"),
+        func.coalesce(func.sum(Expense.amount), 0).label("total_amount"),
+    ).group_by(Expense.category).order_by(Expense.category)
+    visibility = _visibility_clause(scope)
+    if visibility is not None:
+        stmt = stmt.where(visibility)
+    return _in_period(stmt)
+
+
+@lru_cache(maxsize=None)
+def top_spenders_statement(scope: str):
+    """Users with the highest totals in one period. Params: user_id, start, end, limit"""
+    total = func.sum(Expense.amount).label("total_amount")
+    stmt = (
+        select(Expense.user_id, User.full_name, func.count(Expense.id).label("count"), total)
+        .join(User, User.id == Expense.user_id)
+        .group_by(Expense.user_id, User.full_name)
+        .order_by(total.desc(), Expense.user_id)
+        .limit(bindparam("limit"))
+    )
+    visibility = _visibility_clause(scope)
+    if visibility is not None:
+        stmt = stmt.where(visibility)
+    return _in_period(stmt)
+
+
+@lru_cache(maxsize=None)
+def expenses_by_ids_statement(includes: frozenset[str] = NO_INCLUDES):
+    """Params: ids (a list, expanded into one IN clause)"""
+    return (
+        select(Expense)
+        .options(*_relation_options(includes, selectinload))
+        .where(Expense.id.in_(bindparam("ids", expanding=True)))
+    )
+
+
+@lru_cache(maxsize=None)
+def get_expense_statement(includes: frozenset[str] = NO_INCLUDES):
+    """Params: expense_id"""
+    # A single row, so the relations come back in the same query
+    return (
+        select(Expense)
+        .options(*_relation_options(includes, joinedload))
+        .where(Expense.id == bindparam("expense_id"))
+    )
+
+
+class json_array_element(FunctionElement):
+    """array[index] of a JSON array of integers, NULL past the end; index may be an expression"""
+    type = Integer()
+    name = "json_array_element"
+    inherit_cache = True
+
+
+@compiles(json_array_element)
+def _json_array_element(element, compiler, **kw):
+    # PostgreSQL json ->> int
+    array, index = (compiler.process(clause, **kw) for clause in element.clauses)
+    return f"CAST(({array} ->> ({index})) AS INTEGER)"
+
+
+@compiles(json_array_element, "sqlite")
+def _json_array_element_sqlite(element, compiler, **kw):
+    array, index = (compiler.process(clause, **kw) for clause in element.clauses)
+    return f"json_extract({array}, '$[' || ({index}) || ']')"
+
+
+def _expense_update(check_version: bool):
+    """UPDATE of one pending expense, optionally only at the version the client read.
+    Params: expense_id, expected_version when check_version"""
+    stmt = update(Expense).where(
+        Expense.id == bindparam("expense_id"), Expense.status == ExpenseStatus.PENDING
+    )
+    if check_version:
+        stmt = stmt.where(Expense.version == bindparam("expected_version"))
+    return stmt
+
+
+@lru_cache(maxsize=None)
+def decide_expense_statement(approve: bool, as_approver: bool, check_version: bool = False):
+    """Apply an approval decision in one UPDATE ... RETURNING
+
+    Matches only a pending expense (and, for managers, only one waiting on them). An
+    approval moves to the next approver of the chain, or finishes the expense when
+    there is none. Params: expense_id, now, approver_id when as_approver and
+    expected_version when check_version.
+    """
+    if approve:
+        next_approver = json_array_element(Expense.approval_chain, Expense.approval_step + 1)
+        final = next_approver.is_(None)
+        status_type = Expense.__table__.c.status.type
+        values = {
+            # Typed literals, so the Enum column stores names as it does for ORM writes
+            Expense.status: case(
+                (final, literal(ExpenseStatus.APPROVED, status_type)),
+                else_=literal(ExpenseStatus.PENDING, status_type),
+            ),
+            Expense.approval_step: case((final, Expense.approval_step), else_=Expense.approval_step + 1),
+            Expense.current_approver_id: next_approver,
+            Expense.reviewed_at: case((final, bindparam("now")), else_=Expense.reviewed_at),
+        }
+    else:
+        values = {
+            Expense.status: ExpenseStatus.REJECTED,
+            Expense.current_approver_id: None,
+            Expense.reviewed_at: bindparam("now"),
+        }
+    values[Expense.version] = Expense.version + 1
+    stmt = _expense_update(check_version)
+    if as_approver:
+        stmt = stmt.where(Expense.current_approver_id == bindparam("approver_id"))
+    return stmt.values(values).returning(Expense)
+
+
+@lru_cache(maxsize=None)
+def edit_expense_statement(fields: frozenset[str], check_version: bool = False):
+    """Update the given columns of the caller's own pending expense in one UPDATE ... RETURNING
+
+    Params: expense_id, owner_id, new_<field> for each field and expected_version
+    when check_version.
+    """
+    values = {getattr(Expense, name): bindparam(f"new_{name}") for name in sorted(fields)}
+    values[Expense.version] = Expense.version + 1
+    return (
+        _expense_update(check_version)
+        .where(Expense.user_id == bindparam("owner_id"))
+        .values(values)
+        .returning(Expense)
+    )
@@ -2,5 +2,14 @@ from .auth import router as auth_router
 from .companies import router as companies_router
 from .users import router as users_router
 from .expenses import router as expenses_router
+from .approval_rules import router as approval_rules_router
+from .reports import router as reports_router
+from .offboarding import router as offboarding_router
+from .budgets import router as budgets_router
+from .recurring_expenses import router as recurring_expenses_router
 
-__all__ = ["auth_router", "companies_router", "users_router", "expenses_router"]
+__all__ = [
+    "auth_router", "companies_router", "users_router", "expenses_router", "approval_rules_router",
+    "reports_router", "offboarding_router", "budgets_router",
+    "recurring_expenses_router"
+]
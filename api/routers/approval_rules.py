@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List
+from api.database import get_db, get_read_db
+from api.log_pipeline import audit
+from api.models.approval_rule import ApprovalRule, ApproverType
+from api.models.user import User, UserRole
+from api.schemas.approval_rule import ApprovalRuleCreate, ApprovalRuleResponse
+from api.schemas.token import Principal
+from api.services.approvals import invalidate_approval_policy
+from api.utils.auth import require_role, require_principal_role
+
+router = APIRouter(prefix="/approval-rules", tags=["Approval Rules"])
+
+
+@router.get("/", response_model=List[ApprovalRuleResponse])
+def list_approval_rules(
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(require_principal_role([UserRole.ADMIN]))
+):
+    """List the company's approval rules (Admin only)"""
+    return db.query(ApprovalRule).order_by(ApprovalRule.min_amount, ApprovalRule.id).all()
+
+
+@router.post("/", response_model=ApprovalRuleResponse, status_code=status.HTTP_201_CREATED)
+def create_approval_rule(
+    rule_data: ApprovalRuleCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """Add an approval step for expenses at or above an amount (Admin only)"""
+    if rule_data.approver_type == ApproverType.USER:
+        # Tenant scoping keeps approvers from other companies out of this lookup
+        approver = db.query(User).filter(User.id == rule_data.approver_id).first()
+        if not approver or approver.role not in [UserRole.MANAGER, UserRole.ADMIN]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Approver must be a manager or admin in your company"
+            )
+    
+    rule = ApprovalRule(**rule_data.model_dump(), company_id=current_user.company_id)
+    db.add(rule)
+    invalidate_approval_policy(db, current_user.company_id)
+    db.commit()
+    audit("approval_rule.created", current_user.id, current_user.company_id, rule_id=rule.id)
+    
+    return rule
+
+
+@router.delete("/{rule_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_approval_rule(
+    rule_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """Delete an approval rule (Admin only); expenses already submitted keep their approvers"""
+    rule = db.query(ApprovalRule).filter(ApprovalRule.id == rule_id).first()
+    
+    if not rule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Approval rule not found"
+        )
+    
+    db.delete(rule)
+    invalidate_approval_policy(db, current_user.company_id)
+    db.commit()
+    audit("approval_rule.deleted", current_user.id, current_user.company_id, rule_id=rule_id)
+    
+    return None
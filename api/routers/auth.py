@@ -1,12 +1,16 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from api.database import get_db
 from api.schemas.user import UserCreate, UserResponse
-from api.schemas.token import Token
+from api.schemas.token import Token, RefreshRequest
 from api.models.user import User
-from api.utils.auth import authenticate_user, create_access_token, get_password_hash
+from api.utils.auth import (
+    authenticate_user, create_access_token, create_refresh_token, get_current_user, get_jwks,
+    get_password_hash, revoke_refresh_tokens, revoke_user_tokens, rotate_refresh_token, token_claims
+)
 from api.config import settings
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -16,14 +20,6 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Register a new user"""
-    # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
     # Create new user
     hashed_password = get_password_hash(user_data.password)
     db_user = User(
@@ -35,9 +31,19 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         manager_id=user_data.manager_id
     )
     
+    # The unique index on email does the duplicate check; the INSERT returns id and defaults
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        # Deleted users keep their email until offboarding removes them
+        if db.query(User.id).filter(User.email == user_data.email).execution_options(include_deleted=True).first():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email already registered"
+            )
+        raise
     
     return db_user
 
@@ -58,8 +64,49 @@ def login(
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email, "user_id": user.id, "role": user.role},
+        data=token_claims(user),
         expires_delta=access_token_expires
     )
+    refresh_token = create_refresh_token(db, user)
+    db.commit()
+    
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@router.post("/refresh", response_model=Token)
+def refresh(refresh_data: RefreshRequest, db: Session = Depends(get_db)):
+    """Exchange a refresh token for a new access token (the refresh token rotates)"""
+    rotated = rotate_refresh_token(db, refresh_data.refresh_token)
+    if rotated is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    user, refresh_token = rotated
+    access_token = create_access_token(
+        data=token_claims(user),
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@router.get("/jwks.json")
+def jwks():
+    """Public keys for verifying access tokens (empty for HMAC algorithms)"""
+    return get_jwks()
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Revoke every access and refresh token issued to the current user"""
+    revoke_user_tokens(db, current_user)
+    revoke_refresh_tokens(db, current_user.id)
+    db.commit()
     
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return None
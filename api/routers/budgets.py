@@ -0,0 +1,131 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import and_, case, literal, or_
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime
+from decimal import Decimal
+from api.database import get_db, get_read_db
+from api.log_pipeline import audit
+from api.models.budget import Budget, BudgetBalance, BudgetPeriod
+from api.models.user import User, UserRole
+from api.schemas.budget import BudgetCreate, BudgetUpdate, BudgetResponse
+from api.schemas.token import Principal
+from api.services.budgets import invalidate_budgets, period_start, remove_budget, seed_budget
+from api.utils.auth import get_current_principal, require_role
+
+router = APIRouter(prefix="/budgets", tags=["Budgets"])
+
+
+def budget_response(budget: Budget, balance: Optional[BudgetBalance]) -> BudgetResponse:
+    reserved = balance.reserved if balance else Decimal("0.00")
+    spent = balance.spent if balance else Decimal("0.00")
+    return BudgetResponse(
+        id=budget.id,
+        company_id=budget.company_id,
+        user_id=budget.user_id,
+        category=budget.category,
+        period=budget.period,
+        amount=budget.amount,
+        created_at=budget.created_at,
+        period_start=period_start(budget.period, datetime.utcnow().date()),
+        reserved=reserved,
+        spent=spent,
+        remaining=budget.amount - reserved - spent,
+    )
+
+
+def _get_budget(db: Session, budget_id: int) -> Budget:
+    budget = db.query(Budget).filter(Budget.id == budget_id).first()
+    if not budget:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Budget not found"
+        )
+    return budget
+
+
+def _current_balance(db: Session, budget: Budget) -> Optional[BudgetBalance]:
+    return db.query(BudgetBalance).filter(
+        BudgetBalance.budget_id == budget.id,
+        BudgetBalance.period_start == period_start(budget.period, datetime.utcnow().date())
+    ).first()
+
+
+@router.get("/", response_model=List[BudgetResponse])
+def list_budgets(
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Budgets with their current period's balance: admins see all, others company-wide ones and their own"""
+    # One query: each budget joined to the balance row of its current period
+    today = datetime.utcnow().date()
+    current_start = case(*(
+        (Budget.period == period, literal(period_start(period, today)))
+        for period in BudgetPeriod
+    ))
+    query = db.query(Budget, BudgetBalance).outerjoin(BudgetBalance, and_(
+        BudgetBalance.budget_id == Budget.id,
+        BudgetBalance.period_start == current_start
+    ))
+    if current_user.role != UserRole.ADMIN:
+        query = query.filter(or_(Budget.user_id.is_(None), Budget.user_id == current_user.id))
+    return [budget_response(budget, balance) for budget, balance in query.order_by(Budget.id).all()]
+
+
+@router.post("/", response_model=BudgetResponse, status_code=status.HTTP_201_CREATED)
+def create_budget(
+    budget_data: BudgetCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """Add a budget (Admin only); expenses already submitted this period count against it"""
+    if budget_data.user_id is not None:
+        # Tenant scoping keeps users of other companies out of this lookup
+        if not db.query(User.id).filter(User.id == budget_data.user_id).first():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Budget user must belong to your company"
+            )
+    
+    budget = Budget(**budget_data.model_dump(), company_id=current_user.company_id)
+    db.add(budget)
+    db.flush()
+    seed_budget(db, budget)
+    invalidate_budgets(db, current_user.company_id)
+    db.commit()
+    audit("budget.created", current_user.id, current_user.company_id, budget_id=budget.id, amount=budget.amount)
+    
+    return budget_response(budget, _current_balance(db, budget))
+
+
+@router.put("/{budget_id}", response_model=BudgetResponse)
+def update_budget(
+    budget_id: int,
+    budget_data: BudgetUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """Change a budget's amount (Admin only); balances are kept"""
+    budget = _get_budget(db, budget_id)
+    budget.amount = budget_data.amount
+    invalidate_budgets(db, current_user.company_id)
+    db.commit()
+    audit("budget.updated", current_user.id, current_user.company_id, budget_id=budget.id, amount=budget.amount)
+    
+    return budget_response(budget, _current_balance(db, budget))
+
+
+@router.delete("/{budget_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_budget(
+    budget_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """Delete a budget and its balances (Admin only)"""
+    budget = _get_budget(db, budget_id)
+    remove_budget(db, budget)
+    invalidate_budgets(db, current_user.company_id)
+    db.commit()
+    audit("budget.deleted", current_user.id, current_user.company_id, budget_id=budget_id)
+    
+    return None
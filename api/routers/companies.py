@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List
-from api.database import get_db
+from datetime import datetime
+from api.database import get_db, get_read_db
+from api.log_pipeline import audit
 from api.models.company import Company
+from api.models.offboarding_job import OffboardingKind
 from api.models.user import User, UserRole
 from api.schemas.company import CompanyCreate, CompanyResponse, CompanyUpdate
-from api.utils.auth import get_current_user, require_role
+from api.schemas.offboarding import OffboardingJobResponse
+from api.schemas.token import Principal
+from api.services.offboarding import queue_offboarding, wake_offboarding_worker
+from api.utils.auth import (
+    get_current_principal, require_role, revoke_company_tokens
+)
 
 router = APIRouter(prefix="/companies", tags=["Companies"])
 
@@ -17,18 +26,22 @@ def create_company(
     current_user: User = Depends(require_role([UserRole.ADMIN]))
 ):
     """Create a new company (Admin only)"""
-    # Check if company name already exists
-    existing_company = db.query(Company).filter(Company.name == company_data.name).first()
-    if existing_company:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Company name already exists"
-        )
-    
+    # The unique index on name does the duplicate check (deleted companies keep their name)
     db_company = Company(**company_data.model_dump())
     db.add(db_company)
-    db.commit()
-    db.refresh(db_company)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        existing_company = db.query(Company.id).filter(
+            Company.name == company_data.name
+        ).execution_options(include_deleted=True).first()
+        if existing_company:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Company name already exists"
+            )
+        raise
     
     return db_company
 
@@ -37,8 +50,8 @@ def create_company(
 def list_companies(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """List all companies"""
     # Admins can see all companies, others only see their own
@@ -53,8 +66,8 @@ def list_companies(
 @router.get("/{company_id}", response_model=CompanyResponse)
 def get_company(
     company_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Get a specific company by ID"""
     company = db.query(Company).filter(Company.id == company_id).first()
@@ -97,18 +110,22 @@ def update_company(
         setattr(company, field, value)
     
     db.commit()
-    db.refresh(company)
     
     return company
 
 
-@router.delete("/{company_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{company_id}", response_model=OffboardingJobResponse, status_code=status.HTTP_202_ACCEPTED)
 def delete_company(
     company_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN]))
 ):
-    """Delete a company (Admin only)"""
+    """Delete a company (Admin only)
+    
+    The company is hidden and its users signed out at once; its data is purged by an
+    offboarding job, returned here (poll GET /offboarding/{id} for progress).
+    """
     company = db.query(Company).filter(Company.id == company_id).first()
     
     if not company:
@@ -117,7 +134,12 @@ def delete_company(
             detail="Company not found"
         )
     
-    db.delete(company)
+    company.deleted_at = datetime.utcnow()
+    signed_out = revoke_company_tokens(db, company_id)
+    job = queue_offboarding(db, OffboardingKind.COMPANY, company_id, company_id, current_user.id)
     db.commit()
+    audit("company.deleted", current_user.id, company_id, users_signed_out=signed_out, offboarding_job_id=job.id)
     
-    return None
+    wake_offboarding_worker()
+    response.headers["Location"] = f"/api/offboarding/{job.id}"
+    return job
@@ -1,22 +1,102 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
 from typing import List, Optional
 from datetime import datetime
-from api.database import get_db
+from api import queries
+from api.config import settings
+from api.database import get_db, get_read_db
+from api.log_pipeline import audit
 from api.models.user import User, UserRole
 from api.models.expense import Expense, ExpenseStatus, ExpenseCategory
-from api.schemas.expense import ExpenseCreate, ExpenseResponse, ExpenseUpdate, ExpenseStatusUpdate
-from api.utils.auth import get_current_user
+from api.models.policy_violation import PolicyViolation, ViolationKind
+from api.schemas.expense import (
+    ExpenseCreate, ExpenseResponse, ExpenseDetailResponse, ExpenseUpdate, ExpenseStatusUpdate,
+    ExpenseBatchRequest, ExpenseBatchResponse, PolicyViolationResponse, EXPENSE_FIELDS, sparse_expense_list
+)
+from api.schemas.token import Principal
+from api.utils.auth import get_current_user, get_current_principal, require_principal_role
+from api.utils.batch import batch_ids
+from api.utils.etag import if_match_version, precondition_failed, set_etag
+from api.services.approvals import plan_approval_chain, start_approval
+from api.services.budgets import reserve_expense, release_expense, settle_expense
+from api.services.policy_checks import check_expense, recheck_later_duplicates
 
 router = APIRouter(prefix="/expenses", tags=["Expenses"])
 
 
+def expense_includes(
+    include: Optional[str] = Query(
+        None, description="Comma-separated relations to embed: user, manager, company"
+    )
+) -> frozenset[str]:
+    """Parse ?include=user,manager,company"""
+    if not include:
+        return queries.NO_INCLUDES
+    includes = frozenset(name.strip() for name in include.split(",") if name.strip())
+    unknown = includes - queries.EXPENSE_RELATIONS.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown include: {', '.join(sorted(unknown))}"
+        )
+    return includes
+
+
+def expense_fields(
+    fields: Optional[str] = Query(
+        None, description="Comma-separated expense fields to return (default: all); id is always included"
+    )
+) -> Optional[frozenset[str]]:
+    """Parse ?fields=id,title,amount"""
+    if not fields:
+        return None
+    requested = frozenset(name.strip() for name in fields.split(",") if name.strip()) | {"id"}
+    unknown = requested - EXPENSE_FIELDS
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown field: {', '.join(sorted(unknown))}"
+        )
+    return requested
+
+
+def render_expenses(expenses, fields: Optional[frozenset[str]], includes: frozenset[str]):
+    """Serialize only the requested fields; the full schema is used when none were asked for"""
+    if fields is None:
+        return expenses
+    adapter = sparse_expense_list(fields, includes)
+    return Response(
+        content=adapter.dump_json(adapter.validate_python(expenses)),
+        media_type="application/json",
+    )
+
+
+def charge_budgets(db: Session, expense: Expense) -> None:
+    """Reserve the expense on its budgets; in reject mode an overrun fails the request"""
+    overruns = reserve_expense(db, expense)
+    if overruns and settings.BUDGET_ENFORCEMENT == "reject":
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Over budget: " + "; ".join(overrun.detail for overrun in overruns)
+        )
+
+
+def can_view_expense(current_user: Principal, expense: Expense) -> bool:
+    """Admins see the whole company, managers their own, their subordinates' and those awaiting
+    their approval, employees their own"""
+    if current_user.role == UserRole.ADMIN:
+        return True
+    if current_user.role == UserRole.MANAGER:
+        return current_user.id in (expense.user_id, expense.manager_id, expense.current_approver_id)
+    return expense.user_id == current_user.id
+
+
 @router.post("/", response_model=ExpenseResponse, status_code=status.HTTP_201_CREATED)
 def create_expense(
     expense_data: ExpenseCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Create a new expense"""
     # Create expense with current user's info
@@ -27,59 +107,62 @@ def create_expense(
         manager_id=current_user.manager_id,
         status=ExpenseStatus.PENDING
     )
+    # The company's approval rules decide who approves, and in which order
+    start_approval(
+        db_expense, plan_approval_chain(db, current_user, db_expense.category, db_expense.amount)
+    )
     
+    # The INSERT returns the server defaults (id, submitted_at, ...); no refresh needed
     db.add(db_expense)
+    db.flush()
+    check_expense(db, db_expense)
+    charge_budgets(db, db_expense)
     db.commit()
-    db.refresh(db_expense)
     
     return db_expense
 
 
-@router.get("/", response_model=List[ExpenseResponse])
+@router.get("/", response_model=List[ExpenseDetailResponse])
 def list_expenses(
     skip: int = 0,
     limit: int = 100,
     status_filter: Optional[ExpenseStatus] = None,
     category_filter: Optional[ExpenseCategory] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    include_archived: bool = Query(False, description="Also list expenses moved to the archive"),
+    includes: frozenset[str] = Depends(expense_includes),
+    fields: Optional[frozenset[str]] = Depends(expense_fields),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """List expenses based on user role and filters"""
-    query = db.query(Expense)
-    
-    # Apply role-based filtering
-    if current_user.role == UserRole.ADMIN:
-        # Admins can see all expenses in the system
-        pass
-    elif current_user.role == UserRole.MANAGER:
-        # Managers can see their own expenses and their subordinates' expenses
-        query = query.filter(
-            or_(
-                Expense.user_id == current_user.id,
-                Expense.manager_id == current_user.id
-            )
-        )
-    else:
-        # Employees can only see their own expenses
-        query = query.filter(Expense.user_id == current_user.id)
-    
-    # Apply optional filters
-    if status_filter:
-        query = query.filter(Expense.status == status_filter)
-    
-    if category_filter:
-        query = query.filter(Expense.category == category_filter)
-    
-    expenses = query.offset(skip).limit(limit).all()
-    return expenses
+    # Role-based visibility and filters come from a prebuilt statement
+    # (company scoping is applied by the session)
+    stmt = queries.list_expenses_statement(
+        queries.expense_scope(current_user.role),
+        status_filter is not None,
+        category_filter is not None,
+        includes,
+        fields,
+        include_archived,
+    )
+    expenses = db.scalars(stmt, {
+        "user_id": current_user.id,
+        "status": status_filter,
+        "category": category_filter,
+        "skip": skip,
+        "limit": limit,
+    }).all()
+    return render_expenses(expenses, fields, includes)
 
 
-@router.get("/pending", response_model=List[ExpenseResponse])
+@router.get("/pending", response_model=List[ExpenseDetailResponse])
 def list_pending_expenses(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    includes: frozenset[str] = Depends(expense_includes),
+    fields: Optional[frozenset[str]] = Depends(expense_fields),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """List pending expenses that require approval (for managers)"""
     if current_user.role not in [UserRole.MANAGER, UserRole.ADMIN]:
@@ -88,64 +171,81 @@ def list_pending_expenses(
             detail="Only managers and admins can view pending approvals"
         )
     
-    query = db.query(Expense).filter(Expense.status == ExpenseStatus.PENDING)
-    
-    if current_user.role == UserRole.MANAGER:
-        # Managers only see expenses assigned to them
-        query = query.filter(Expense.manager_id == current_user.id)
-    
-    expenses = query.offset(skip).limit(limit).all()
-    return expenses
+    stmt = queries.pending_expenses_statement(queries.expense_scope(current_user.role), includes, fields)
+    expenses = db.scalars(stmt, {"user_id": current_user.id, "skip": skip, "limit": limit}).all()
+    return render_expenses(expenses, fields, includes)
 
 
 @router.get("/stats")
 def get_expense_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Get expense statistics for the current user"""
-    from sqlalchemy import func
-    
-    # Base query based on role
-    if current_user.role == UserRole.ADMIN:
-        base_query = db.query(Expense)
-    elif current_user.role == UserRole.MANAGER:
-        base_query = db.query(Expense).filter(
-            or_(
-                Expense.user_id == current_user.id,
-                Expense.manager_id == current_user.id
-            )
-        )
-    else:
-        base_query = db.query(Expense).filter(Expense.user_id == current_user.id)
-    
-    # Calculate statistics
-    total_expenses = base_query.count()
-    pending_count = base_query.filter(Expense.status == ExpenseStatus.PENDING).count()
-    approved_count = base_query.filter(Expense.status == ExpenseStatus.APPROVED).count()
-    rejected_count = base_query.filter(Expense.status == ExpenseStatus.REJECTED).count()
-    
-    total_amount = base_query.with_entities(func.sum(Expense.amount)).scalar() or 0
-    approved_amount = base_query.filter(Expense.status == ExpenseStatus.APPROVED).with_entities(func.sum(Expense.amount)).scalar() or 0
+    stmt = queries.expense_stats_statement(queries.expense_scope(current_user.role))
+    stats = db.execute(stmt, {"user_id": current_user.id}).one()
     
     return {
-        "total_expenses": total_expenses,
-        "pending_count": pending_count,
-        "approved_count": approved_count,
-        "rejected_count": rejected_count,
-        "total_amount": float(total_amount),
-        "approved_amount": float(approved_amount)
+        "total_expenses": stats.total_expenses,
+        "pending_count": stats.pending_count,
+        "approved_count": stats.approved_count,
+        "rejected_count": stats.rejected_count,
+        "total_amount": float(stats.total_amount),
+        "approved_amount": float(stats.approved_amount)
     }
 
 
-@router.get("/{expense_id}", response_model=ExpenseResponse)
+@router.post("/batch-get", response_model=ExpenseBatchResponse)
+def batch_get_expenses(
+    batch: ExpenseBatchRequest,
+    includes: frozenset[str] = Depends(expense_includes),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Fetch many expenses by id in one IN query, applying get_expense's permission check per row"""
+    expense_ids = batch_ids(batch.ids)
+    expenses = {
+        expense.id: expense
+        for expense in db.scalars(queries.expenses_by_ids_statement(includes), {"ids": expense_ids})
+    }
+    
+    found, forbidden, missing = [], [], []
+    for expense_id in expense_ids:
+        expense = expenses.get(expense_id)
+        if expense is None:
+            missing.append(expense_id)
+        elif can_view_expense(current_user, expense):
+            found.append(ExpenseDetailResponse.model_validate(expense))
+        else:
+            forbidden.append(expense_id)
+    return ExpenseBatchResponse(found=found, forbidden=forbidden, missing=missing)
+
+
+@router.get("/violations", response_model=List[PolicyViolationResponse])
+def list_policy_violations(
+    skip: int = 0,
+    limit: int = 100,
+    kind: Optional[ViolationKind] = None,
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(require_principal_role([UserRole.ADMIN]))
+):
+    """List policy violations found in the company's expenses (Admin only)"""
+    query = db.query(PolicyViolation)
+    if kind:
+        query = query.filter(PolicyViolation.kind == kind)
+    return query.order_by(PolicyViolation.expense_id.desc()).offset(skip).limit(limit).all()
+
+
+@router.get("/{expense_id}", response_model=ExpenseDetailResponse)
 def get_expense(
     expense_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    includes: frozenset[str] = Depends(expense_includes),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Get a specific expense by ID"""
-    expense = db.query(Expense).filter(Expense.id == expense_id).first()
+    expense = db.scalars(queries.get_expense_statement(includes), {"expense_id": expense_id}).first()
     
     if not expense:
         raise HTTPException(
@@ -154,64 +254,93 @@ def get_expense(
         )
     
     # Check permissions
-    if current_user.role == UserRole.ADMIN:
-        pass  # Admins can view any expense
-    elif current_user.role == UserRole.MANAGER:
-        # Managers can view their own or their subordinates' expenses
-        if expense.user_id != current_user.id and expense.manager_id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not authorized to view this expense"
-            )
-    else:
-        # Employees can only view their own expenses
-        if expense.user_id != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not authorized to view this expense"
-            )
+    if not can_view_expense(current_user, expense):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view this expense"
+        )
     
+    set_etag(response, expense.version)
     return expense
 
 
-@router.put("/{expense_id}", response_model=ExpenseResponse)
-def update_expense(
-    expense_id: int,
-    expense_data: ExpenseUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Update an expense (only if pending and owned by user)"""
+def _existing_expense(db: Session, expense_id: int) -> Expense:
+    """Load an expense after a conditional write matched nothing, to tell the caller why"""
     expense = db.query(Expense).filter(Expense.id == expense_id).first()
-    
     if not expense:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Expense not found"
         )
+    return expense
+
+
+@router.put("/{expense_id}", response_model=ExpenseResponse)
+def update_expense(
+    expense_id: int,
+    expense_data: ExpenseUpdate,
+    response: Response,
+    expected_version: Optional[int] = Depends(if_match_version),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Update an expense (only if pending and owned by user); If-Match makes it conditional"""
+    update_data = expense_data.model_dump(exclude_unset=True)
     
-    # Only the expense owner can update it
-    if expense.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to update this expense"
+    # Ownership, the pending state and the If-Match version are checked by the UPDATE itself
+    if update_data:
+        expense = db.scalar(
+            queries.edit_expense_statement(frozenset(update_data), expected_version is not None),
+            {
+                "expense_id": expense_id,
+                "owner_id": current_user.id,
+                "expected_version": expected_version,
+                **{f"new_{field}": value for field, value in update_data.items()},
+            },
         )
-    
-    # Can only update pending expenses
-    if expense.status != ExpenseStatus.PENDING:
+    else:
+        expense = db.query(Expense).filter(
+            Expense.id == expense_id,
+            Expense.user_id == current_user.id,
+            Expense.status == ExpenseStatus.PENDING,
+        ).first()
+        if expense is not None and expected_version not in (None, expense.version):
+            raise precondition_failed(expense.version)
+    
+    if expense is None:
+        expense = _existing_expense(db, expense_id)
+        # Only the expense owner can update it
+        if expense.user_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to update this expense"
+            )
+        # Someone else changed it since the client read it
+        if expected_version is not None and expense.version != expected_version:
+            raise precondition_failed(expense.version)
+        # Can only update pending expenses
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Can only update pending expenses"
         )
     
-    # Update only provided fields
-    update_data = expense_data.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(expense, field, value)
+    # A new amount or category can need different approvers; approval starts over
+    if "amount" in update_data or "category" in update_data:
+        start_approval(expense, plan_approval_chain(db, current_user, expense.category, expense.amount))
+    
+    if update_data.keys() & {"title", "amount", "category"}:
+        check_expense(db, expense)
+        recheck_later_duplicates(db, expense)
     
+    # Budgets are charged for the new amount and category
+    if "amount" in update_data or "category" in update_data:
+        release_expense(db, expense)
+        charge_budgets(db, expense)
+    
+    # The replanning flush is version-checked too: a decision in between raises StaleDataError (409)
     db.commit()
-    db.refresh(expense)
     
+    set_etag(response, expense.version)
     return expense
 
 
@@ -219,8 +348,10 @@ def update_expense(
 def update_expense_status(
     expense_id: int,
     status_data: ExpenseStatusUpdate,
+    response: Response,
+    expected_version: Optional[int] = Depends(if_match_version),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Approve or reject an expense (managers only)"""
     if current_user.role not in [UserRole.MANAGER, UserRole.ADMIN]:
@@ -229,41 +360,62 @@ def update_expense_status(
             detail="Only managers and admins can approve/reject expenses"
         )
     
-    expense = db.query(Expense).filter(Expense.id == expense_id).first()
-    
-    if not expense:
+    if status_data.status == ExpenseStatus.PENDING:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Expense not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Status must be approved or rejected"
         )
     
-    # Managers can only approve expenses assigned to them
-    if current_user.role == UserRole.MANAGER and expense.manager_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to approve this expense"
-        )
+    # One UPDATE ... RETURNING: only a pending expense waiting on this manager matches,
+    # and the approval chain advances (or the expense is decided) in the same statement
+    as_approver = current_user.role == UserRole.MANAGER
+    expense = db.scalar(
+        queries.decide_expense_statement(
+            status_data.status == ExpenseStatus.APPROVED, as_approver, expected_version is not None
+        ),
+        {
+            "expense_id": expense_id,
+            "approver_id": current_user.id,
+            "expected_version": expected_version,
+            "now": datetime.utcnow(),
+        },
+    )
     
-    # Can only approve/reject pending expenses
-    if expense.status != ExpenseStatus.PENDING:
+    if expense is None:
+        expense = _existing_expense(db, expense_id)
+        # Managers can only decide the approval step that is waiting on them
+        if as_approver and expense.current_approver_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to approve this expense"
+            )
+        if expected_version is not None and expense.version != expected_version:
+            raise precondition_failed(expense.version)
+        # Can only approve/reject pending expenses
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Can only approve/reject pending expenses"
         )
     
-    # Update status and reviewed timestamp
-    expense.status = status_data.status
-    expense.reviewed_at = datetime.utcnow()
-    
+    # A decided expense's budget reservation becomes spending, or is returned
+    if expense.status == ExpenseStatus.APPROVED:
+        settle_expense(db, expense)
+    elif expense.status == ExpenseStatus.REJECTED:
+        release_expense(db, expense)
     db.commit()
-    db.refresh(expense)
+    audit(
+        "expense.decided", current_user.id, expense.company_id, expense_id=expense.id,
+        decision=status_data.status.value, status=expense.status.value, approval_step=expense.approval_step
+    )
     
+    set_etag(response, expense.version)
     return expense
 
 
 @router.delete("/{expense_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_expense(
     expense_id: int,
+    expected_version: Optional[int] = Depends(if_match_version),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -283,6 +435,9 @@ def delete_expense(
             detail="Not authorized to delete this expense"
         )
     
+    if expected_version is not None and expense.version != expected_version:
+        raise precondition_failed(expense.version)
+    
     # Can only delete pending expenses
     if expense.status != ExpenseStatus.PENDING:
         raise HTTPException(
@@ -290,7 +445,10 @@ def delete_expense(
             detail="Can only delete pending expenses"
         )
     
-    db.delete(expense)
+    # Soft delete: the row stays for audit but disappears from every query
+    expense.deleted_at = datetime.utcnow()
+    release_expense(db, expense)
+    recheck_later_duplicates(db, expense)
     db.commit()
     
     return None
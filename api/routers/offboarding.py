@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from api.database import get_read_db
+from api.models.offboarding_job import OffboardingJob, OffboardingStatus
+from api.models.user import UserRole
+from api.schemas.offboarding import OffboardingJobResponse
+from api.schemas.token import Principal
+from api.utils.auth import require_principal_role
+
+router = APIRouter(prefix="/offboarding", tags=["Offboarding"])
+
+
+def _visible_jobs(db: Session, current_user: Principal):
+    """Jobs for the admin's own company, plus any they started (e.g. deleting another company)"""
+    return db.query(OffboardingJob).filter(or_(
+        OffboardingJob.company_id == current_user.company_id,
+        OffboardingJob.requested_by == current_user.id
+    ))
+
+
+@router.get("/", response_model=List[OffboardingJobResponse])
+def list_offboarding_jobs(
+    status_filter: Optional[OffboardingStatus] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(require_principal_role([UserRole.ADMIN]))
+):
+    """List offboarding jobs, newest first (Admin only)"""
+    query = _visible_jobs(db, current_user)
+    if status_filter:
+        query = query.filter(OffboardingJob.status == status_filter)
+    return query.order_by(OffboardingJob.id.desc()).offset(skip).limit(limit).all()
+
+
+@router.get("/{job_id}", response_model=OffboardingJobResponse)
+def get_offboarding_job(
+    job_id: int,
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(require_principal_role([UserRole.ADMIN]))
+):
+    """Progress of a company or user deletion (Admin only)"""
+    job = _visible_jobs(db, current_user).filter(OffboardingJob.id == job_id).first()
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Offboarding job not found"
+        )
+    
+    return job
@@ -0,0 +1,135 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List
+from datetime import datetime
+from api.database import get_db, get_read_db
+from api.log_pipeline import audit
+from api.models.user import User, UserRole
+from api.models.recurring_expense import RecurringExpense
+from api.schemas.recurring_expense import RecurringExpenseCreate, RecurringExpenseUpdate, RecurringExpenseResponse
+from api.schemas.token import Principal
+from api.services.recurring import first_occurrence_from, next_run
+from api.utils.auth import get_current_user, get_current_principal
+
+router = APIRouter(prefix="/recurring-expenses", tags=["Recurring Expenses"])
+
+
+def _get_template(db: Session, template_id: int, current_user: User) -> RecurringExpense:
+    template = db.query(RecurringExpense).filter(RecurringExpense.id == template_id).first()
+    if not template:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recurring expense not found"
+        )
+    
+    # Only admins or the template owner can change it
+    if current_user.role != UserRole.ADMIN and template.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to modify this recurring expense"
+        )
+    return template
+
+
+def _schedule(template: RecurringExpense, resumed: bool) -> None:
+    """Point next_run_on at the next occurrence to generate, or NULL when paused or ended"""
+    if not template.active:
+        template.next_run_on = None
+        return
+    if resumed:
+        # Occurrences that fell while paused are skipped, not caught up
+        today = datetime.utcnow().date()
+        template.occurrences = max(template.occurrences, first_occurrence_from(template.frequency, template.start_on, today))
+    template.next_run_on = next_run(template.frequency, template.start_on, template.end_on, template.occurrences)
+
+
+@router.get("/", response_model=List[RecurringExpenseResponse])
+def list_recurring_expenses(
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Recurring expenses: admins see the company's, others their own"""
+    query = db.query(RecurringExpense)
+    if current_user.role != UserRole.ADMIN:
+        query = query.filter(RecurringExpense.user_id == current_user.id)
+    return query.order_by(RecurringExpense.id).all()
+
+
+@router.post("/", response_model=RecurringExpenseResponse, status_code=status.HTTP_201_CREATED)
+def create_recurring_expense(
+    template_data: RecurringExpenseCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Add a recurring expense for the current user; the first occurrence is start_on (default today)"""
+    today = datetime.utcnow().date()
+    start_on = template_data.start_on or today
+    if start_on < today:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_on cannot be in the past"
+        )
+    if template_data.end_on is not None and template_data.end_on < start_on:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_on cannot be before start_on"
+        )
+    
+    template = RecurringExpense(
+        **template_data.model_dump(exclude={"start_on"}),
+        start_on=start_on,
+        next_run_on=start_on,
+        user_id=current_user.id,
+        company_id=current_user.company_id
+    )
+    db.add(template)
+    db.commit()
+    audit("recurring_expense.created", current_user.id, current_user.company_id, recurring_id=template.id)
+    
+    return template
+
+
+@router.put("/{template_id}", response_model=RecurringExpenseResponse)
+def update_recurring_expense(
+    template_id: int,
+    template_data: RecurringExpenseUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Change, pause or resume a recurring expense; expenses already generated are kept"""
+    template = _get_template(db, template_id, current_user)
+    # Only description and end_on can be cleared with null
+    update_data = {
+        field: value for field, value in template_data.model_dump(exclude_unset=True).items()
+        if value is not None or field in ("description", "end_on")
+    }
+    if update_data.get("end_on") is not None and update_data["end_on"] < template.start_on:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_on cannot be before start_on"
+        )
+    
+    was_active = template.active
+    for field, value in update_data.items():
+        setattr(template, field, value)
+    if "active" in update_data or "end_on" in update_data:
+        _schedule(template, resumed=template.active and not was_active)
+    db.commit()
+    audit("recurring_expense.updated", current_user.id, current_user.company_id, recurring_id=template.id)
+    
+    return template
+
+
+@router.delete("/{template_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_recurring_expense(
+    template_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Delete a recurring expense; expenses already generated are kept"""
+    template = _get_template(db, template_id, current_user)
+    db.delete(template)
+    db.commit()
+    audit("recurring_expense.deleted", current_user.id, current_user.company_id, recurring_id=template_id)
+    
+    return None
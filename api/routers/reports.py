@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import FileResponse
+from typing import Optional
+from api.models.user import UserRole
+from api.schemas.token import Principal
+from api.services.reports import (
+    COMPANY_REPORT, REPORT_FORMATS, manager_report_name, parse_month, report_path
+)
+from api.utils.auth import require_principal_role
+
+router = APIRouter(prefix="/reports", tags=["Reports"])
+
+
+def _serve(company_id: int, month: str, name: str, fmt: str) -> FileResponse:
+    """Send a pre-rendered report file straight from disk"""
+    try:
+        period = parse_month(month)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Month must look like 2026-10"
+        )
+    
+    path = report_path(company_id, period, name, fmt)
+    if not path.is_file():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Report not generated yet"
+        )
+    return FileResponse(path, media_type=REPORT_FORMATS[fmt], filename=f"{name}-{month}.{fmt}")
+
+
+@router.get("/{month}/company")
+def get_company_report(
+    month: str,
+    fmt: str = Query("json", alias="format", pattern="^(json|csv)$"),
+    current_user: Principal = Depends(require_principal_role([UserRole.ADMIN]))
+):
+    """Monthly report for the whole company (Admin only)"""
+    return _serve(current_user.company_id, month, COMPANY_REPORT, fmt)
+
+
+@router.get("/{month}/manager")
+def get_manager_report(
+    month: str,
+    fmt: str = Query("json", alias="format", pattern="^(json|csv)$"),
+    manager_id: Optional[int] = None,
+    current_user: Principal = Depends(require_principal_role([UserRole.MANAGER, UserRole.ADMIN]))
+):
+    """Monthly report for a manager's team; managers get their own, admins may pick a manager"""
+    if manager_id is None or current_user.role != UserRole.ADMIN:
+        manager_id = current_user.id
+    return _serve(current_user.company_id, month, manager_report_name(manager_id), fmt)
@@ -1,14 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from datetime import datetime
 from sqlalchemy.orm import Session
-from typing import List
-from api.database import get_db
+from typing import List, Optional
+from api.database import get_db, get_read_db
+from api.log_pipeline import audit
+from api.models.offboarding_job import OffboardingKind
 from api.models.user import User, UserRole
-from api.schemas.user import UserCreate, UserResponse, UserUpdate
-from api.utils.auth import get_current_user, get_password_hash, require_role
+from api.schemas.user import UserCreate, UserResponse, UserUpdate, UserBatchRequest, UserBatchResponse
+from api.schemas.offboarding import OffboardingJobResponse
+from api.schemas.token import Principal
+from api.services.offboarding import queue_offboarding, wake_offboarding_worker
+from api.utils.auth import (
+    get_current_user, get_current_principal, get_password_hash, require_role, require_principal_role,
+    revoke_refresh_tokens, revoke_user_tokens
+)
+from api.utils.batch import batch_ids
+from api.utils.etag import if_match_version, precondition_failed, set_etag
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
+def can_view_user(current_user: Principal, user: User) -> bool:
+    """Admins see anyone, managers their company, everyone else only themselves"""
+    if current_user.role == UserRole.ADMIN:
+        return True
+    if current_user.role == UserRole.MANAGER and user.company_id == current_user.company_id:
+        return True
+    return user.id == current_user.id
+
+
 @router.get("/me", response_model=UserResponse)
 def get_current_user_profile(current_user: User = Depends(get_current_user)):
     """Get current user's profile"""
@@ -19,28 +39,50 @@ def get_current_user_profile(current_user: User = Depends(get_current_user)):
 def list_users(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """List users based on role permissions"""
     if current_user.role == UserRole.ADMIN:
-        # Admins can see all users
+        # Admins can see all users in their company
         users = db.query(User).offset(skip).limit(limit).all()
     elif current_user.role == UserRole.MANAGER:
         # Managers can see users in their company
         users = db.query(User).filter(User.company_id == current_user.company_id).offset(skip).limit(limit).all()
     else:
         # Employees can only see themselves
-        users = [current_user]
+        users = db.query(User).filter(User.id == current_user.id).all()
     
     return users
 
 
+@router.post("/batch-get", response_model=UserBatchResponse)
+def batch_get_users(
+    batch: UserBatchRequest,
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Fetch many users by id in one IN query, applying get_user's permission check per row"""
+    user_ids = batch_ids(batch.ids)
+    users = {user.id: user for user in db.query(User).filter(User.id.in_(user_ids)).all()}
+    found, forbidden, missing = [], [], []
+    for user_id in user_ids:
+        user = users.get(user_id)
+        if user is None:
+            missing.append(user_id)
+        elif can_view_user(current_user, user):
+            found.append(UserResponse.model_validate(user))
+        else:
+            forbidden.append(user_id)
+    return UserBatchResponse(found=found, forbidden=forbidden, missing=missing)
+
+
 @router.get("/{user_id}", response_model=UserResponse)
 def get_user(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Get a specific user by ID"""
     user = db.query(User).filter(User.id == user_id).first()
@@ -52,25 +94,20 @@ def get_user(
         )
     
     # Check permissions
-    if current_user.role == UserRole.ADMIN:
-        pass  # Admins can view anyone
-    elif current_user.role == UserRole.MANAGER and user.company_id == current_user.company_id:
-        pass  # Managers can view users in their company
-    elif current_user.id == user_id:
-        pass  # Users can view themselves
-    else:
+    if not can_view_user(current_user, user):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view this user"
         )
     
+    set_etag(response, user.version)
     return user
 
 
 @router.get("/subordinates/list", response_model=List[UserResponse])
 def get_subordinates(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.MANAGER, UserRole.ADMIN]))
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(require_principal_role([UserRole.MANAGER, UserRole.ADMIN]))
 ):
     """Get list of subordinates for a manager"""
     subordinates = db.query(User).filter(User.manager_id == current_user.id).all()
@@ -81,8 +118,10 @@ def get_subordinates(
 def update_user(
     user_id: int,
     user_data: UserUpdate,
+    response: Response,
+    expected_version: Optional[int] = Depends(if_match_version),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Update a user"""
     user = db.query(User).filter(User.id == user_id).first()
@@ -109,29 +148,52 @@ def update_user(
             detail="Not authorized to update this user"
         )
     
+    if expected_version is not None and user.version != expected_version:
+        raise precondition_failed(user.version)
+    
     # Update only provided fields
     update_data = user_data.model_dump(exclude_unset=True)
+    changed = sorted(
+        field for field, value in update_data.items()
+        if field == "password" or value != getattr(user, field)
+    )
+    
+    # Tokens embed email, role and manager; changing those (or the password) revokes them
+    if update_data.get("password") or any(
+        field in update_data and update_data[field] != getattr(user, field)
+        for field in ("email", "role", "manager_id")
+    ):
+        revoke_user_tokens(db, user)
     
     # Handle password separately
     if "password" in update_data and update_data["password"]:
         update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
+        revoke_refresh_tokens(db, user.id)
     
     for field, value in update_data.items():
         setattr(user, field, value)
     
+    # Version-checked flush: a concurrent update of this user raises StaleDataError (409)
     db.commit()
-    db.refresh(user)
+    if changed:
+        audit("user.updated", current_user.id, user.company_id, user_id=user.id, fields=changed)
     
+    set_etag(response, user.version)
     return user
 
 
-@router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{user_id}", response_model=OffboardingJobResponse, status_code=status.HTTP_202_ACCEPTED)
 def delete_user(
     user_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN]))
 ):
-    """Delete a user (Admin only)"""
+    """Delete a user (Admin only)
+    
+    The user is hidden and signed out at once; their expenses and tokens are purged,
+    and references to them cleared, by the returned offboarding job.
+    """
     user = db.query(User).filter(User.id == user_id).first()
     
     if not user:
@@ -146,7 +208,13 @@ def delete_user(
             detail="Cannot delete yourself"
         )
     
-    db.delete(user)
+    user.deleted_at = datetime.utcnow()
+    revoke_user_tokens(db, user)
+    revoke_refresh_tokens(db, user.id)
+    job = queue_offboarding(db, OffboardingKind.USER, user.id, user.company_id, current_user.id)
     db.commit()
+    audit("user.deleted", current_user.id, user.company_id, user_id=user.id, offboarding_job_id=job.id)
     
-    return None
+    wake_offboarding_worker()
+    response.headers["Location"] = f"/api/offboarding/{job.id}"
+    return job
@@ -1,11 +1,23 @@
-from .company import CompanyCreate, CompanyResponse, CompanyUpdate
-from .user import UserCreate, UserResponse, UserUpdate, UserLogin
-from .expense import ExpenseCreate, ExpenseResponse, ExpenseUpdate, ExpenseStatusUpdate
-from .token import Token, TokenData
+from .company import CompanyCreate, CompanyResponse, CompanyUpdate, CompanySummary
+from .user import UserCreate, UserResponse, UserUpdate, UserLogin, UserSummary, UserBatchRequest, UserBatchResponse
+from .expense import (
+    ExpenseCreate, ExpenseResponse, ExpenseUpdate, ExpenseStatusUpdate, ExpenseDetailResponse,
+    ExpenseBatchRequest, ExpenseBatchResponse, PolicyViolationResponse
+)
+from .approval_rule import ApprovalRuleCreate, ApprovalRuleResponse
+from .token import Token, TokenData, Principal, RefreshRequest
+from .offboarding import OffboardingJobResponse
+from .budget import BudgetCreate, BudgetUpdate, BudgetResponse
+from .recurring_expense import RecurringExpenseCreate, RecurringExpenseUpdate, RecurringExpenseResponse
 
 __all__ = [
-    "CompanyCreate", "CompanyResponse", "CompanyUpdate",
-    "UserCreate", "UserResponse", "UserUpdate", "UserLogin",
-    "ExpenseCreate", "ExpenseResponse", "ExpenseUpdate", "ExpenseStatusUpdate",
-    "Token", "TokenData"
+    "CompanyCreate", "CompanyResponse", "CompanyUpdate", "CompanySummary",
+    "UserCreate", "UserResponse", "UserUpdate", "UserLogin", "UserSummary", "UserBatchRequest", "UserBatchResponse",
+    "ExpenseCreate", "ExpenseResponse", "ExpenseUpdate", "ExpenseStatusUpdate", "ExpenseDetailResponse",
+    "ExpenseBatchRequest", "ExpenseBatchResponse", "PolicyViolationResponse",
+    "ApprovalRuleCreate", "ApprovalRuleResponse",
+    "Token", "TokenData", "Principal", "RefreshRequest",
+    "OffboardingJobResponse",
+    "BudgetCreate", "BudgetUpdate", "BudgetResponse",
+    "RecurringExpenseCreate", "RecurringExpenseUpdate", "RecurringExpenseResponse"
 ]
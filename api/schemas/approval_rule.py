@@ -0,0 +1,37 @@
+from pydantic import BaseModel, ConfigDict, model_validator
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+from ..models.approval_rule import ApproverType
+from ..models.expense import ExpenseCategory
+
+# Deepest manager_chain step a rule may ask for (each level is one lookup per submission)
+MAX_MANAGER_LEVEL = 10
+
+
+class ApprovalRuleBase(BaseModel):
+    category: Optional[ExpenseCategory] = None
+    min_amount: Decimal = Decimal(0)
+    approver_type: ApproverType
+    manager_level: Optional[int] = None
+    approver_id: Optional[int] = None
+
+
+class ApprovalRuleCreate(ApprovalRuleBase):
+    @model_validator(mode="after")
+    def check_approver(self):
+        if self.approver_type == ApproverType.MANAGER_CHAIN and (self.manager_level or 0) < 1:
+            raise ValueError("manager_chain rules need manager_level >= 1")
+        if self.approver_type == ApproverType.MANAGER_CHAIN and self.manager_level > MAX_MANAGER_LEVEL:
+            raise ValueError(f"manager_level cannot exceed {MAX_MANAGER_LEVEL}")
+        if self.approver_type == ApproverType.USER and self.approver_id is None:
+            raise ValueError("user rules need approver_id")
+        return self
+
+
+class ApprovalRuleResponse(ApprovalRuleBase):
+    id: int
+    company_id: int
+    created_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True)
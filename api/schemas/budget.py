@@ -0,0 +1,34 @@
+from pydantic import BaseModel, ConfigDict, Field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+from ..models.budget import BudgetPeriod
+from ..models.expense import ExpenseCategory
+
+
+class BudgetBase(BaseModel):
+    user_id: Optional[int] = None  # None applies to every user
+    category: Optional[ExpenseCategory] = None  # None applies to every category
+    period: BudgetPeriod = BudgetPeriod.MONTHLY
+    amount: Decimal = Field(gt=0)
+
+
+class BudgetCreate(BudgetBase):
+    pass
+
+
+class BudgetUpdate(BaseModel):
+    amount: Decimal = Field(gt=0)
+
+
+class BudgetResponse(BudgetBase):
+    """A budget with its current period's balance"""
+    id: int
+    company_id: int
+    created_at: datetime
+    period_start: date
+    reserved: Decimal = Decimal(0)
+    spent: Decimal = Decimal(0)
+    remaining: Decimal
+    
+    model_config = ConfigDict(from_attributes=True)
@@ -22,3 +22,12 @@ class CompanyResponse(CompanyBase):
     created_at: datetime
     
     model_config = ConfigDict(from_attributes=True)
+
+
+class CompanySummary(BaseModel):
+    """Compact company embedded in other responses"""
+    id: int
+    name: str
+    currency: str
+    
+    model_config = ConfigDict(from_attributes=True)
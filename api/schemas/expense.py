@@ -1,8 +1,12 @@
-from pydantic import BaseModel, ConfigDict
-from datetime import datetime
+from functools import lru_cache
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+from datetime import date, datetime
 from ..models.expense import ExpenseStatus, ExpenseCategory
+from ..models.policy_violation import ViolationKind
+from .user import UserSummary
+from .company import CompanySummary
 from decimal import Decimal
-from typing import Optional
+from typing import List, Optional
 
 
 class ExpenseBase(BaseModel):
@@ -35,8 +39,63 @@ class ExpenseResponse(ExpenseBase):
     user_id: int
     company_id: int
     manager_id: Optional[int] = None
+    current_approver_id: Optional[int] = None
+    approval_chain: List[int] = []
+    approval_step: int = 0
     submitted_at: datetime
     reviewed_at: Optional[datetime] = None
     created_at: datetime
+    version: int
+    recurring_id: Optional[int] = None  # Template this expense was generated from
+    occurrence_on: Optional[date] = None
     
     model_config = ConfigDict(from_attributes=True)
+
+
+class ExpenseDetailResponse(ExpenseResponse):
+    """Expense with the relations requested through ?include= (null when not requested)"""
+    user: Optional[UserSummary] = None
+    manager: Optional[UserSummary] = None
+    company: Optional[CompanySummary] = None
+
+
+class ExpenseBatchRequest(BaseModel):
+    ids: List[int]
+
+
+class ExpenseBatchResponse(BaseModel):
+    """Result of POST /expenses/batch-get: visible expenses, plus ids that are not visible or do not exist"""
+    found: List[ExpenseDetailResponse]
+    forbidden: List[int]
+    missing: List[int]
+
+
+class PolicyViolationResponse(BaseModel):
+    id: int
+    expense_id: int
+    kind: ViolationKind
+    related_expense_id: Optional[int] = None
+    detail: str
+    created_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+# Expense columns a client can select with ?fields=
+EXPENSE_FIELDS = frozenset(ExpenseResponse.model_fields)
+
+
+@lru_cache(maxsize=256)
+def sparse_expense_list(fields: frozenset[str], includes: frozenset[str]) -> TypeAdapter:
+    """List serializer for just the requested fields and relations, built once per combination"""
+    definitions = {
+        name: (info.annotation, info)
+        for name, info in ExpenseDetailResponse.model_fields.items()
+        if name in fields or name in includes
+    }
+    model = create_model(
+        "SparseExpenseResponse",
+        __config__=ConfigDict(from_attributes=True),
+        **definitions,
+    )
+    return TypeAdapter(List[model])
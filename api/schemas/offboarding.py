@@ -0,0 +1,21 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Dict, Optional
+from datetime import datetime
+from ..models.offboarding_job import OffboardingKind, OffboardingStatus
+
+
+class OffboardingJobResponse(BaseModel):
+    id: int
+    kind: OffboardingKind
+    target_id: int
+    company_id: int
+    status: OffboardingStatus
+    current_step: Optional[str] = None
+    progress: Dict[str, int] = {}
+    deleted_rows: int = 0
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,40 @@
+from pydantic import BaseModel, ConfigDict, Field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+from ..models.expense import ExpenseCategory
+from ..models.recurring_expense import RecurrenceFrequency
+
+
+class RecurringExpenseBase(BaseModel):
+    title: str = Field(min_length=1)
+    amount: Decimal = Field(gt=0)
+    category: ExpenseCategory
+    description: Optional[str] = None
+    frequency: RecurrenceFrequency = RecurrenceFrequency.MONTHLY
+    end_on: Optional[date] = None
+
+
+class RecurringExpenseCreate(RecurringExpenseBase):
+    start_on: Optional[date] = None  # None = today
+
+
+class RecurringExpenseUpdate(BaseModel):
+    title: Optional[str] = Field(default=None, min_length=1)
+    amount: Optional[Decimal] = Field(default=None, gt=0)
+    description: Optional[str] = None
+    end_on: Optional[date] = None
+    active: Optional[bool] = None
+
+
+class RecurringExpenseResponse(RecurringExpenseBase):
+    id: int
+    company_id: int
+    user_id: int
+    start_on: date
+    active: bool
+    occurrences: int
+    next_run_on: Optional[date] = None
+    created_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True)
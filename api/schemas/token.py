@@ -1,13 +1,29 @@
 from pydantic import BaseModel
 from typing import Optional
+from ..models.user import UserRole
 
 
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
     email: Optional[str] = None
     user_id: Optional[int] = None
     role: Optional[str] = None
+
+
+class Principal(BaseModel):
+    """The authenticated caller, built from verified token claims without a DB lookup"""
+    id: int
+    email: str
+    role: UserRole
+    company_id: int
+    manager_id: Optional[int] = None
+    token_version: int = 0
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, EmailStr, ConfigDict
 from datetime import datetime
 from ..models.user import UserRole
-from typing import Optional
+from typing import List, Optional
 
 
 class UserBase(BaseModel):
@@ -34,5 +34,26 @@ class UserResponse(UserBase):
     company_id: int
     manager_id: Optional[int] = None
     created_at: datetime
+    version: int
     
     model_config = ConfigDict(from_attributes=True)
+
+
+class UserSummary(BaseModel):
+    """Compact user embedded in other responses"""
+    id: int
+    full_name: str
+    email: EmailStr
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class UserBatchRequest(BaseModel):
+    ids: List[int]
+
+
+class UserBatchResponse(BaseModel):
+    """Result of POST /users/batch-get: visible users, plus ids that are not visible or do not exist"""
+    found: List[UserResponse]
+    forbidden: List[int]
+    missing: List[int]
@@ -0,0 +1,80 @@
+"""
+Production server entry point
+
+    python -m api.server [--workers N] [--host H] [--port P]
+
+Runs uvicorn with one worker process per available CPU (SERVER_WORKERS=0), uvloop and
+httptools when installed (uvicorn[standard]), and no reloader. Each worker imports the
+app itself and creates its engines in its own lifespan, so no pooled connection is
+shared between processes. On SIGTERM/SIGINT a worker stops accepting connections, lets
+in-flight requests finish for up to SERVER_GRACEFUL_TIMEOUT_SECONDS, then runs the
+lifespan shutdown, which closes the pools.
+"""
+import argparse
+import importlib.util
+import os
+from typing import Optional
+import uvicorn
+from api.config import settings
+
+APP = "api.main:app"
+
+
+def _cgroup_cpu_limit() -> Optional[int]:
+    """CPUs allowed by a cgroup v2 quota (containers), None when unlimited or unknown"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+    except (OSError, ValueError):
+        return None
+    if quota == "max":
+        return None
+    return max(1, -(-int(quota) // int(period)))
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on: affinity mask, capped by the container's quota"""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    return min(count, limit) if limit else count
+
+
+def worker_count(configured: int = 0) -> int:
+    return configured if configured > 0 else available_cpus()
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def server_config(workers: int, host: str, port: int) -> dict:
+    """Keyword arguments for uvicorn.run"""
+    return {
+        "host": host,
+        "port": port,
+        "workers": workers,
+        # Fall back to the pure-Python implementations when uvicorn[standard] is not installed
+        "loop": "uvloop" if _installed("uvloop") else "asyncio",
+        "http": "httptools" if _installed("httptools") else "h11",
+        "timeout_keep_alive": settings.SERVER_KEEPALIVE_SECONDS,
+        "timeout_graceful_shutdown": settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        "proxy_headers": True,
+        "access_log": False,
+        "reload": False,
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the API with production settings")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS, help="0 = one per CPU")
+    args = parser.parse_args(argv)
+    uvicorn.run(APP, **server_config(worker_count(args.workers), args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+from .partitioning import partition_expenses_by_company, add_company_partition
+from .archival import archive_reviewed_expenses
+from .approvals import ApprovalPolicy, get_approval_policy, invalidate_approval_policy, plan_approval_chain
+from .policy_checks import check_expense, recheck_later_duplicates, scan_policy_violations
+from .reports import generate_company_reports, generate_monthly_reports
+from .offboarding import (
+    queue_offboarding, run_offboarding_job, run_pending_offboarding, claim_offboarding_job,
+    wake_offboarding_worker, start_offboarding_worker, stop_offboarding_worker,
+)
+from .budgets import company_budgets, invalidate_budgets, reserve_expense, release_expense, settle_expense
+from .recurring import generate_recurring_expenses
+from .analytics_export import export_expenses
+
+__all__ = [
+    "partition_expenses_by_company",
+    "add_company_partition",
+    "archive_reviewed_expenses",
+    "ApprovalPolicy",
+    "get_approval_policy",
+    "invalidate_approval_policy",
+    "plan_approval_chain",
+    "check_expense",
+    "recheck_later_duplicates",
+    "scan_policy_violations",
+    "generate_company_reports",
+    "generate_monthly_reports",
+    "queue_offboarding",
+    "run_offboarding_job",
+    "run_pending_offboarding",
+    "claim_offboarding_job",
+    "wake_offboarding_worker",
+    "start_offboarding_worker",
+    "stop_offboarding_worker",
+    "company_budgets",
+    "invalidate_budgets",
+    "reserve_expense",
+    "release_expense",
+    "settle_expense",
+    "generate_recurring_expenses",
+    "export_expenses"
+]
@@ -0,0 +1,215 @@
+"""
+Incremental analytics export of expenses (Parquet, needs pyarrow)
+
+Each run writes only the expenses changed since the previous run, found through the
+indexed updated_at column, as Parquet files partitioned like a Hive table:
+
+    EXPORT_DIR/expenses/company_id=3/month=2026-10/part-20261019T020000000000.parquet
+
+month is taken from submitted_at, so an expense always lands in the same partition.
+A changed expense is written again in full; the `op` column is "delete" when it was
+deleted (a tombstone) and "upsert" otherwise. Consumers keep the row with the highest
+version per id. Purged companies and users (offboarding jobs) are written as scope
+tombstones under expenses/_purges/.
+
+The run covers [watermark, now - EXPORT_SETTLE_SECONDS) by the database clock; the
+lag lets transactions that were still open at the previous run commit first. The
+new watermark is saved in expenses/_watermark.json only after every file is
+written, so a failed run is repeated (consumers dedupe the overlap). Rows are
+streamed EXPORT_CHUNK_SIZE at a time, one row group each, so memory stays constant
+however much changed.
+"""
+import json
+import os
+from itertools import groupby
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+from sqlalchemy import select, func
+from sqlalchemy.engine import Engine
+from api.config import settings
+from api.models.expense import Expense
+from api.models.offboarding_job import OffboardingJob, OffboardingKind
+
+EXPORT_NAME = "expenses"
+WATERMARK = "_watermark.json"
+
+
+class ExportResult(NamedTuple):
+    rows: int
+    tombstones: int
+    files: int
+    watermark: datetime
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as exc:  # pragma: no cover
+        raise RuntimeError("The analytics export requires the 'pyarrow' package") from exc
+    return pyarrow
+
+
+def _expense_schema(pa):
+    timestamp = pa.timestamp("us", tz="UTC")
+    return pa.schema([
+        ("id", pa.int64()),
+        ("company_id", pa.int64()),
+        ("user_id", pa.int64()),
+        ("manager_id", pa.int64()),
+        ("title", pa.string()),
+        ("amount", pa.decimal128(10, 2)),
+        ("category", pa.string()),
+        ("description", pa.string()),
+        ("receipt_url", pa.string()),
+        ("status", pa.string()),
+        ("approval_chain", pa.list_(pa.int64())),
+        ("approval_step", pa.int32()),
+        ("current_approver_id", pa.int64()),
+        ("recurring_id", pa.int64()),
+        ("occurrence_on", pa.date32()),
+        ("submitted_at", timestamp),
+        ("reviewed_at", timestamp),
+        ("created_at", timestamp),
+        ("updated_at", timestamp),
+        ("deleted_at", timestamp),
+        ("version", pa.int64()),
+        ("op", pa.string()),
+    ])
+
+
+def _purge_schema(pa):
+    return pa.schema([
+        ("scope", pa.string()),
+        ("company_id", pa.int64()),
+        ("user_id", pa.int64()),
+        ("deleted_at", pa.timestamp("us", tz="UTC")),
+    ])
+
+
+def read_watermark(root: Path) -> Optional[datetime]:
+    path = root / WATERMARK
+    if not path.exists():
+        return None
+    return datetime.fromisoformat(json.loads(path.read_text())["updated_before"])
+
+
+def _write_watermark(root: Path, watermark: datetime, result: dict) -> None:
+    tmp = root / (WATERMARK + ".tmp")
+    tmp.write_text(json.dumps({"updated_before": watermark.isoformat(), **result}))
+    os.replace(tmp, root / WATERMARK)
+
+
+class _PartitionWriter:
+    """One Parquet file at a time, renamed into place when complete"""
+
+    def __init__(self, pa, schema, stamp: str):
+        self.pa, self.schema, self.stamp = pa, schema, stamp
+        self.key, self.writer, self.path, self.files = None, None, None, 0
+
+    def write(self, key: tuple, directory: Path, columns: dict) -> None:
+        if key != self.key:
+            self.close()
+            directory.mkdir(parents=True, exist_ok=True)
+            self.key, self.path = key, directory / f"part-{self.stamp}.parquet"
+            self.writer = self.pa.parquet.ParquetWriter(str(self.path) + ".tmp", self.schema)
+        self.writer.write_table(self.pa.Table.from_pydict(columns, schema=self.schema))
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            os.replace(str(self.path) + ".tmp", self.path)
+            self.files += 1
+        self.key, self.writer = None, None
+
+    def abort(self) -> None:
+        """Drop the file being written, so a failed run leaves no partial part behind"""
+        if self.writer is not None:
+            self.writer.close()
+            os.remove(str(self.path) + ".tmp")
+        self.key, self.writer = None, None
+
+
+def _changed_expenses(conn, low: Optional[datetime], high: datetime, chunk_size: int) -> Iterator[list]:
+    """Chunks of changed rows, ordered so each partition's rows are contiguous"""
+    table = Expense.__table__
+    # Core on purpose: soft-deleted rows are exported as tombstones
+    stmt = select(table).where(table.c.updated_at < high)
+    if low is not None:
+        stmt = stmt.where(table.c.updated_at >= low)
+    stmt = stmt.order_by(table.c.company_id, table.c.submitted_at, table.c.id)
+    result = conn.execution_options(yield_per=chunk_size).execute(stmt)
+    for rows in result.partitions():
+        yield rows
+
+
+def _partition(row) -> tuple[int, int, int]:
+    return row.company_id, row.submitted_at.year, row.submitted_at.month
+
+
+def _columns(rows: list) -> dict:
+    """Row tuples to column lists (rows are in the order of Expense.__table__.columns)"""
+    columns = dict(zip(Expense.__table__.columns.keys(), map(list, zip(*rows))))
+    columns["category"] = [category.value for category in columns["category"]]
+    columns["status"] = [status.value for status in columns["status"]]
+    columns["op"] = ["upsert" if deleted_at is None else "delete" for deleted_at in columns["deleted_at"]]
+    return columns
+
+
+def _export_purges(conn, pa, root: Path, low: Optional[datetime], high: datetime, stamp: str) -> int:
+    jobs = OffboardingJob.__table__
+    stmt = select(jobs.c.kind, jobs.c.target_id, jobs.c.company_id, jobs.c.created_at).where(jobs.c.created_at < high)
+    if low is not None:
+        stmt = stmt.where(jobs.c.created_at >= low)
+    rows = conn.execute(stmt.order_by(jobs.c.id)).all()
+    if not rows:
+        return 0
+    schema = _purge_schema(pa)
+    table = pa.Table.from_pydict({
+        "scope": [row.kind.value for row in rows],
+        "company_id": [row.company_id for row in rows],
+        "user_id": [row.target_id if row.kind == OffboardingKind.USER else None for row in rows],
+        "deleted_at": [row.created_at for row in rows],
+    }, schema=schema)
+    directory = root / "_purges"
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"part-{stamp}.parquet"
+    pa.parquet.write_table(table, str(path) + ".tmp")
+    os.replace(str(path) + ".tmp", path)
+    return len(rows)
+
+
+def export_expenses(engine: Engine, export_dir: Optional[str] = None, chunk_size: Optional[int] = None) -> ExportResult:
+    """Write the expenses changed since the last run; returns what was written"""
+    pa = _pyarrow()
+    root = Path(export_dir or settings.EXPORT_DIR) / EXPORT_NAME
+    root.mkdir(parents=True, exist_ok=True)
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    low = read_watermark(root)
+    schema = _expense_schema(pa)
+
+    rows = tombstones = 0
+    with engine.connect() as conn:
+        # The database clock, as updated_at is set by the database
+        high = conn.scalar(select(func.now())) - timedelta(seconds=settings.EXPORT_SETTLE_SECONDS)
+        if low is not None and high <= low:
+            return ExportResult(0, 0, 0, low)
+        stamp = f"{high:%Y%m%dT%H%M%S%f}"
+        writer = _PartitionWriter(pa, schema, stamp)
+        try:
+            for chunk in _changed_expenses(conn, low, high, chunk_size):
+                # Split the chunk where the partition changes
+                for (company_id, year, month), part in groupby(chunk, key=_partition):
+                    directory = root / f"company_id={company_id}" / f"month={year:04d}-{month:02d}"
+                    writer.write((company_id, year, month), directory, _columns(list(part)))
+                rows += len(chunk)
+                tombstones += sum(row.deleted_at is not None for row in chunk)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+        tombstones += _export_purges(conn, pa, root, low, high, stamp)
+
+    _write_watermark(root, high, {"rows": rows, "tombstones": tombstones})
+    return ExportResult(rows, tombstones, writer.files, high)
@@ -0,0 +1,140 @@
+"""
+Approval workflows
+
+A company's approval rules are compiled into an ApprovalPolicy: per category, a
+sorted list of amount thresholds and the steps required at each threshold, so
+picking the steps for a submission is a dict lookup plus a bisect. Policies are
+cached per company, dropped when the company's rules change and reloaded after
+APPROVAL_POLICY_TTL_SECONDS so other workers pick up changes too.
+"""
+import time
+from bisect import bisect_right
+from decimal import Decimal
+from typing import Iterable, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from api.config import settings
+from api.models.approval_rule import ApprovalRule, ApproverType
+from api.models.expense import Expense, ExpenseCategory
+from api.models.user import User
+from api.schemas.approval_rule import MAX_MANAGER_LEVEL
+from api.schemas.token import Principal
+
+# A step is (ApproverType.MANAGER_CHAIN, level) or (ApproverType.USER, user_id)
+Step = tuple[ApproverType, int]
+
+_policies: dict[int, tuple[float, "ApprovalPolicy"]] = {}
+
+
+class ApprovalPolicy:
+    """Compiled approval rules of one company"""
+
+    def __init__(self, rules: Iterable[ApprovalRule]):
+        rules = sorted(rules, key=lambda rule: (rule.min_amount, rule.id))
+        categories = {rule.category for rule in rules if rule.category is not None}
+        # None holds the rules for categories without specific rules
+        self._table: dict[Optional[ExpenseCategory], tuple[list[Decimal], list[tuple[Step, ...]]]] = {
+            category: self._compile([rule for rule in rules if rule.category in (None, category)])
+            for category in categories | {None}
+        }
+
+    @staticmethod
+    def _compile(rules: list[ApprovalRule]) -> tuple[list[Decimal], list[tuple[Step, ...]]]:
+        """Thresholds and, for each, every step required at or above it"""
+        thresholds, steps, required = [], [()], ()
+        for rule in rules:
+            value = rule.manager_level if rule.approver_type == ApproverType.MANAGER_CHAIN else rule.approver_id
+            required = required + ((rule.approver_type, value),)
+            thresholds.append(rule.min_amount)
+            steps.append(required)
+        return thresholds, steps
+
+    def steps_for(self, category: ExpenseCategory, amount: Decimal) -> tuple[Step, ...]:
+        """Extra steps (after the submitter's manager) for an expense"""
+        thresholds, steps = self._table.get(category) or self._table[None]
+        return steps[bisect_right(thresholds, amount)]
+
+
+def get_approval_policy(db: Session, company_id: int) -> ApprovalPolicy:
+    """Cached policy for a company, compiled from its rules on a miss"""
+    now = time.monotonic()
+    cached = _policies.get(company_id)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    rules = db.query(ApprovalRule).filter(ApprovalRule.company_id == company_id).all()
+    policy = ApprovalPolicy(rules)
+    _policies[company_id] = (now + settings.APPROVAL_POLICY_TTL_SECONDS, policy)
+    return policy
+
+
+def invalidate_approval_policy(db: Session, company_id: int) -> None:
+    """Drop the cached policy once the rule change on this session commits"""
+    @event.listens_for(db, "after_commit", once=True)
+    def _invalidate(session):
+        _policies.pop(company_id, None)
+
+
+def _active_user(db: Session, user_id: Optional[int]) -> Optional[User]:
+    """The user, or None when missing, deleted or in another company"""
+    if user_id is None:
+        return None
+    # Primary key lookup, usually served from the identity map (which may hold a user
+    # deleted since it was loaded, hence the deleted_at check)
+    user = db.get(User, user_id)
+    return user if user is not None and user.deleted_at is None else None
+
+
+def load_managers(db: Session, manager_ids: Iterable[Optional[int]]) -> dict[int, User]:
+    """Load managers and everyone above them, one query per level, to plan many chains at once
+
+    Deleted managers are loaded too, so every lookup of plan_approval_chain is served by
+    the identity map. It only holds referenced objects: keep the result while planning.
+    """
+    loaded: dict[int, User] = {}
+    pending = {manager_id for manager_id in manager_ids if manager_id is not None}
+    for _ in range(MAX_MANAGER_LEVEL):
+        if not pending:
+            break
+        users = db.query(User).filter(User.id.in_(pending)).execution_options(
+            all_tenants=True, include_deleted=True
+        ).all()
+        loaded.update((user.id, user) for user in users)
+        pending = {user.manager_id for user in users if user.manager_id is not None} - loaded.keys()
+    return loaded
+
+
+def _manager_at_level(db: Session, submitter: Principal, level: int) -> Optional[int]:
+    """Walk up the manager chain (1 = direct manager); None when the chain is shorter or broken"""
+    manager = _active_user(db, submitter.manager_id)
+    for _ in range(level - 1):
+        if manager is None:
+            return None
+        manager = _active_user(db, manager.manager_id)
+    return manager.id if manager is not None else None
+
+
+def plan_approval_chain(db: Session, submitter: Principal, category: ExpenseCategory, amount: Decimal) -> list[int]:
+    """Approver ids for a submission: the submitter's manager, then each step the rules add
+
+    Deleted managers are skipped, so an expense never waits on someone who cannot decide.
+    """
+    direct_manager = _active_user(db, submitter.manager_id)
+    chain = [direct_manager.id] if direct_manager is not None else []
+    for approver_type, value in get_approval_policy(db, submitter.company_id).steps_for(category, amount):
+        if approver_type == ApproverType.MANAGER_CHAIN:
+            approver_id = _manager_at_level(db, submitter, value)
+        else:
+            approver_id = value
+        # Nobody approves their own expense or the same expense twice
+        if approver_id is not None and approver_id != submitter.id and approver_id not in chain:
+            chain.append(approver_id)
+    return chain
+
+
+def start_approval(expense: Expense, chain: list[int]) -> None:
+    """Reset the expense to the first step of a new chain (decisions advance it in
+    queries.decide_expense_statement)"""
+    expense.approval_chain = chain
+    expense.approval_step = 0
+    expense.current_approver_id = chain[0] if chain else None
+
@@ -0,0 +1,52 @@
+"""
+Archival of old expenses
+
+Expenses reviewed more than N months ago move from the hot expenses table into
+expenses_archive (same ids and columns), in short batches so no transaction holds
+locks on the hot table for long. Listing endpoints read the archive only on request.
+"""
+import calendar
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import select, insert, delete, literal
+from sqlalchemy.engine import Engine
+from api.models.expense import Expense, ArchivedExpense, ExpenseStatus
+
+
+def months_ago(months: int, now: Optional[datetime] = None) -> datetime:
+    """The same day and time N calendar months back (clamped to the end of shorter months)"""
+    now = now or datetime.now(timezone.utc)
+    year, month = divmod(now.year * 12 + now.month - 1 - months, 12)
+    month += 1
+    return now.replace(year=year, month=month, day=min(now.day, calendar.monthrange(year, month)[1]))
+
+
+def archive_reviewed_expenses(engine: Engine, older_than_months: int, batch_size: int = 1000) -> int:
+    """Move expenses reviewed before the cutoff into expenses_archive; returns rows moved"""
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    cutoff = months_ago(older_than_months)
+    hot = Expense.__table__
+    archive = ArchivedExpense.__table__
+    names = [column.name for column in hot.columns]
+
+    moved = 0
+    while True:
+        # One transaction per batch: copy, then delete the same ids
+        with engine.begin() as conn:
+            ids = conn.execute(
+                select(hot.c.id)
+                .where(hot.c.reviewed_at < cutoff, hot.c.status != ExpenseStatus.PENDING)
+                .order_by(hot.c.id)
+                .limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                return moved
+            archived_at = datetime.now(timezone.utc)
+            conn.execute(insert(archive).from_select(
+                names + ["archived_at"],
+                select(*(hot.c[name] for name in names), literal(archived_at, archive.c.archived_at.type))
+                .where(hot.c.id.in_(ids)),
+            ))
+            conn.execute(delete(hot).where(hot.c.id.in_(ids)))
+        moved += len(ids)
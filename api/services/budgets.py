@@ -0,0 +1,276 @@
+"""
+Budgets with running balances
+
+A budget caps what a company, optionally one user and/or one category, spends per
+month, quarter or year. Nothing is summed on submission: each budget keeps one
+BudgetBalance row per period with reserved (pending) and spent (approved) totals,
+changed in place by a single indexed UPDATE ... RETURNING.
+
+- Submitting an expense reserves its amount on every budget it falls under and
+  records a BudgetCharge per balance.
+- Editing the amount or category releases the charges and reserves again.
+- Rejecting or deleting releases them; final approval moves them to spent.
+
+The increment is atomic and the balance row stays locked until the request commits,
+so concurrent submissions are serialized per budget and none is missed. A submission
+that takes a balance over the budget is refused (BUDGET_ENFORCEMENT=reject) or kept
+with an over_budget policy violation (flag). Budget definitions are cached per
+company like approval policies, for BUDGET_CACHE_TTL_SECONDS.
+"""
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import NamedTuple, Optional
+from sqlalchemy import select, update, delete, insert, bindparam, event, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from api.config import settings
+from api.models.budget import Budget, BudgetBalance, BudgetCharge, BudgetPeriod
+from api.models.expense import Expense, ExpenseCategory, ExpenseStatus
+from api.models.policy_violation import PolicyViolation, ViolationKind
+
+
+class BudgetRule(NamedTuple):
+    id: int
+    user_id: Optional[int]
+    category: Optional[ExpenseCategory]
+    period: BudgetPeriod
+    amount: Decimal
+
+    def applies_to(self, user_id: int, category: ExpenseCategory) -> bool:
+        return self.user_id in (None, user_id) and self.category in (None, category)
+
+    def describe(self) -> str:
+        scope = self.category.value if self.category else "total"
+        owner = f" for user {self.user_id}" if self.user_id else ""
+        return f"{self.period.value} {scope} budget{owner} of {self.amount}"
+
+
+class BudgetOverrun(NamedTuple):
+    budget: BudgetRule
+    used: Decimal  # reserved + spent, this expense included
+
+    @property
+    def detail(self) -> str:
+        return f"{self.budget.describe()} exceeded by {self.used - self.budget.amount}"
+
+
+_budgets: dict[int, tuple[float, list[BudgetRule]]] = {}
+
+
+def company_budgets(db: Session, company_id: int) -> list[BudgetRule]:
+    """Cached budget definitions of a company"""
+    now = time.monotonic()
+    cached = _budgets.get(company_id)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    rows = db.query(
+        Budget.id, Budget.user_id, Budget.category, Budget.period, Budget.amount
+    ).filter(Budget.company_id == company_id).order_by(Budget.id).all()  # Balances are locked in id order
+    rules = [BudgetRule(*row) for row in rows]
+    _budgets[company_id] = (now + settings.BUDGET_CACHE_TTL_SECONDS, rules)
+    return rules
+
+
+def invalidate_budgets(db: Session, company_id: int) -> None:
+    """Drop the cached budgets once the change on this session commits"""
+    @event.listens_for(db, "after_commit", once=True)
+    def _invalidate(session):
+        _budgets.pop(company_id, None)
+
+
+def period_start(period: BudgetPeriod, day: date) -> date:
+    if period == BudgetPeriod.MONTHLY:
+        return day.replace(day=1)
+    if period == BudgetPeriod.QUARTERLY:
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    return day.replace(month=1, day=1)
+
+
+@lru_cache(maxsize=None)
+def _reserve_statement():
+    """Add to one budget period's reserved total. Params: for_budget, for_period, amount"""
+    return (
+        update(BudgetBalance)
+        .where(BudgetBalance.budget_id == bindparam("for_budget"), BudgetBalance.period_start == bindparam("for_period"))
+        .values(reserved=BudgetBalance.reserved + bindparam("amount"))
+        .returning(BudgetBalance.id, BudgetBalance.reserved + BudgetBalance.spent)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@lru_cache(maxsize=None)
+def _adjust_statement():
+    """Move amounts on one balance. Params: balance_id, reserved_delta, spent_delta"""
+    return (
+        update(BudgetBalance)
+        .where(BudgetBalance.id == bindparam("balance_id"))
+        .values(
+            reserved=BudgetBalance.reserved + bindparam("reserved_delta"),
+            spent=BudgetBalance.spent + bindparam("spent_delta"),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _reserve(db: Session, budget: BudgetRule, company_id: int, start: date, amount: Decimal):
+    params = {"for_budget": budget.id, "for_period": start, "amount": amount}
+    row = db.execute(_reserve_statement(), params).first()
+    if row is None:
+        # First expense of the period: open its balance (a concurrent request may win the race)
+        try:
+            with db.begin_nested():
+                db.execute(insert(BudgetBalance).values(budget_id=budget.id, company_id=company_id, period_start=start))
+        except IntegrityError:
+            pass
+        row = db.execute(_reserve_statement(), params).first()
+    return row
+
+
+def _set_overrun_violations(db: Session, expense: Expense, overruns: list[BudgetOverrun]) -> None:
+    db.query(PolicyViolation).filter(
+        PolicyViolation.expense_id == expense.id,
+        PolicyViolation.kind == ViolationKind.OVER_BUDGET
+    ).delete(synchronize_session=False)
+    db.add_all(
+        PolicyViolation(
+            company_id=expense.company_id, expense_id=expense.id, kind=ViolationKind.OVER_BUDGET, detail=overrun.detail
+        )
+        for overrun in overruns
+    )
+
+
+def reserve_expense(db: Session, expense: Expense) -> list[BudgetOverrun]:
+    """Charge a pending expense to its budgets; returns the budgets it overruns (caller commits)
+
+    In flag mode overruns are recorded as violations; in reject mode the caller is
+    expected to roll back.
+    """
+    budgets = [
+        budget for budget in company_budgets(db, expense.company_id)
+        if budget.applies_to(expense.user_id, expense.category)
+    ]
+    if not budgets:
+        return []
+    day = (expense.submitted_at or datetime.utcnow()).date()
+    charges, overruns = [], []
+    for budget in budgets:
+        row = _reserve(db, budget, expense.company_id, period_start(budget.period, day), expense.amount)
+        if row is None:
+            continue  # Budget deleted by another worker since it was cached
+        balance_id, used = row
+        charges.append({
+            "company_id": expense.company_id, "expense_id": expense.id,
+            "balance_id": balance_id, "amount": expense.amount,
+        })
+        if used > budget.amount:
+            overruns.append(BudgetOverrun(budget, used))
+    if charges:
+        db.execute(insert(BudgetCharge), charges)
+    if overruns and settings.BUDGET_ENFORCEMENT == "flag":
+        _set_overrun_violations(db, expense, overruns)
+    return overruns
+
+
+def reserve_generated(db: Session, expenses: list) -> None:
+    """Charge many new pending expenses (rows of id, company_id, user_id, category, amount,
+    occurrence_on) with one reservation per budget period (caller commits)
+
+    Used by bulk generation, which does not reject or flag overruns.
+    """
+    # Expenses of one user, category and day fall under the same budgets
+    groups: dict[tuple, list] = {}
+    for expense in expenses:
+        groups.setdefault((expense.company_id, expense.user_id, expense.category, expense.occurrence_on), []).append(expense)
+    totals: dict[tuple, Decimal] = {}
+    members: dict[tuple, list] = {}
+    rules: dict[int, BudgetRule] = {}
+    for (company_id, user_id, category, day), group in groups.items():
+        for budget in company_budgets(db, company_id):
+            if budget.applies_to(user_id, category):
+                key = (budget.id, company_id, period_start(budget.period, day))
+                totals[key] = totals.get(key, Decimal(0)) + sum(expense.amount for expense in group)
+                members.setdefault(key, []).extend(group)
+                rules[budget.id] = budget
+    charges = []
+    # Sorted, so balances are locked in the same order as by single submissions
+    for key in sorted(totals):
+        budget_id, company_id, start = key
+        row = _reserve(db, rules[budget_id], company_id, start, totals[key])
+        if row is None:
+            continue
+        charges.extend(
+            {"company_id": company_id, "expense_id": expense.id, "balance_id": row[0], "amount": expense.amount}
+            for expense in members[key]
+        )
+    if charges:
+        # Core executemany: no ORM bookkeeping per row
+        db.connection().execute(insert(BudgetCharge.__table__), charges)
+
+
+def _take_charges(db: Session, expense: Expense) -> list:
+    # Always run: another worker's budget may have charged the expense before this one's cache expired
+    return db.execute(
+        delete(BudgetCharge).where(BudgetCharge.expense_id == expense.id)
+        .returning(BudgetCharge.balance_id, BudgetCharge.amount)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+
+def return_charges(connection, charges: list) -> None:
+    """Give deleted (balance_id, amount) charges back to their balances"""
+    if charges:
+        connection.execute(_adjust_statement(), [
+            {"balance_id": balance_id, "reserved_delta": -amount, "spent_delta": 0} for balance_id, amount in charges
+        ])
+
+
+def release_expense(db: Session, expense: Expense) -> None:
+    """Return a pending expense's reservations (edit, rejection, deletion; caller commits)"""
+    charges = _take_charges(db, expense)
+    # Core executemany on the session's connection (an ORM list of params means bulk-by-primary-key)
+    return_charges(db.connection(), charges)
+    if charges:
+        _set_overrun_violations(db, expense, [])
+
+
+def settle_expense(db: Session, expense: Expense) -> None:
+    """Move an approved expense's reservations to spent (caller commits)"""
+    for balance_id, amount in _take_charges(db, expense):
+        db.execute(_adjust_statement(), {"balance_id": balance_id, "reserved_delta": -amount, "spent_delta": amount})
+
+
+def seed_budget(db: Session, budget: Budget) -> None:
+    """Open the current period of a new budget with the expenses already in it (caller commits)"""
+    start = period_start(budget.period, datetime.utcnow().date())
+    conditions = [
+        Expense.company_id == budget.company_id,
+        Expense.submitted_at >= start,
+        Expense.status.in_([ExpenseStatus.PENDING, ExpenseStatus.APPROVED]),
+    ]
+    if budget.user_id is not None:
+        conditions.append(Expense.user_id == budget.user_id)
+    if budget.category is not None:
+        conditions.append(Expense.category == budget.category)
+    pending = db.execute(select(Expense.id, Expense.amount).where(*conditions, Expense.status == ExpenseStatus.PENDING)).all()
+    spent = db.scalar(select(func.coalesce(func.sum(Expense.amount), 0)).where(*conditions, Expense.status == ExpenseStatus.APPROVED))
+    balance = BudgetBalance(
+        budget_id=budget.id, company_id=budget.company_id, period_start=start,
+        reserved=sum((amount for _, amount in pending), Decimal(0)), spent=spent,
+    )
+    db.add(balance)
+    db.flush()
+    if pending:
+        db.execute(insert(BudgetCharge), [
+            {"company_id": budget.company_id, "expense_id": expense_id, "balance_id": balance.id, "amount": amount}
+            for expense_id, amount in pending
+        ])
+
+
+def remove_budget(db: Session, budget: Budget) -> None:
+    """Delete a budget with its balances and charges (caller commits)"""
+    balances = select(BudgetBalance.id).where(BudgetBalance.budget_id == budget.id).scalar_subquery()
+    db.execute(delete(BudgetCharge).where(BudgetCharge.balance_id.in_(balances)))
+    db.execute(delete(BudgetBalance).where(BudgetBalance.budget_id == budget.id))
+    db.delete(budget)
@@ -0,0 +1,249 @@
+"""
+Offboarding of deleted companies and users
+
+Deleting a company or user only hides it (deleted_at) and revokes its tokens, then
+queues an OffboardingJob. The job purges the data in batches of
+OFFBOARDING_BATCH_SIZE rows, one short transaction per batch, recording rows done
+per step on the job row in the same transaction. Every step is idempotent, so a
+job interrupted by a restart is simply run again (scripts/run_offboarding.py).
+
+Jobs run outside requests, in a worker thread started by the app lifespan: it claims
+pending jobs (woken by the endpoint that queued one, or every
+OFFBOARDING_POLL_SECONDS for jobs queued by other processes). On shutdown the job
+in progress stops after its current batch and goes back to pending.
+"""
+import logging
+import shutil
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+from sqlalchemy import select, delete, update, or_
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from api.config import settings
+from api.database import get_engine
+from api.models.approval_rule import ApprovalRule
+from api.models.budget import Budget, BudgetBalance, BudgetCharge
+from api.models.company import Company
+from api.models.expense import Expense, ArchivedExpense
+from api.models.offboarding_job import OffboardingJob, OffboardingKind, OffboardingStatus
+from api.models.policy_violation import PolicyViolation
+from api.models.recurring_expense import RecurringExpense
+from api.models.refresh_token import RefreshToken
+from api.models.user import User
+from api.services.budgets import return_charges
+
+logger = logging.getLogger(__name__)
+
+_worker: Optional[threading.Thread] = None
+_worker_stop = threading.Event()
+_worker_wake = threading.Event()
+
+
+def queue_offboarding(db: Session, kind: OffboardingKind, target_id: int, company_id: int,
+                      requested_by: Optional[int]) -> OffboardingJob:
+    """Add a job to the session (caller commits, then calls wake_offboarding_worker)"""
+    job = OffboardingJob(
+        kind=kind, target_id=target_id, company_id=company_id, requested_by=requested_by, progress={}
+    )
+    db.add(job)
+    return job
+
+
+def _company_steps(company_id: int) -> list:
+    """(name, table, row filter, values to set or None to delete), children before parents"""
+    users, expenses = User.__table__, Expense.__table__
+    company_users = select(users.c.id).where(users.c.company_id == company_id).scalar_subquery()
+    return [
+        ("policy_violations", PolicyViolation.__table__, PolicyViolation.__table__.c.company_id == company_id, None),
+        ("refresh_tokens", RefreshToken.__table__, RefreshToken.__table__.c.user_id.in_(company_users), None),
+        ("approval_rules", ApprovalRule.__table__, ApprovalRule.__table__.c.company_id == company_id, None),
+        ("budget_charges", BudgetCharge.__table__, BudgetCharge.__table__.c.company_id == company_id, None),
+        ("budget_balances", BudgetBalance.__table__, BudgetBalance.__table__.c.company_id == company_id, None),
+        ("budgets", Budget.__table__, Budget.__table__.c.company_id == company_id, None),
+        ("expenses", expenses, expenses.c.company_id == company_id, None),
+        ("expenses_archive", ArchivedExpense.__table__, ArchivedExpense.__table__.c.company_id == company_id, None),
+        ("recurring_expenses", RecurringExpense.__table__, RecurringExpense.__table__.c.company_id == company_id, None),
+        # Managers are detached first so users can go in any order
+        ("user_managers", users, (users.c.company_id == company_id) & users.c.manager_id.isnot(None), {"manager_id": None}),
+        ("users", users, users.c.company_id == company_id, None),
+        ("company", Company.__table__, Company.__table__.c.id == company_id, None),
+    ]
+
+
+def _user_steps(user_id: int) -> list:
+    users, expenses, violations = User.__table__, Expense.__table__, PolicyViolation.__table__
+    own_expenses = select(expenses.c.id).where(expenses.c.user_id == user_id).scalar_subquery()
+    own_budgets = select(Budget.__table__.c.id).where(Budget.__table__.c.user_id == user_id).scalar_subquery()
+    own_balances = select(BudgetBalance.__table__.c.id).where(
+        BudgetBalance.__table__.c.budget_id.in_(own_budgets)
+    ).scalar_subquery()
+    return [
+        ("refresh_tokens", RefreshToken.__table__, RefreshToken.__table__.c.user_id == user_id, None),
+        ("policy_violations", violations, or_(
+            violations.c.expense_id.in_(own_expenses), violations.c.related_expense_id.in_(own_expenses)
+        ), None),
+        ("approval_rules", ApprovalRule.__table__, ApprovalRule.__table__.c.approver_id == user_id, None),
+        ("budget_charges", BudgetCharge.__table__, or_(
+            BudgetCharge.__table__.c.expense_id.in_(own_expenses), BudgetCharge.__table__.c.balance_id.in_(own_balances)
+        ), None),
+        ("budget_balances", BudgetBalance.__table__, BudgetBalance.__table__.c.id.in_(own_balances), None),
+        ("budgets", Budget.__table__, Budget.__table__.c.user_id == user_id, None),
+        ("expenses", expenses, expenses.c.user_id == user_id, None),
+        ("expenses_archive", ArchivedExpense.__table__, ArchivedExpense.__table__.c.user_id == user_id, None),
+        ("recurring_expenses", RecurringExpense.__table__, RecurringExpense.__table__.c.user_id == user_id, None),
+        # Pending expenses waiting on the user fall back to admins
+        ("approver_of", expenses, expenses.c.current_approver_id == user_id, {"current_approver_id": None}),
+        ("manager_of_expenses", expenses, expenses.c.manager_id == user_id, {"manager_id": None}),
+        ("archived_manager_of", ArchivedExpense.__table__, ArchivedExpense.__table__.c.manager_id == user_id, {"manager_id": None}),
+        ("manager_of_users", users, users.c.manager_id == user_id, {"manager_id": None}),
+        ("user", users, users.c.id == user_id, None),
+    ]
+
+
+def _set_job(conn, job_id: int, **values) -> None:
+    conn.execute(update(OffboardingJob.__table__).where(OffboardingJob.__table__.c.id == job_id).values(**values))
+
+
+def _delete_batch(conn, table, key, ids: list) -> None:
+    if table is not BudgetCharge.__table__:
+        conn.execute(delete(table).where(key.in_(ids)))
+        return
+    # Reservations go back to the balances they were taken from, which may outlive the user
+    return_charges(conn, conn.execute(
+        delete(table).where(key.in_(ids)).returning(table.c.balance_id, table.c.amount)
+    ).all())
+
+
+def run_offboarding_job(engine: Engine, job_id: int, batch_size: Optional[int] = None,
+                        stop: Optional[threading.Event] = None) -> OffboardingStatus:
+    """Purge the job's target batch by batch; returns the final status
+
+    When stop is set, the job is put back to pending after the batch in progress.
+    """
+    batch_size = batch_size or settings.OFFBOARDING_BATCH_SIZE
+    jobs = OffboardingJob.__table__
+    with engine.begin() as conn:
+        job = conn.execute(select(jobs).where(jobs.c.id == job_id)).one()
+        if job.status == OffboardingStatus.COMPLETED:
+            return job.status
+        _set_job(conn, job_id, status=OffboardingStatus.RUNNING, error=None,
+                 started_at=job.started_at or datetime.now(timezone.utc))
+
+    progress = dict(job.progress or {})
+    deleted_rows = job.deleted_rows
+    steps = _company_steps(job.target_id) if job.kind == OffboardingKind.COMPANY else _user_steps(job.target_id)
+    try:
+        for name, table, condition, values in steps:
+            key = table.primary_key.columns.values()[0]
+            while True:
+                with engine.begin() as conn:
+                    ids = conn.execute(
+                        select(key).where(condition).order_by(key).limit(batch_size)
+                    ).scalars().all()
+                    if ids:
+                        if values is None:
+                            _delete_batch(conn, table, key, ids)
+                        else:
+                            conn.execute(update(table).values(**values).where(key.in_(ids)))
+                        progress[name] = progress.get(name, 0) + len(ids)
+                        deleted_rows += len(ids)
+                    _set_job(conn, job_id, current_step=name, progress=dict(progress), deleted_rows=deleted_rows)
+                if len(ids) < batch_size:
+                    break
+                logger.info("Offboarding job %s: %s, %d rows so far", job_id, name, progress[name])
+                if stop is not None and stop.is_set():
+                    with engine.begin() as conn:
+                        _set_job(conn, job_id, status=OffboardingStatus.PENDING)
+                    logger.info("Offboarding job %s paused at %s", job_id, name)
+                    return OffboardingStatus.PENDING
+
+        if job.kind == OffboardingKind.COMPANY:
+            # Pre-rendered reports live on disk
+            shutil.rmtree(Path(settings.REPORTS_DIR) / str(job.target_id), ignore_errors=True)
+    except Exception as exc:
+        logger.exception("Offboarding job %s failed", job_id)
+        with engine.begin() as conn:
+            _set_job(conn, job_id, status=OffboardingStatus.FAILED, error=str(exc)[:500])
+        return OffboardingStatus.FAILED
+
+    with engine.begin() as conn:
+        _set_job(conn, job_id, status=OffboardingStatus.COMPLETED, current_step=None,
+                 finished_at=datetime.now(timezone.utc))
+    logger.info("Offboarding job %s completed: %d rows", job_id, deleted_rows)
+    return OffboardingStatus.COMPLETED
+
+
+def run_pending_offboarding(engine: Engine, include_failed: bool = False) -> list[tuple[int, OffboardingStatus]]:
+    """Run (or resume) every unfinished job, oldest first"""
+    jobs = OffboardingJob.__table__
+    statuses = [OffboardingStatus.PENDING, OffboardingStatus.RUNNING]
+    if include_failed:
+        statuses.append(OffboardingStatus.FAILED)
+    with engine.connect() as conn:
+        job_ids = conn.execute(
+            select(jobs.c.id).where(jobs.c.status.in_(statuses)).order_by(jobs.c.id)
+        ).scalars().all()
+    return [(job_id, run_offboarding_job(engine, job_id)) for job_id in job_ids]
+
+
+def claim_offboarding_job(engine: Engine) -> Optional[int]:
+    """Mark the oldest pending job running and return its id; None when there is none
+
+    The status check in the UPDATE lets one process win when several claim at once.
+    """
+    jobs = OffboardingJob.__table__
+    while True:
+        with engine.begin() as conn:
+            job_id = conn.execute(
+                select(jobs.c.id).where(jobs.c.status == OffboardingStatus.PENDING).order_by(jobs.c.id).limit(1)
+            ).scalar()
+            if job_id is None:
+                return None
+            claimed = conn.execute(
+                update(jobs).where(jobs.c.id == job_id, jobs.c.status == OffboardingStatus.PENDING)
+                .values(status=OffboardingStatus.RUNNING)
+            ).rowcount
+        if claimed:
+            return job_id
+
+
+def _run_offboarding_forever() -> None:
+    while not _worker_stop.is_set():
+        try:
+            while not _worker_stop.is_set():
+                job_id = claim_offboarding_job(get_engine())
+                if job_id is None:
+                    break
+                run_offboarding_job(get_engine(), job_id, stop=_worker_stop)
+        except Exception:
+            logger.exception("Claiming offboarding jobs failed; retrying later")
+        _worker_wake.wait(settings.OFFBOARDING_POLL_SECONDS)
+        _worker_wake.clear()
+
+
+def wake_offboarding_worker() -> None:
+    """Have this process's worker look for pending jobs now (after queueing one)"""
+    _worker_wake.set()
+
+
+def start_offboarding_worker() -> None:
+    """Run queued jobs in a thread of this process, outside any request (app lifespan)"""
+    global _worker
+    if _worker is not None:
+        return
+    _worker_stop.clear()
+    _worker = threading.Thread(target=_run_offboarding_forever, name="offboarding", daemon=True)
+    _worker.start()
+
+
+def stop_offboarding_worker() -> None:
+    """Stop after the current batch; a job still running after the wait is resumed by the script"""
+    global _worker
+    if _worker is None:
+        return
+    _worker_stop.set()
+    _worker_wake.set()
+    _worker.join(settings.OFFBOARDING_STOP_TIMEOUT_SECONDS)
+    _worker = None
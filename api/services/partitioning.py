@@ -0,0 +1,108 @@
+"""
+Per-company partitioning of the expenses table (PostgreSQL only)
+
+Layout: expenses is LIST partitioned on company_id. Large tenants get a dedicated
+partition, everyone else lands in a DEFAULT partition that is itself HASH
+partitioned on company_id. Scans of a dedicated tenant never touch other tenants' pages.
+"""
+from typing import Iterable
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import AddConstraint
+from api.models.expense import Expense
+
+
+def _require_postgres(engine: Engine) -> None:
+    if engine.dialect.name != "postgresql":
+        raise RuntimeError("Expense partitioning is only supported on PostgreSQL")
+
+
+def is_partitioned(conn: Connection) -> bool:
+    """Check whether expenses is already a partitioned table"""
+    return bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'expenses'::regclass"
+    )).first())
+
+
+def partition_expenses_by_company(
+    engine: Engine,
+    hash_partitions: int,
+    dedicated_companies: Iterable[int] = (),
+) -> None:
+    """Rebuild the expenses table as company partitions, copying existing rows"""
+    _require_postgres(engine)
+    if hash_partitions < 1:
+        raise ValueError("hash_partitions must be at least 1")
+
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            raise RuntimeError("expenses is already partitioned")
+
+        # Unique constraints on a partitioned table must include company_id,
+        # so foreign keys pointing at expenses.id alone cannot survive the rebuild
+        referencing = conn.execute(text(
+            "SELECT conrelid::regclass::text FROM pg_constraint "
+            "WHERE contype = 'f' AND confrelid = 'expenses'::regclass"
+        )).scalars().all()
+        if referencing:
+            raise RuntimeError(
+                f"Tables reference expenses.id and block partitioning: {', '.join(referencing)}"
+            )
+
+        conn.execute(text("ALTER TABLE expenses RENAME TO expenses_unpartitioned"))
+        conn.execute(text("ALTER TABLE expenses_unpartitioned DROP CONSTRAINT expenses_pkey"))
+        for index in Expense.__table__.indexes:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+
+        conn.execute(text(
+            "CREATE TABLE expenses (LIKE expenses_unpartitioned INCLUDING DEFAULTS) "
+            "PARTITION BY LIST (company_id)"
+        ))
+        conn.execute(text("ALTER TABLE expenses ADD PRIMARY KEY (id, company_id)"))
+        conn.execute(text("ALTER SEQUENCE expenses_id_seq OWNED BY expenses.id"))
+
+        for company_id in dedicated_companies:
+            _create_company_partition(conn, int(company_id))
+        conn.execute(text(
+            "CREATE TABLE expenses_default PARTITION OF expenses DEFAULT "
+            "PARTITION BY HASH (company_id)"
+        ))
+        for remainder in range(hash_partitions):
+            conn.execute(text(
+                f"CREATE TABLE expenses_h{remainder} PARTITION OF expenses_default "
+                f"FOR VALUES WITH (MODULUS {hash_partitions}, REMAINDER {remainder})"
+            ))
+
+        for constraint in Expense.__table__.foreign_key_constraints:
+            conn.execute(AddConstraint(constraint))
+        for index in Expense.__table__.indexes:
+            index.create(conn)
+
+        conn.execute(text("INSERT INTO expenses SELECT * FROM expenses_unpartitioned"))
+        conn.execute(text("DROP TABLE expenses_unpartitioned"))
+
+
+def _create_company_partition(conn: Connection, company_id: int) -> None:
+    conn.execute(text(
+        f"CREATE TABLE expenses_c{company_id} PARTITION OF expenses FOR VALUES IN ({company_id})"
+    ))
+
+
+def add_company_partition(engine: Engine, company_id: int) -> None:
+    """Move a (grown) tenant out of the shared default partition into its own"""
+    _require_postgres(engine)
+    company_id = int(company_id)
+
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            raise RuntimeError("expenses is not partitioned")
+
+        # The default partition may not hold rows for a newly listed value
+        conn.execute(
+            text("CREATE TEMP TABLE moving_expenses ON COMMIT DROP AS "
+                 "SELECT * FROM expenses WHERE company_id = :company_id"),
+            {"company_id": company_id},
+        )
+        conn.execute(text("DELETE FROM expenses WHERE company_id = :company_id"), {"company_id": company_id})
+        _create_company_partition(conn, company_id)
+        conn.execute(text("INSERT INTO expenses SELECT * FROM moving_expenses"))
@@ -0,0 +1,249 @@
+"""
+Expense policy checks
+
+Flags probable duplicates (same user, amounts within POLICY_DUPLICATE_AMOUNT_TOLERANCE,
+the same title words, submitted within POLICY_DUPLICATE_WINDOW_HOURS of an earlier
+one), amounts over POLICY_CATEGORY_LIMITS and weekend submissions in
+POLICY_WEEKEND_CATEGORIES. Of two duplicates, the later submission is flagged.
+
+check_expense runs on each create/update with one indexed lookup; recheck_later_duplicates
+then re-checks later expenses of the user that an edit or deletion can turn into (or
+stop being) duplicates. scan_policy_violations re-checks historical data in bulk with
+NumPy (imported on first use) by sorting once and comparing each expense with its earlier
+neighbours of the same user and title within the window.
+"""
+import calendar
+import re
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import select, insert, delete, or_
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from api.config import settings
+from api.models.company import Company
+from api.models.expense import Expense
+from api.models.policy_violation import PolicyViolation, ViolationKind
+
+_WORDS = re.compile(r"[a-z0-9]+")
+
+
+def title_key(title: str) -> str:
+    """Case, punctuation and word order insensitive form of a title"""
+    return " ".join(sorted(_WORDS.findall(title.lower())))
+
+
+def _limit_detail(category: str, amount, limit) -> str:
+    return f"{amount} exceeds the {category} limit of {limit}"
+
+
+def check_expense(db: Session, expense: Expense) -> list[PolicyViolation]:
+    """Re-check one expense and replace its violations (caller commits)"""
+    category = expense.category.value
+    window = timedelta(hours=settings.POLICY_DUPLICATE_WINDOW_HOURS)
+    tolerance = settings.POLICY_DUPLICATE_AMOUNT_TOLERANCE
+    findings = []
+
+    # Served by ix_expenses_user_id_submitted_at
+    candidates = db.query(Expense.id, Expense.title).filter(
+        Expense.user_id == expense.user_id,
+        Expense.submitted_at.between(expense.submitted_at - window, expense.submitted_at),
+        Expense.amount.between(expense.amount * (1 - tolerance), expense.amount * (1 + tolerance)),
+        Expense.id != expense.id,
+        # Earlier submissions only; ties go by id, as in detect_violations
+        or_(Expense.submitted_at < expense.submitted_at, Expense.id < expense.id),
+    ).order_by(Expense.submitted_at.desc()).all()
+    key = title_key(expense.title)
+    for candidate in candidates:
+        if title_key(candidate.title) == key:
+            findings.append((ViolationKind.DUPLICATE, candidate.id, f"Possible duplicate of expense {candidate.id}"))
+            break
+
+    limit = settings.POLICY_CATEGORY_LIMITS.get(category)
+    if limit is not None and expense.amount > limit:
+        findings.append((ViolationKind.CATEGORY_LIMIT, None, _limit_detail(category, expense.amount, limit)))
+
+    if category in settings.POLICY_WEEKEND_CATEGORIES and expense.submitted_at.weekday() >= 5:
+        findings.append((ViolationKind.WEEKEND, None, f"{category} expense submitted on a weekend"))
+
+    # Budget findings are kept in step with the budget counters (api/services/budgets.py)
+    db.query(PolicyViolation).filter(
+        PolicyViolation.expense_id == expense.id,
+        PolicyViolation.kind != ViolationKind.OVER_BUDGET
+    ).delete(synchronize_session=False)
+    violations = [
+        PolicyViolation(
+            company_id=expense.company_id,
+            expense_id=expense.id,
+            kind=kind,
+            related_expense_id=related_id,
+            detail=detail,
+        )
+        for kind, related_id, detail in findings
+    ]
+    db.add_all(violations)
+    return violations
+
+
+def recheck_later_duplicates(db: Session, expense: Expense) -> None:
+    """Re-check the user's expenses submitted within the window after an edited or deleted one
+
+    Only those flagged as its duplicates or sharing its title are looked at (caller commits).
+    """
+    window = timedelta(hours=settings.POLICY_DUPLICATE_WINDOW_HOURS)
+    db.flush()  # The duplicate lookups must see the edit or deletion (sessions do not autoflush)
+    later = db.query(Expense).filter(
+        Expense.user_id == expense.user_id,
+        Expense.submitted_at.between(expense.submitted_at, expense.submitted_at + window),
+        Expense.id != expense.id,
+    ).all()
+    if not later:
+        return
+    flagged = set(db.scalars(
+        select(PolicyViolation.expense_id).where(
+            PolicyViolation.related_expense_id == expense.id,
+            PolicyViolation.kind == ViolationKind.DUPLICATE,
+        )
+    ))
+    key = title_key(expense.title)
+    for candidate in later:
+        if candidate.id in flagged or title_key(candidate.title) == key:
+            check_expense(db, candidate)
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as exc:
+        raise RuntimeError("Batch policy checks require the 'numpy' package") from exc
+    return numpy
+
+
+def _epoch_seconds(moment: datetime) -> int:
+    # Naive values come from SQLite's CURRENT_TIMESTAMP, which is UTC
+    return calendar.timegm(moment.utctimetuple())
+
+
+def detect_violations(ids, user_ids, amounts, categories, titles, submitted):
+    """Vectorized checks over column arrays; returns (expense_index, kind, related_index) triples
+
+    submitted holds epoch seconds and categories the category values as strings.
+    """
+    np = _numpy()
+    count = len(ids)
+    if count == 0:
+        return []
+    # Integer code per title key; most titles repeat, so each distinct title is normalized once
+    code_by_key: dict[str, int] = {}
+    code_by_title: dict[str, int] = {}
+
+    def title_code(title: str) -> int:
+        code = code_by_title.get(title)
+        if code is None:
+            code = code_by_title[title] = code_by_key.setdefault(title_key(title), len(code_by_key))
+        return code
+
+    title_codes = np.fromiter(map(title_code, titles), dtype=np.int64, count=count)
+    categories = np.asarray(categories, dtype=str)
+    window = settings.POLICY_DUPLICATE_WINDOW_HOURS * 3600
+    tolerance = float(settings.POLICY_DUPLICATE_AMOUNT_TOLERANCE)
+
+    # Rows of one user and title end up adjacent, in submission order
+    order = np.lexsort((ids, submitted, title_codes, user_ids))
+    user, code, moment, amount = user_ids[order], title_codes[order], submitted[order], amounts[order]
+    duplicate_of = np.full(count, -1, dtype=np.int64)
+    # Compare with ever earlier neighbours (the nearest first, as check_expense does) until
+    # no unmatched row has one of the same user and title left within the window
+    for lag in range(1, count):
+        later, earlier = slice(lag, None), slice(None, -lag)
+        candidate = (
+            (user[later] == user[earlier])
+            & (code[later] == code[earlier])
+            & (moment[later] - moment[earlier] <= window)
+            & (duplicate_of[later] == -1)
+        )
+        if not candidate.any():
+            break
+        match = candidate & (np.abs(amount[later] - amount[earlier]) <= tolerance * amount[later])
+        duplicate_of[later][match] = order[earlier][match]
+
+    findings = []
+    flagged = np.nonzero(duplicate_of >= 0)[0]
+    findings.extend(
+        (index, ViolationKind.DUPLICATE, related)
+        for index, related in zip(order[flagged].tolist(), duplicate_of[flagged].tolist())
+    )
+
+    for category, limit in settings.POLICY_CATEGORY_LIMITS.items():
+        over = np.nonzero((categories == category) & (amounts > float(limit)))[0]
+        findings.extend((index, ViolationKind.CATEGORY_LIMIT, None) for index in over.tolist())
+
+    # 1970-01-01 was a Thursday, so Monday is day 0 after shifting by 3
+    weekday = (submitted // 86400 + 3) % 7
+    weekend = np.nonzero(np.isin(categories, settings.POLICY_WEEKEND_CATEGORIES) & (weekday >= 5))[0]
+    findings.extend((index, ViolationKind.WEEKEND, None) for index in weekend.tolist())
+    return findings
+
+
+def _scan_company(engine: Engine, company_id: int, batch_size: int) -> int:
+    np = _numpy()
+    table = Expense.__table__
+    violations = PolicyViolation.__table__
+    stmt = select(
+        table.c.id, table.c.user_id, table.c.amount, table.c.category, table.c.title, table.c.submitted_at,
+    ).where(table.c.company_id == company_id, table.c.deleted_at.is_(None))
+
+    with engine.connect() as conn:
+        rows = conn.execute(stmt).all()
+    ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=len(rows))
+    findings = detect_violations(
+        ids,
+        np.fromiter((row.user_id for row in rows), dtype=np.int64, count=len(rows)),
+        np.fromiter((row.amount for row in rows), dtype=np.float64, count=len(rows)),
+        np.array([row.category.value for row in rows], dtype=object),
+        [row.title for row in rows],
+        np.fromiter((_epoch_seconds(row.submitted_at) for row in rows), dtype=np.int64, count=len(rows)),
+    )
+
+    def _detail(index: int, kind: ViolationKind, related: Optional[int]) -> str:
+        row = rows[index]
+        if kind == ViolationKind.DUPLICATE:
+            return f"Possible duplicate of expense {int(ids[related])}"
+        if kind == ViolationKind.CATEGORY_LIMIT:
+            category = row.category.value
+            return _limit_detail(category, row.amount, settings.POLICY_CATEGORY_LIMITS[category])
+        return f"{row.category.value} expense submitted on a weekend"
+
+    records = [
+        {
+            "company_id": company_id,
+            "expense_id": int(ids[index]),
+            "kind": kind,
+            "related_expense_id": int(ids[related]) if related is not None else None,
+            "detail": _detail(index, kind, related),
+        }
+        for index, kind, related in findings
+    ]
+    with engine.begin() as conn:
+        conn.execute(delete(violations).where(
+            violations.c.company_id == company_id, violations.c.kind != ViolationKind.OVER_BUDGET
+        ))
+        for start in range(0, len(records), batch_size):
+            conn.execute(insert(violations), records[start:start + batch_size])
+    return len(records)
+
+
+def scan_policy_violations(engine: Engine, company_id: Optional[int] = None, batch_size: int = 10_000) -> int:
+    """Re-check every live expense (or one company's) and rewrite their violations; returns the count
+
+    Companies are scanned one at a time (duplicates never cross users), so memory is
+    bounded by the largest company rather than the whole table.
+    """
+    _numpy()
+    if company_id is not None:
+        return _scan_company(engine, company_id, batch_size)
+    companies = Company.__table__
+    with engine.connect() as conn:
+        company_ids = conn.execute(
+            select(companies.c.id).where(companies.c.deleted_at.is_(None)).order_by(companies.c.id)
+        ).scalars().all()
+    return sum(_scan_company(engine, company_id, batch_size) for company_id in company_ids)
@@ -0,0 +1,165 @@
+"""
+Recurring expenses
+
+A RecurringExpense is a template (title, amount, category, schedule) owned by one
+user. generate_recurring_expenses materializes every occurrence due up to a date for
+all templates at once: due templates are read in id order, RECURRING_BATCH_SIZE at a
+time, their occurrences (including any missed while the job was not running) are
+written with one multi-row INSERT per batch, and the templates are advanced in the
+same transaction.
+
+Generation is idempotent. Each generated expense carries (recurring_id,
+occurrence_on), covered by a unique index, and the INSERT skips rows that already
+exist (ON CONFLICT DO NOTHING), so a rerun after a crash, or two runs at once, never
+duplicate an occurrence. Generated expenses get their approval chain and budget
+reservations like submitted ones; policy checks are left to scan_policy_violations.
+"""
+import calendar
+from datetime import date, datetime, time, timezone
+from typing import Optional
+from sqlalchemy import select, update, bindparam
+from sqlalchemy.orm import Session
+from api.config import settings
+from api.models.company import Company
+from api.models.expense import Expense, ExpenseStatus
+from api.models.recurring_expense import RecurringExpense, RecurrenceFrequency
+from api.models.user import User
+from api.schemas.token import Principal
+from api.services.approvals import load_managers, plan_approval_chain
+from api.services.budgets import reserve_generated
+
+_MONTHS = {RecurrenceFrequency.MONTHLY: 1, RecurrenceFrequency.QUARTERLY: 3, RecurrenceFrequency.YEARLY: 12}
+
+
+def occurrence_date(frequency: RecurrenceFrequency, start_on: date, n: int) -> date:
+    """Date of occurrence n (0 = start_on); months keep start_on's day, clamped to the month's end"""
+    if frequency == RecurrenceFrequency.WEEKLY:
+        return date.fromordinal(start_on.toordinal() + 7 * n)
+    year, month = divmod(start_on.year * 12 + start_on.month - 1 + _MONTHS[frequency] * n, 12)
+    month += 1
+    return date(year, month, min(start_on.day, calendar.monthrange(year, month)[1]))
+
+
+def first_occurrence_from(frequency: RecurrenceFrequency, start_on: date, day: date) -> int:
+    """Index of the first occurrence on or after day"""
+    n = 0
+    if frequency == RecurrenceFrequency.WEEKLY:
+        n = max(0, (day.toordinal() - start_on.toordinal()) // 7)
+    else:
+        n = max(0, ((day.year - start_on.year) * 12 + day.month - start_on.month) // _MONTHS[frequency] - 1)
+    while occurrence_date(frequency, start_on, n) < day:
+        n += 1
+    return n
+
+
+def next_run(frequency: RecurrenceFrequency, start_on: date, end_on: Optional[date], n: int) -> Optional[date]:
+    """Date of occurrence n, or None when it falls after end_on"""
+    day = occurrence_date(frequency, start_on, n)
+    return None if end_on is not None and day > end_on else day
+
+
+def _due_templates_statement():
+    """Active templates due by a date, after an id (keyset). Params: today, after_id, batch_size"""
+    template = RecurringExpense
+    # The joins leave out templates of deleted users and companies (soft-delete filter)
+    return (
+        select(
+            template.id, template.company_id, template.user_id, template.title, template.amount,
+            template.category, template.description, template.frequency, template.start_on,
+            template.end_on, template.occurrences, User.email, User.role, User.manager_id,
+        )
+        .join(User, User.id == template.user_id)
+        .join(Company, Company.id == template.company_id)
+        .where(
+            template.active.is_(True),
+            template.next_run_on <= bindparam("today"),
+            template.id > bindparam("after_id"),
+        )
+        .order_by(template.id)
+        .limit(bindparam("batch_size"))
+    )
+
+
+def _insert_ignoring_duplicates(db: Session, rows: list[dict]) -> list:
+    """Multi-row INSERT of generated expenses; returns the rows actually inserted"""
+    connection = db.connection()
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise RuntimeError(f"Recurring expense generation does not support {dialect}")
+    table = Expense.__table__
+    stmt = (
+        dialect_insert(table)
+        .on_conflict_do_nothing(index_elements=["company_id", "recurring_id", "occurrence_on"])
+        .returning(table.c.id, table.c.company_id, table.c.user_id, table.c.category, table.c.amount, table.c.occurrence_on)
+    )
+    return connection.execute(stmt, rows).all()
+
+
+def generate_recurring_expenses(db: Session, today: Optional[date] = None, batch_size: Optional[int] = None) -> int:
+    """Create every expense due by today (default: UTC today) across all companies; returns how many"""
+    today = today or datetime.now(timezone.utc).date()
+    batch_size = batch_size or settings.RECURRING_BATCH_SIZE
+    statement = _due_templates_statement().execution_options(all_tenants=True)
+    advance = (
+        update(RecurringExpense.__table__)
+        .where(RecurringExpense.__table__.c.id == bindparam("template_id"))
+        .values(occurrences=bindparam("done"), next_run_on=bindparam("next_on"))
+    )
+    created, after_id = 0, 0
+    while True:
+        templates = db.execute(
+            statement, {"today": today, "after_id": after_id, "batch_size": batch_size}
+        ).all()
+        if not templates:
+            return created
+        # The batch's manager chains in a few queries instead of lookups per template
+        managers = load_managers(db, (template.manager_id for template in templates))
+        chains: dict[tuple, list[int]] = {}
+        rows, progress = [], []
+        for template in templates:
+            # Rules are per company and amount, so one chain serves all of a template's
+            # occurrences, and every template of the user with the same category and amount
+            key = (template.user_id, template.category, template.amount)
+            chain = chains.get(key)
+            if chain is None:
+                # Built from stored rows, so validation is skipped
+                submitter = Principal.model_construct(
+                    id=template.user_id, email=template.email, role=template.role,
+                    company_id=template.company_id, manager_id=template.manager_id,
+                )
+                chain = chains[key] = plan_approval_chain(db, submitter, template.category, template.amount)
+            n = template.occurrences
+            day = next_run(template.frequency, template.start_on, template.end_on, n)
+            while day is not None and day <= today:
+                rows.append({
+                    "title": template.title,
+                    "amount": template.amount,
+                    "category": template.category,
+                    "description": template.description,
+                    "status": ExpenseStatus.PENDING,
+                    "user_id": template.user_id,
+                    "company_id": template.company_id,
+                    "manager_id": template.manager_id,
+                    "approval_chain": chain,
+                    "approval_step": 0,
+                    "current_approver_id": chain[0] if chain else None,
+                    # Dated to the occurrence, so catch-up runs land in the right month
+                    "submitted_at": datetime.combine(day, time.min, tzinfo=timezone.utc),
+                    "recurring_id": template.id,
+                    "occurrence_on": day,
+                })
+                n += 1
+                day = next_run(template.frequency, template.start_on, template.end_on, n)
+            progress.append({"template_id": template.id, "done": n, "next_on": day})
+
+        inserted = _insert_ignoring_duplicates(db, rows) if rows else []
+        reserve_generated(db, inserted)
+        db.connection().execute(advance, progress)
+        db.commit()
+        created += len(inserted)
+        after_id = templates[-1].id
+        del managers
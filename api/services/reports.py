@@ -0,0 +1,171 @@
+"""
+Pre-rendered monthly reports
+
+A background job (scripts/generate_reports.py) renders, per company and month, a
+company-wide report and one report per manager: stats, category breakdown and top
+spenders, as JSON and CSV files under REPORTS_DIR. The API serves those files
+as they are. Each company-month directory keeps a fingerprint of the expenses it
+was built from (row count, latest updated_at, total), and the job skips months
+whose fingerprint has not changed.
+"""
+import csv
+import io
+import json
+import os
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Iterable, Optional
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from api import queries
+from api.config import settings
+from api.database import SessionLocal, set_tenant
+from api.models.company import Company
+from api.models.expense import Expense
+from api.models.user import User, UserRole
+
+REPORT_FORMATS = {"json": "application/json", "csv": "text/csv"}
+COMPANY_REPORT = "company"
+MANIFEST = "manifest.json"
+
+
+def parse_month(value: str) -> date:
+    """'2026-10' -> date(2026, 10, 1); raises ValueError otherwise"""
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+def month_bounds(month: date) -> tuple[datetime, datetime]:
+    start = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+    end = datetime(month.year + month.month // 12, month.month % 12 + 1, 1, tzinfo=timezone.utc)
+    return start, end
+
+
+def manager_report_name(manager_id: int) -> str:
+    return f"manager-{manager_id}"
+
+
+def report_path(company_id: int, month: date, name: str, fmt: str) -> Path:
+    return Path(settings.REPORTS_DIR) / str(company_id) / f"{month:%Y-%m}" / f"{name}.{fmt}"
+
+
+def _fingerprint(db: Session, company_id: int, start: datetime, end: datetime) -> list:
+    """Changes whenever an expense of the month is added, edited, decided, deleted or archived"""
+    table = Expense.__table__
+    # Core on purpose: soft-deleted rows must count too
+    row = db.execute(
+        select(func.count(), func.max(table.c.updated_at), func.sum(table.c.amount))
+        .where(table.c.company_id == company_id, table.c.submitted_at >= start, table.c.submitted_at < end)
+    ).one()
+    return [row[0], row[1].isoformat() if row[1] else None, str(row[2] or 0)]
+
+
+def build_report(db: Session, scope: str, user_id: Optional[int], start: datetime, end: datetime) -> dict:
+    """Stats, category breakdown and top spenders for one scope and period"""
+    params = {"user_id": user_id, "start": start, "end": end}
+    stats = db.execute(queries.period_stats_statement(scope), params).one()
+    categories = db.execute(queries.category_breakdown_statement(scope), params).all()
+    spenders = db.execute(
+        queries.top_spenders_statement(scope), {**params, "limit": settings.REPORT_TOP_SPENDERS}
+    ).all()
+    return {
+        "stats": {
+            "total_expenses": stats.total_expenses,
+            "pending_count": stats.pending_count,
+            "approved_count": stats.approved_count,
+            "rejected_count": stats.rejected_count,
+            "total_amount": float(stats.total_amount),
+            "approved_amount": float(stats.approved_amount),
+        },
+        "categories": [
+            {"category": row.category.value, "count": row.count, "total_amount": float(row.total_amount)}
+            for row in categories
+        ],
+        "top_spenders": [
+            {"user_id": row.user_id, "full_name": row.full_name, "count": row.count, "total_amount": float(row.total_amount)}
+            for row in spenders
+        ],
+    }
+
+
+def render_csv(report: dict) -> str:
+    """One CSV with a section column, so spreadsheets can filter it"""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["section", "key", "name", "count", "amount"])
+    stats = report["stats"]
+    for key in ("total_expenses", "pending_count", "approved_count", "rejected_count"):
+        writer.writerow(["stats", key, "", stats[key], ""])
+    for key in ("total_amount", "approved_amount"):
+        writer.writerow(["stats", key, "", "", f"{stats[key]:.2f}"])
+    for row in report["categories"]:
+        writer.writerow(["category", row["category"], "", row["count"], f"{row['total_amount']:.2f}"])
+    for row in report["top_spenders"]:
+        writer.writerow(["top_spender", row["user_id"], row["full_name"], row["count"], f"{row['total_amount']:.2f}"])
+    return out.getvalue()
+
+
+def _write_atomic(path: Path, content: str) -> None:
+    """Readers see the old file or the new one, never a partial write"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(content, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _write_report(company_id: int, month: date, name: str, report: dict) -> None:
+    _write_atomic(report_path(company_id, month, name, "json"), json.dumps(report, separators=(",", ":")))
+    _write_atomic(report_path(company_id, month, name, "csv"), render_csv(report))
+
+
+def generate_company_reports(company_id: int, month: date, force: bool = False) -> bool:
+    """Render one company's reports for a month; returns False when nothing changed since the last run"""
+    start, end = month_bounds(month)
+    manifest_path = report_path(company_id, month, "manifest", "json")
+    db = SessionLocal()
+    try:
+        set_tenant(db, company_id)
+        fingerprint = _fingerprint(db, company_id, start, end)
+        if not force and manifest_path.exists():
+            if json.loads(manifest_path.read_text()).get("fingerprint") == fingerprint:
+                return False
+
+        generated_at = datetime.now(timezone.utc).isoformat()
+        header = {"company_id": company_id, "month": f"{month:%Y-%m}", "generated_at": generated_at}
+        report = build_report(db, queries.SCOPE_COMPANY, None, start, end)
+        _write_report(company_id, month, COMPANY_REPORT, {**header, "scope": COMPANY_REPORT, **report})
+
+        manager_ids = db.scalars(select(User.id).where(User.role == UserRole.MANAGER)).all()
+        for manager_id in manager_ids:
+            report = build_report(db, queries.SCOPE_MANAGER, manager_id, start, end)
+            _write_report(
+                company_id, month, manager_report_name(manager_id),
+                {**header, "scope": "manager", "manager_id": manager_id, **report},
+            )
+
+        # Written last: a crash mid-run leaves the old fingerprint, so the next run redoes the month
+        _write_atomic(manifest_path, json.dumps({"fingerprint": fingerprint, "generated_at": generated_at}))
+        return True
+    finally:
+        db.close()
+
+
+def generate_monthly_reports(
+    months: Iterable[date], company_ids: Optional[Iterable[int]] = None, force: bool = False
+) -> tuple[int, int]:
+    """Render every company's reports for the given months; returns (generated, unchanged)"""
+    months = list(months)  # Walked once per company, so a generator must not run dry
+    if company_ids is None:
+        db = SessionLocal()
+        try:
+            company_ids = db.scalars(select(Company.id)).all()
+        finally:
+            db.close()
+
+    generated = unchanged = 0
+    for company_id in company_ids:
+        for month in months:
+            if generate_company_reports(company_id, month, force):
+                generated += 1
+            else:
+                unchanged += 1
+    return generated, unchanged
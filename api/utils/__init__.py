@@ -1,9 +1,18 @@
-from .auth import verify_password, get_password_hash, create_access_token, get_current_user, get_current_active_user
+from .auth import verify_password, get_password_hash, create_access_token, decode_access_token, get_current_user, get_current_active_user, get_current_principal
+from .batch import batch_ids
+from .etag import etag, set_etag, if_match_version, precondition_failed
 
 __all__ = [
     "verify_password",
     "get_password_hash", 
     "create_access_token",
+    "decode_access_token",
     "get_current_user",
-    "get_current_active_user"
+    "get_current_active_user",
+    "get_current_principal",
+    "batch_ids",
+    "etag",
+    "set_etag",
+    "if_match_version",
+    "precondition_failed"
 ]
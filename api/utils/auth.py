@@ -1,28 +1,148 @@
-from datetime import datetime, timedelta
+import hashlib
+import json
+import logging
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from functools import lru_cache
+from jose import JWTError
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, select, update
 from sqlalchemy.orm import Session
 from api.config import settings
-from api.database import get_db
+from api.database import SessionLocal, get_db, request_tenant, set_tenant
 
+from api.models.offboarding_job import OffboardingJob, OffboardingKind
 from api.models.user import User
-from api.schemas.token import TokenData
+from api.models.refresh_token import RefreshToken
+from api.schemas.token import TokenData, Principal
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_PREFIX}/auth/login")
+logger = logging.getLogger(__name__)
+
+# A literal, so importing this module does not load the settings (routers are mounted at /api)
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+
+# Verified token claims keyed by the raw token, so repeat requests skip signature checks
+_CLAIMS_CACHE_SIZE = 10_000
+_claims_cache: dict[str, tuple[dict, float]] = {}
+
+# Lowest token_version still accepted per user; only users who revoked within the access
+# token lifetime appear here (older tokens have expired anyway)
+_min_token_versions: dict[int, int] = {}
+# Users and companies deleted within the token lifetime; their rows may already be purged
+_signed_out_users: frozenset[int] = frozenset()
+_signed_out_companies: frozenset[int] = frozenset()
+# Reloads the above every TOKEN_REVOCATION_REFRESH_SECONDS (start_revocation_refresh)
+_refresher: Optional[threading.Thread] = None
+_refresher_stop = threading.Event()
+
+
+def build_pwd_context(
+    schemes: list[str],
+    bcrypt_rounds: int,
+    argon2_time_cost: int,
+    argon2_memory_cost: int,
+    argon2_parallelism: int,
+):
+    """CryptContext for the given schemes and costs; hashes at any other cost need an update"""
+    from passlib.context import CryptContext
+    return CryptContext(
+        schemes=schemes,
+        deprecated="auto",
+        bcrypt__default_rounds=bcrypt_rounds,
+        bcrypt__min_desired_rounds=bcrypt_rounds,
+        bcrypt__max_desired_rounds=bcrypt_rounds,
+        argon2__default_rounds=argon2_time_cost,
+        argon2__min_desired_rounds=argon2_time_cost,
+        argon2__max_desired_rounds=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+
+@lru_cache()
+def get_pwd_context():
+    """Password hashing context, built on first use so passlib stays out of startup"""
+    return build_pwd_context(
+        settings.PASSWORD_SCHEMES,
+        settings.BCRYPT_ROUNDS,
+        settings.ARGON2_TIME_COST,
+        settings.ARGON2_MEMORY_COST,
+        settings.ARGON2_PARALLELISM,
+    )
+
+
+def _jwt():
+    # jose pulls in its crypto backends on import, so defer it to the first token
+    from jose import jwt
+    return jwt
+
+
+def _is_asymmetric() -> bool:
+    return settings.ALGORITHM.startswith(("RS", "ES", "PS"))
+
+
+def _read_pem(value: str) -> str:
+    """Accept either PEM text or a path to a PEM file"""
+    if value.lstrip().startswith("-----BEGIN"):
+        return value
+    with open(value) as pem_file:
+        return pem_file.read()
+
+
+@lru_cache()
+def _signing_key():
+    """Parsed signing key, built once instead of on every encode"""
+    from jose import jwk
+    if settings.ALGORITHM == "EdDSA":
+        raise RuntimeError("python-jose does not support EdDSA; use RS256 or ES256")
+    if not _is_asymmetric():
+        return jwk.construct(settings.SECRET_KEY, settings.ALGORITHM)
+    if not settings.JWT_PRIVATE_KEY:
+        raise RuntimeError(f"ALGORITHM={settings.ALGORITHM} requires JWT_PRIVATE_KEY")
+    return jwk.construct(_read_pem(settings.JWT_PRIVATE_KEY), settings.ALGORITHM)
+
+
+@lru_cache()
+def _verification_key():
+    """Parsed verification key, built once instead of on every decode"""
+    from jose import jwk
+    if not _is_asymmetric():
+        return _signing_key()
+    if settings.JWT_PUBLIC_KEY:
+        return jwk.construct(_read_pem(settings.JWT_PUBLIC_KEY), settings.ALGORITHM)
+    return _signing_key().public_key()
+
+
+@lru_cache()
+def _key_id() -> Optional[str]:
+    if not _is_asymmetric():
+        return None
+    public_jwk = json.dumps(_verification_key().to_dict(), sort_keys=True)
+    return hashlib.sha256(public_jwk.encode()).hexdigest()[:16]
+
+
+@lru_cache()
+def get_jwks() -> dict:
+    """Public signing keys as a JWK Set, so other services can verify tokens offline"""
+    if not _is_asymmetric():
+        return {"keys": []}
+    public_jwk = _verification_key().to_dict()
+    public_jwk.update({"kid": _key_id(), "use": "sig", "alg": settings.ALGORITHM})
+    return {"keys": [public_jwk]}
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -34,17 +154,219 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    headers = {"kid": _key_id()} if _is_asymmetric() else None
+    encoded_jwt = _jwt().encode(to_encode, _signing_key(), algorithm=settings.ALGORITHM, headers=headers)
     return encoded_jwt
 
 
+def decode_access_token(token: str) -> dict:
+    """Verify a JWT access token and return its claims (raises JWTError)"""
+    cached = _claims_cache.get(token)
+    if cached is not None and cached[1] > time.time():
+        return cached[0]
+    
+    payload = _jwt().decode(token, _verification_key(), algorithms=[settings.ALGORITHM])
+    if len(_claims_cache) >= _CLAIMS_CACHE_SIZE:
+        _claims_cache.clear()
+    _claims_cache[token] = (payload, float(payload.get("exp", 0)))
+    return payload
+
+
+def _hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def create_refresh_token(db: Session, user: User, family_id: Optional[str] = None) -> str:
+    """Issue an opaque refresh token; only its hash is stored (caller commits)"""
+    token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        token_hash=_hash_refresh_token(token),
+        family_id=family_id or secrets.token_hex(16),
+        user_id=user.id,
+        expires_at=datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return token
+
+
+def rotate_refresh_token(db: Session, token: str) -> Optional[tuple[User, str]]:
+    """Exchange a refresh token for a new one in the same family, without bcrypt"""
+    now = datetime.now(timezone.utc)
+    record = db.query(RefreshToken).filter(RefreshToken.token_hash == _hash_refresh_token(token)).first()
+    if record is None:
+        return None
+    
+    if record.revoked_at is not None:
+        # A rotated token came back: assume it leaked and end the whole session family
+        db.query(RefreshToken).filter(
+            RefreshToken.family_id == record.family_id,
+            RefreshToken.revoked_at.is_(None)
+        ).update({"revoked_at": now}, synchronize_session=False)
+        db.commit()
+        return None
+    
+    # Claim the token atomically so two concurrent refreshes cannot both rotate it
+    claimed = db.query(RefreshToken).filter(
+        RefreshToken.id == record.id,
+        RefreshToken.revoked_at.is_(None),
+        RefreshToken.expires_at > now
+    ).update({"revoked_at": now}, synchronize_session=False)
+    user = db.query(User).filter(User.id == record.user_id).first()
+    if claimed != 1 or user is None:
+        db.rollback()
+        return None
+    
+    new_token = create_refresh_token(db, user, record.family_id)
+    db.commit()
+    return user, new_token
+
+
+def revoke_refresh_tokens(db: Session, user_id: int) -> None:
+    """Revoke all of a user's refresh tokens (caller commits)"""
+    db.query(RefreshToken).filter(
+        RefreshToken.user_id == user_id,
+        RefreshToken.revoked_at.is_(None)
+    ).update({"revoked_at": datetime.now(timezone.utc)}, synchronize_session=False)
+
+
+def token_claims(user: User) -> dict:
+    """Claims embedded in access tokens, enough to authorize without loading the user"""
+    return {
+        "sub": user.email,
+        "user_id": user.id,
+        "role": user.role,
+        "company_id": user.company_id,
+        "manager_id": user.manager_id,
+        "ver": user.token_version or 0,
+    }
+
+
+def refresh_token_revocations() -> None:
+    """Reload recent revocations so those made by other workers apply here too
+    
+    Only revocations within the access token lifetime matter: older tokens have expired.
+    """
+    global _min_token_versions, _signed_out_users, _signed_out_companies
+    
+    # Revocations applied here while the query runs may be missing from its results
+    local_versions, local_users, local_companies = (
+        dict(_min_token_versions), _signed_out_users, _signed_out_companies
+    )
+    tokens_issued_after = datetime.now(timezone.utc) - timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    db = SessionLocal()
+    try:
+        # Deleted users too, until offboarding removes them
+        rows = db.query(User.id, User.token_version).filter(
+            User.tokens_revoked_at >= tokens_issued_after
+        ).execution_options(all_tenants=True, include_deleted=True).all()
+        # Offboarding jobs outlive the purge, unlike the users' token versions
+        jobs = db.query(OffboardingJob.kind, OffboardingJob.target_id).filter(
+            OffboardingJob.created_at >= tokens_issued_after
+        ).all()
+    finally:
+        db.close()
+    
+    loaded = {user_id: version for user_id, version in rows}
+    for user_id, version in _min_token_versions.items():
+        if version != local_versions.get(user_id) and version > loaded.get(user_id, 0):
+            loaded[user_id] = version
+    _min_token_versions = loaded
+    _signed_out_users = frozenset(
+        target_id for kind, target_id in jobs if kind == OffboardingKind.USER
+    ) | (_signed_out_users - local_users)
+    _signed_out_companies = frozenset(
+        target_id for kind, target_id in jobs if kind == OffboardingKind.COMPANY
+    ) | (_signed_out_companies - local_companies)
+
+
+def _refresh_revocations_forever() -> None:
+    while not _refresher_stop.wait(settings.TOKEN_REVOCATION_REFRESH_SECONDS):
+        try:
+            refresh_token_revocations()
+        except Exception:
+            logger.exception("Reloading token revocations failed; keeping the previous ones")
+
+
+def start_revocation_refresh() -> None:
+    """Reload revocations in a thread of this process, off the request path (app lifespan)"""
+    global _refresher
+    if _refresher is not None:
+        return
+    _refresher_stop.clear()
+    _refresher = threading.Thread(target=_refresh_revocations_forever, name="token-revocations", daemon=True)
+    _refresher.start()
+
+
+def stop_revocation_refresh() -> None:
+    global _refresher
+    if _refresher is None:
+        return
+    _refresher_stop.set()
+    _refresher.join(5.0)
+    _refresher = None
+
+
+def revoke_user_tokens(db: Session, user: User) -> None:
+    """Invalidate every token issued to the user so far (role change, logout, deletion)"""
+    user.token_version = (user.token_version or 0) + 1
+    user.tokens_revoked_at = datetime.now(timezone.utc)
+    user_id, version = user.id, user.token_version
+    
+    # Only enforce locally once the bump is durable
+    @event.listens_for(db, "after_commit", once=True)
+    def _apply_revocation(session):
+        _min_token_versions[user_id] = max(version, _min_token_versions.get(user_id, 0))
+
+
+def revoke_company_tokens(db: Session, company_id: int) -> int:
+    """Sign out every user of a company with two bulk statements; returns how many (caller commits)"""
+    signed_out = db.execute(
+        update(User).where(User.company_id == company_id)
+        .values(token_version=User.token_version + 1, tokens_revoked_at=datetime.now(timezone.utc))
+        .execution_options(all_tenants=True, synchronize_session=False)
+    ).rowcount
+    company_users = select(User.id).where(User.company_id == company_id).scalar_subquery()
+    db.execute(
+        update(RefreshToken).where(RefreshToken.user_id.in_(company_users), RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(timezone.utc))
+        .execution_options(all_tenants=True, include_deleted=True, synchronize_session=False)
+    )
+    
+    # Too many users to bump one by one here: refuse the whole company once the bumps are durable
+    @event.listens_for(db, "after_commit", once=True)
+    def _apply_revocation(session):
+        global _signed_out_companies
+        _signed_out_companies = _signed_out_companies | {company_id}
+    
+    return signed_out
+
+
+def is_token_revoked(user_id: int, version: int, company_id: int) -> bool:
+    return (
+        version < _min_token_versions.get(user_id, 0)
+        or user_id in _signed_out_users
+        or company_id in _signed_out_companies
+    )
+
+
+def warm_up_auth() -> None:
+    """Load the bcrypt backend and jose crypto backends ahead of the first request"""
+    get_pwd_context().handler().get_backend()
+    decode_access_token(create_access_token({"sub": "warmup"}, timedelta(minutes=1)))
+    refresh_token_revocations()
+
+
 def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
-    """Authenticate a user by email and password"""
-    user = db.query(User).filter(User.email == email).first()
+    """Authenticate a user by email and password (an outdated hash is replaced; caller commits)"""
+    # Users of a deleted company cannot sign in (the join hides soft-deleted companies)
+    user = db.query(User).join(User.company).filter(User.email == email).first()
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = get_pwd_context().verify_and_update(password, user.hashed_password)
+    if not verified:
         return None
+    if new_hash:
+        # Scheme or cost changed since this hash was made; upgrade it while we have the password
+        user.hashed_password = new_hash
     return user
 
 
@@ -60,7 +382,7 @@ async def get_current_user(
     )
     
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_access_token(token)
         email: str = payload.get("sub")
         user_id: int = payload.get("user_id")
         
@@ -72,12 +394,49 @@ async def get_current_user(
         raise credentials_exception
     
     user = db.query(User).filter(User.id == token_data.user_id).first()
-    if user is None:
+    if user is None or payload.get("ver", 0) < (user.token_version or 0):
         raise credentials_exception
     
+    # Everything the request touches from here on is scoped to the user's company
+    set_tenant(db, user.company_id)
+    
     return user
 
 
+async def get_current_principal(request: Request, token: str = Depends(oauth2_scheme)) -> Principal:
+    """Authorize from verified token claims alone (no database round trip)"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    try:
+        payload = decode_access_token(token)
+    except JWTError:
+        raise credentials_exception
+    
+    user_id = payload.get("user_id")
+    company_id = payload.get("company_id")
+    # Tokens issued before claims-based auth lack these claims; callers must log in again
+    if payload.get("sub") is None or user_id is None or company_id is None or "ver" not in payload:
+        raise credentials_exception
+    
+    if is_token_revoked(user_id, payload["ver"], company_id):
+        raise credentials_exception
+    
+    principal = Principal(
+        id=user_id,
+        email=payload["sub"],
+        role=payload["role"],
+        company_id=company_id,
+        manager_id=payload.get("manager_id"),
+        token_version=payload["ver"],
+    )
+    request_tenant(request).company_id = principal.company_id
+    return principal
+
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
@@ -95,3 +454,16 @@ def require_role(allowed_roles: list[str]):
             )
         return current_user
     return role_checker
+
+
+
+def require_principal_role(allowed_roles: list[str]):
+    """Claims-only variant of require_role"""
+    async def role_checker(principal: Principal = Depends(get_current_principal)) -> Principal:
+        if principal.role not in allowed_roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions"
+            )
+        return principal
+    return role_checker
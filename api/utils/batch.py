@@ -0,0 +1,20 @@
+from typing import Iterable, List
+from fastapi import HTTPException, status
+from api.config import settings
+
+
+def batch_ids(ids: Iterable[int]) -> List[int]:
+    """De-duplicate requested ids (keeping their order) and enforce the batch size limit"""
+    unique = list(dict.fromkeys(ids))
+    if not unique:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No ids given"
+        )
+    if len(unique) > settings.BATCH_GET_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.BATCH_GET_MAX_IDS} ids per request"
+        )
+    return unique
+
@@ -0,0 +1,35 @@
+from typing import Optional
+from fastapi import Header, HTTPException, Response, status
+
+
+def etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def set_etag(response: Response, version: int) -> None:
+    response.headers["ETag"] = etag(version)
+
+
+def if_match_version(if_match: Optional[str] = Header(None)) -> Optional[int]:
+    """Version a write is conditional on, from If-Match: "3", W/"3" or 3; None when absent or *"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="If-Match must be a single ETag returned by the API"
+        )
+
+
+def precondition_failed(current_version: int) -> HTTPException:
+    """412 for a write whose If-Match no longer matches; carries the current ETag"""
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="The resource was modified since it was read; reload it and retry",
+        headers={"ETag": etag(current_version)},
+    )
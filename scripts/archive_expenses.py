@@ -0,0 +1,29 @@
+"""
+Move old reviewed expenses into expenses_archive
+Uses EXPENSE_ARCHIVE_AFTER_MONTHS and EXPENSE_ARCHIVE_BATCH_SIZE from settings;
+pass a number of months to override the cutoff. Safe to run repeatedly (e.g. nightly from cron).
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from api.config import settings
+from api.database import engine
+from api.services.archival import archive_reviewed_expenses, months_ago
+
+
+def main():
+    months = int(sys.argv[1]) if len(sys.argv) > 1 else settings.EXPENSE_ARCHIVE_AFTER_MONTHS
+    
+    try:
+        moved = archive_reviewed_expenses(engine, months, settings.EXPENSE_ARCHIVE_BATCH_SIZE)
+        print(f"✓ Archived {moved} expenses reviewed before {months_ago(months):%Y-%m-%d}")
+    except Exception as e:
+        print(f"✗ Archiving failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark for the queued access log
+Times what a request pays to log one access record: a synchronous FileHandler
+(JSON formatted, written and flushed in the request) against the QueueHandler
+pipeline in api/log_pipeline.py, first on a normal disk, then on a disk that
+stalls STALL_SECONDS per write, where the pipeline drops instead of waiting.
+"""
+import logging
+import os
+import queue
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+
+from api.log_pipeline import JsonFormatter, DroppingQueueHandler, BatchingFileWriter, _STOP
+
+RECORDS = 20_000
+# Pause between records, standing in for the rest of the request (and the GIL
+# release that lets the writer thread run)
+GAP_SECONDS = 0.0001
+STALL_SECONDS = 0.005
+QUEUE_SIZE = 10_000
+FIELDS = {
+    "method": "GET", "path": "/api/expenses/42", "route": "GET /api/expenses/{id}", "status": 200,
+    "latency_ms": 4.2, "sql_statements": 1, "response_bytes": 367, "user_id": 7, "company_id": 3,
+}
+
+
+class _StallingStream:
+    """File wrapper whose writes take STALL_SECONDS longer (a busy or networked disk)"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, data):
+        time.sleep(STALL_SECONDS)
+        return self._stream.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def run(logger: logging.Logger, count: int) -> list[float]:
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        logger.info("request", extra={"fields": FIELDS})
+        samples.append(time.perf_counter() - started)
+        time.sleep(GAP_SECONDS)
+    return samples
+
+
+def synchronous(path: str, stall: bool, count: int) -> tuple[list[float], int]:
+    handler = logging.FileHandler(path)
+    if stall:
+        handler.stream = _StallingStream(handler.stream)
+    handler.setFormatter(JsonFormatter())
+    logger = logging.getLogger("bench.sync")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(handler)
+    samples = run(logger, count)
+    logger.removeHandler(handler)
+    handler.close()
+    return samples, 0
+
+
+def queued(path: str, stall: bool, count: int) -> tuple[list[float], int]:
+    log_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    handler = DroppingQueueHandler(log_queue)
+    writer = BatchingFileWriter(log_queue, path, batch_size=500, max_bytes=1 << 40, backup_count=0, rotate_seconds=0)
+    if stall:
+        original_open = writer._open
+
+        def open_stalling():
+            original_open()
+            writer._stream = _StallingStream(writer._stream)
+        writer._open = open_stalling
+    writer.start()
+    logger = logging.getLogger("bench.queued")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(handler)
+    samples = run(logger, count)
+    logger.removeHandler(handler)
+    log_queue.put(_STOP)
+    writer.join()
+    return samples, handler.dropped
+
+
+def report(label: str, samples: list[float], dropped: int) -> None:
+    samples.sort()
+    mean = sum(samples) / len(samples) * 1e6
+    p99 = samples[int(len(samples) * 0.99)] * 1e6
+    worst = samples[-1] * 1e6
+    print(f"  {label:<12} mean {mean:8.1f} us  p99 {p99:8.1f} us  max {worst:9.1f} us  dropped {dropped}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        for title, stall, count in (
+            ("Normal disk", False, RECORDS),
+            (f"Disk stalling {STALL_SECONDS * 1000:.0f} ms per write", True, RECORDS // 10),
+        ):
+            print(f"{title}, {count} records")
+            report("synchronous", *synchronous(os.path.join(directory, "sync.log"), stall, count))
+            report("queued", *queued(os.path.join(directory, "queued.log"), stall, count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark for the incremental analytics export (api/services/analytics_export.py)
+Exports a seeded expenses table in full, then edits and deletes a few rows and
+exports again: the second run must write only those rows, and merging both runs
+(latest version per id, tombstones dropped) must equal the live table. Peak memory
+is measured at two table sizes to show it does not grow with the table. Exits 1 on
+failure. Needs pyarrow; uses a throwaway SQLite database and export directory.
+
+Usage: python scripts/bench_analytics_export.py [--rows 200000]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_export.db")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ["EXPORT_SETTLE_SECONDS"] = "0"
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+from sqlalchemy import insert, select, update
+from api.database import engine, Base
+from api.models import Company, User, Expense
+from api.models.expense import ExpenseCategory, ExpenseStatus
+from api.models.user import UserRole
+from api.services.analytics_export import export_expenses
+
+COMPANIES = 5
+CHANGED = 500
+
+
+def seed(rows: int) -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    start = datetime(2026, 1, 1)
+    categories = list(ExpenseCategory)
+    with engine.begin() as conn:
+        conn.execute(insert(Company), [{"id": c, "name": f"Company {c}"} for c in range(1, COMPANIES + 1)])
+        conn.execute(insert(User), [
+            {"id": c, "email": f"user{c}@bench.test", "hashed_password": "x", "full_name": f"User {c}",
+             "role": UserRole.EMPLOYEE, "company_id": c}
+            for c in range(1, COMPANIES + 1)
+        ])
+        for offset in range(0, rows, 10000):
+            conn.execute(insert(Expense), [
+                {
+                    "title": f"Expense {n}", "amount": Decimal(n % 500) + Decimal("0.99"),
+                    "category": categories[n % len(categories)], "status": ExpenseStatus.PENDING,
+                    "user_id": n % COMPANIES + 1, "company_id": n % COMPANIES + 1, "approval_chain": [],
+                    "submitted_at": start + timedelta(minutes=n), "updated_at": start + timedelta(minutes=n),
+                }
+                for n in range(offset, min(offset + 10000, rows))
+            ])
+
+
+def full_export(rows: int, export_dir: str):
+    seed(rows)
+    shutil.rmtree(export_dir, ignore_errors=True)
+    start = time.perf_counter()
+    result = export_expenses(engine, export_dir)
+    elapsed = time.perf_counter() - start
+    # Again under tracemalloc, which slows the run down too much to time it
+    shutil.rmtree(export_dir, ignore_errors=True)
+    tracemalloc.start()
+    export_expenses(engine, export_dir)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def merged(export_dir: str) -> dict:
+    """Latest version of every exported expense, tombstones dropped"""
+    # Partition keys are also stored in the files; declare their types to match
+    partitioning = ds.partitioning(pa.schema([("company_id", pa.int64()), ("month", pa.string())]), flavor="hive")
+    table = ds.dataset(os.path.join(export_dir, "expenses"), format="parquet", partitioning=partitioning).to_table(
+        columns=["id", "version", "op", "amount"]
+    )
+    latest = {}
+    for row in table.to_pylist():
+        if row["id"] not in latest or row["version"] > latest[row["id"]]["version"]:
+            latest[row["id"]] = row
+    return {id_: (row["version"], row["amount"]) for id_, row in latest.items() if row["op"] == "upsert"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+    export_dir = tempfile.mkdtemp(prefix="bench_export_")
+    failures = []
+
+    _, _, small_peak = full_export(args.rows // 4, export_dir)
+    result, elapsed, peak = full_export(args.rows, export_dir)
+    if result.rows != args.rows:
+        failures.append(f"full export wrote {result.rows} rows, expected {args.rows}")
+    if peak > small_peak * 1.5:
+        failures.append(f"peak memory grew with the table: {small_peak / 1e6:.1f} MB -> {peak / 1e6:.1f} MB")
+
+    # Edit some rows, soft-delete others; updated_at is bumped by the database
+    with engine.begin() as conn:
+        conn.execute(update(Expense).where(Expense.id <= CHANGED).values(amount=Expense.amount + 1, version=Expense.version + 1))
+        conn.execute(update(Expense).where(Expense.id > args.rows - CHANGED).values(
+            deleted_at=datetime.utcnow(), version=Expense.version + 1
+        ))
+    time.sleep(1.1)  # SQLite timestamps have one second resolution
+    incremental = export_expenses(engine, export_dir)
+    if (incremental.rows, incremental.tombstones) != (2 * CHANGED, CHANGED):
+        failures.append(f"incremental run wrote {incremental.rows} rows / {incremental.tombstones} tombstones, "
+                        f"expected {2 * CHANGED} / {CHANGED}")
+    again = export_expenses(engine, export_dir)
+    if again.rows:
+        failures.append(f"a run without changes wrote {again.rows} rows")
+
+    with engine.connect() as conn:
+        live = {row.id: (row.version, row.amount) for row in conn.execute(
+            select(Expense.__table__.c.id, Expense.__table__.c.version, Expense.__table__.c.amount)
+            .where(Expense.__table__.c.deleted_at.is_(None))
+        )}
+    if merged(export_dir) != live:
+        failures.append("merged export differs from the live table")
+
+    engine.dispose()
+    shutil.rmtree(export_dir, ignore_errors=True)
+    if os.path.exists("bench_export.db"):
+        os.remove("bench_export.db")
+    if failures:
+        for failure in failures:
+            print(f"✗ {failure}")
+        sys.exit(1)
+    print(f"✓ Full export of {args.rows} rows to {result.files} files in {elapsed:.1f} s ({args.rows / elapsed:,.0f} rows/s), "
+          f"peak {peak / 1e6:.1f} MB ({small_peak / 1e6:.1f} MB at a quarter of the rows)")
+    print(f"✓ Incremental run wrote only the {incremental.rows} changed rows, merge matches the live table")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark for compiled approval policies (api/services/approvals.py)
+Compares picking the approval steps for a submission by querying and filtering the
+company's rules on every call against the cached, compiled ApprovalPolicy.
+Uses an in-memory SQLite database with a few dozen rules.
+"""
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+
+from api.database import engine, SessionLocal, Base, set_tenant
+from api.models import Company, ApprovalRule, ApproverType
+from api.models.expense import ExpenseCategory
+from api.services.approvals import get_approval_policy
+
+ITERATIONS = 20000
+CATEGORIES = list(ExpenseCategory)
+
+
+def seed(db) -> int:
+    company = Company(name="Bench Corp")
+    db.add(company)
+    db.flush()
+    for i in range(40):
+        db.add(ApprovalRule(
+            company_id=company.id,
+            category=random.choice(CATEGORIES + [None]),
+            min_amount=Decimal(random.randint(0, 20) * 250),
+            approver_type=ApproverType.MANAGER_CHAIN,
+            manager_level=random.randint(1, 3),
+        ))
+    db.commit()
+    return company.id
+
+
+def query_steps(db, company_id: int, category: ExpenseCategory, amount: Decimal) -> list:
+    """What evaluation costs without the compiled policy"""
+    rules = db.query(ApprovalRule).filter(
+        ApprovalRule.company_id == company_id,
+        ApprovalRule.min_amount <= amount,
+        (ApprovalRule.category == category) | ApprovalRule.category.is_(None),
+    ).order_by(ApprovalRule.min_amount, ApprovalRule.id).all()
+    return [(rule.approver_type, rule.manager_level) for rule in rules]
+
+
+def measure(label: str, fn, submissions) -> float:
+    start = time.perf_counter()
+    for category, amount in submissions:
+        fn(category, amount)
+    per_call = (time.perf_counter() - start) / len(submissions) * 1e6
+    print(f"  {label:<24} {per_call:8.2f} us/submission")
+    return per_call
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    company_id = seed(db)
+    set_tenant(db, company_id)
+    submissions = [
+        (random.choice(CATEGORIES), Decimal(random.randint(1, 600000)) / 100) for _ in range(ITERATIONS)
+    ]
+
+    # Both must agree before timing them
+    policy = get_approval_policy(db, company_id)
+    for category, amount in submissions[:500]:
+        assert list(policy.steps_for(category, amount)) == query_steps(db, company_id, category, amount)
+
+    print("Picking approval steps for a submission")
+    before = measure("Query rules", lambda c, a: query_steps(db, company_id, c, a), submissions[:2000])
+    after = measure("Compiled policy", lambda c, a: get_approval_policy(db, company_id).steps_for(c, a), submissions)
+    print(f"  {'Speed-up':<24} {before / after:8.0f} x")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark for claims-based authorization
+Measures authenticated request throughput on GET /api/expenses/{id} when the caller
+is resolved by loading the User row (before) versus from verified token claims (after).
+Uses a throwaway SQLite database and FastAPI's in-process test client.
+"""
+import os
+import sys
+import time
+from decimal import Decimal
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_auth.db")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+from fastapi import Depends
+from fastapi.testclient import TestClient
+from api.main import app
+from api.database import engine, SessionLocal, Base
+from api.models import Company, User, Expense
+from api.models.user import UserRole
+from api.models.expense import ExpenseCategory
+from api.schemas.token import Principal
+from api.utils.auth import create_access_token, get_current_principal, get_current_user, token_claims
+
+REQUESTS = 2000
+
+
+def seed() -> tuple[str, int]:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    company = Company(name="Bench Corp")
+    db.add(company)
+    db.flush()
+    user = User(email="bench@corp.test", hashed_password="x", full_name="Bench", role=UserRole.EMPLOYEE, company_id=company.id)
+    db.add(user)
+    db.flush()
+    expense = Expense(title="Taxi", amount=Decimal("12.00"), category=ExpenseCategory.TRAVEL, user_id=user.id, company_id=company.id)
+    db.add(expense)
+    db.commit()
+    token = create_access_token(token_claims(user))
+    expense_id = expense.id
+    db.close()
+    return token, expense_id
+
+
+async def principal_from_db(user: User = Depends(get_current_user)) -> Principal:
+    """The pre-claims behaviour: every request loads the User row"""
+    return Principal(
+        id=user.id, email=user.email, role=user.role, company_id=user.company_id,
+        manager_id=user.manager_id, token_version=user.token_version,
+    )
+
+
+def run(client: TestClient, token: str, expense_id: int) -> float:
+    headers = {"Authorization": f"Bearer {token}"}
+    for _ in range(50):
+        client.get(f"/api/expenses/{expense_id}", headers=headers)
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        response = client.get(f"/api/expenses/{expense_id}", headers=headers)
+        assert response.status_code == 200, response.text
+    return REQUESTS / (time.perf_counter() - start)
+
+
+def main():
+    token, expense_id = seed()
+    with TestClient(app) as client:
+        app.dependency_overrides[get_current_principal] = principal_from_db
+        before = run(client, token, expense_id)
+        app.dependency_overrides.clear()
+        after = run(client, token, expense_id)
+
+    print(f"GET /api/expenses/{{id}}, {REQUESTS} requests")
+    print(f"  User row per request:  {before:8.0f} req/s")
+    print(f"  Claims only:           {after:8.0f} req/s ({(after / before - 1) * 100:+.0f} %)")
+    engine.dispose()
+    if os.path.exists("bench_auth.db"):
+        os.remove("bench_auth.db")
+
+
+if __name__ == "__main__":
+    main()
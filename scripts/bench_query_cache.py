@@ -0,0 +1,124 @@
+"""
+Benchmark for the prebuilt statement registry (api/queries.py)
+Compares the per-request Python cost of building the list_expenses and stats
+queries with Query chains against executing the prebuilt statements.
+Uses an in-memory SQLite database with a handful of rows so query building dominates.
+"""
+import os
+import sys
+import time
+from decimal import Decimal
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+
+from sqlalchemy import or_, func
+from api import queries
+from api.database import engine, SessionLocal, Base, set_tenant
+from api.models import Company, User, Expense
+from api.models.user import UserRole
+from api.models.expense import ExpenseStatus, ExpenseCategory
+
+ITERATIONS = 3000
+ROLES = [UserRole.ADMIN, UserRole.MANAGER, UserRole.EMPLOYEE]
+FILTERS = [
+    (None, None),
+    (ExpenseStatus.PENDING, None),
+    (None, ExpenseCategory.TRAVEL),
+    (ExpenseStatus.APPROVED, ExpenseCategory.MEALS),
+]
+
+
+def seed(db):
+    company = Company(name="Bench Corp")
+    db.add(company)
+    db.flush()
+    user = User(email="bench@corp.test", hashed_password="x", full_name="Bench", role=UserRole.MANAGER, company_id=company.id)
+    db.add(user)
+    db.flush()
+    for i in range(20):
+        db.add(Expense(
+            title=f"Expense {i}",
+            amount=Decimal("10.00"),
+            category=list(ExpenseCategory)[i % 6],
+            status=list(ExpenseStatus)[i % 3],
+            user_id=user.id,
+            company_id=company.id,
+            manager_id=user.id,
+        ))
+    db.commit()
+    return user
+
+
+def legacy_list(db, user, role, status_filter, category_filter):
+    query = db.query(Expense)
+    if role == UserRole.MANAGER:
+        query = query.filter(or_(Expense.user_id == user.id, Expense.manager_id == user.id))
+    elif role == UserRole.EMPLOYEE:
+        query = query.filter(Expense.user_id == user.id)
+    if status_filter:
+        query = query.filter(Expense.status == status_filter)
+    if category_filter:
+        query = query.filter(Expense.category == category_filter)
+    return query.offset(0).limit(100).all()
+
+
+def registry_list(db, user, role, status_filter, category_filter):
+    stmt = queries.list_expenses_statement(
+        queries.expense_scope(role), status_filter is not None, category_filter is not None
+    )
+    return db.scalars(stmt, {
+        "user_id": user.id, "status": status_filter, "category": category_filter, "skip": 0, "limit": 100,
+    }).all()
+
+
+def legacy_stats(db, user, role):
+    base_query = db.query(Expense).filter(Expense.user_id == user.id)
+    base_query.count()
+    base_query.filter(Expense.status == ExpenseStatus.PENDING).count()
+    base_query.filter(Expense.status == ExpenseStatus.APPROVED).count()
+    base_query.filter(Expense.status == ExpenseStatus.REJECTED).count()
+    base_query.with_entities(func.sum(Expense.amount)).scalar()
+    base_query.filter(Expense.status == ExpenseStatus.APPROVED).with_entities(func.sum(Expense.amount)).scalar()
+
+
+def registry_stats(db, user, role):
+    db.execute(queries.expense_stats_statement(queries.expense_scope(role)), {"user_id": user.id}).one()
+
+
+def measure(label, fn, db, user, combos) -> float:
+    for combo in combos:
+        fn(db, user, *combo)  # Warm SQLAlchemy's compiled cache
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        for combo in combos:
+            fn(db, user, *combo)
+    per_call = (time.perf_counter() - start) / (ITERATIONS * len(combos)) * 1e6
+    print(f"  {label:<28} {per_call:8.1f} us/request")
+    return per_call
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = seed(db)
+    set_tenant(db, user.company_id)
+
+    list_combos = [(role, status, category) for role in ROLES for status, category in FILTERS]
+    print(f"list_expenses ({len(list_combos)} role/filter combinations)")
+    before = measure("Query chain", legacy_list, db, user, list_combos)
+    after = measure("Prebuilt statement", registry_list, db, user, list_combos)
+    print(f"  {'Reduction':<28} {(1 - after / before) * 100:8.1f} %")
+
+    stats_combos = [(role,) for role in ROLES]
+    print("get_expense_stats")
+    before = measure("Six Query round trips", legacy_stats, db, user, stats_combos)
+    after = measure("One prebuilt aggregate", registry_stats, db, user, stats_combos)
+    print(f"  {'Reduction':<28} {(1 - after / before) * 100:8.1f} %")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
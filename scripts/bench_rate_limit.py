@@ -0,0 +1,76 @@
+"""
+Benchmark for the rate limiting middleware
+Measures the per-request overhead the middleware adds on top of a bare ASGI app
+"""
+import asyncio
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+
+from api.middleware.rate_limit import RateLimitMiddleware, InMemoryRateLimitStore
+from api.utils.auth import create_access_token
+
+REQUESTS = 100_000
+BUDGET_US = 50.0
+
+
+async def bare_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def make_scope(token: str, expense_id: int) -> dict:
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": f"/api/expenses/{expense_id}",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 5000),
+    }
+
+
+async def run(app, scopes) -> float:
+    start = time.perf_counter()
+    for scope in scopes:
+        await app(dict(scope), receive, send)
+    return time.perf_counter() - start
+
+
+async def main():
+    token = create_access_token({"sub": "bench@acme.com", "user_id": 1, "role": "employee", "company_id": 1})
+    scopes = [make_scope(token, i % 500) for i in range(REQUESTS)]
+
+    # Quotas high enough that every request is admitted
+    store = InMemoryRateLimitStore()
+    limited = RateLimitMiddleware(bare_app, store=store)
+    limited.role_quotas = {"employee": REQUESTS * 10}
+    limited.company_quota = REQUESTS * 10
+
+    await run(limited, scopes[:1000])  # Warm the claims and route caches
+    bare = await run(bare_app, scopes)
+    wrapped = await run(limited, scopes)
+
+    overhead_us = (wrapped - bare) / REQUESTS * 1e6
+    print(f"Requests:           {REQUESTS}")
+    print(f"Bare app:           {bare / REQUESTS * 1e6:.2f} us/request")
+    print(f"With rate limiting: {wrapped / REQUESTS * 1e6:.2f} us/request")
+    print(f"Overhead:           {overhead_us:.2f} us/request (budget {BUDGET_US:.0f} us)")
+    if overhead_us > BUDGET_US:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,156 @@
+"""
+Benchmark for bulk recurring expense generation (api/services/recurring.py)
+Seeds many monthly templates across a few companies, with a budget, a three-level
+hierarchy and a manager_chain approval rule, and generates two months at once (a
+catch-up after a missed run). A rerun must create nothing, every template must have
+exactly its due occurrences with the right approval chain, and the SQL statements
+must not grow with the number of templates. Exits 1 on failure.
+Uses a throwaway SQLite database.
+
+Usage: python scripts/bench_recurring_expenses.py [--templates 100000]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+from decimal import Decimal
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_recurring.db")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+
+from sqlalchemy import event, func, insert, select
+from api.config import settings
+from api.database import engine, SessionLocal, Base
+from api.models import Company, User, Expense
+from api.models.approval_rule import ApprovalRule, ApproverType
+from api.models.budget import Budget, BudgetBalance
+from api.models.expense import ExpenseCategory
+from api.models.recurring_expense import RecurringExpense, RecurrenceFrequency
+from api.models.user import UserRole
+from api.services.recurring import generate_recurring_expenses
+
+COMPANIES = 10
+USERS_PER_COMPANY = 100
+MANAGERS_PER_COMPANY = 9
+START = date(2024, 1, 15)
+AMOUNT = Decimal("12.50")
+
+
+def manager_of(user_id: int) -> int | None:
+    """Per company: one director, MANAGERS_PER_COMPANY managers under them, then employees"""
+    first = (user_id - 1) // USERS_PER_COMPANY * USERS_PER_COMPANY + 1
+    index = user_id - first
+    if index == 0:
+        return None
+    if index <= MANAGERS_PER_COMPANY:
+        return first
+    return first + 1 + index % MANAGERS_PER_COMPANY
+
+
+def expected_chain(user_id: int) -> list[int]:
+    """The direct manager, then the manager_level=2 rule's approver"""
+    chain = []
+    manager = manager_of(user_id)
+    if manager is not None:
+        chain.append(manager)
+        if manager_of(manager) is not None:
+            chain.append(manager_of(manager))
+    return chain
+
+
+def seed(templates: int) -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Company), [{"id": c, "name": f"Company {c}"} for c in range(1, COMPANIES + 1)])
+        conn.execute(insert(User), [
+            {
+                "id": u, "email": f"user{u}@bench.test", "hashed_password": "x", "full_name": f"User {u}",
+                "role": UserRole.EMPLOYEE, "company_id": (u - 1) // USERS_PER_COMPANY + 1,
+                "manager_id": manager_of(u),
+            }
+            for u in range(1, COMPANIES * USERS_PER_COMPANY + 1)
+        ])
+        conn.execute(insert(ApprovalRule), [
+            {"company_id": c, "min_amount": 0, "approver_type": ApproverType.MANAGER_CHAIN, "manager_level": 2}
+            for c in range(1, COMPANIES + 1)
+        ])
+        conn.execute(insert(Budget), [
+            {"company_id": c, "period": "monthly", "amount": Decimal("1000000")} for c in range(1, COMPANIES + 1)
+        ])
+        users = COMPANIES * USERS_PER_COMPANY
+        conn.execute(insert(RecurringExpense), [
+            {
+                "company_id": (t % users) // USERS_PER_COMPANY + 1, "user_id": t % users + 1,
+                "title": f"Subscription {t}", "amount": AMOUNT, "category": ExpenseCategory.SOFTWARE,
+                "frequency": RecurrenceFrequency.MONTHLY, "start_on": START, "next_run_on": START,
+            }
+            for t in range(templates)
+        ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--templates", type=int, default=100_000)
+    args = parser.parse_args()
+
+    seed(args.templates)
+    failures = []
+    statements = [0]
+
+    def count(*_):
+        statements[0] += 1
+
+    db = SessionLocal()
+    try:
+        # Two occurrences due per template: the generator was down for a month
+        event.listen(engine, "before_cursor_execute", count)
+        start = time.perf_counter()
+        created = generate_recurring_expenses(db, date(2024, 2, 20))
+        elapsed = time.perf_counter() - start
+        event.remove(engine, "before_cursor_execute", count)
+        rerun = generate_recurring_expenses(db, date(2024, 2, 20))
+    finally:
+        db.close()
+
+    expected = args.templates * 2
+    with engine.connect() as conn:
+        stored = conn.scalar(select(func.count()).select_from(Expense))
+        distinct = conn.scalar(select(func.count()).select_from(
+            select(Expense.recurring_id, Expense.occurrence_on).distinct().subquery()
+        ))
+        reserved = conn.scalar(select(func.coalesce(func.sum(BudgetBalance.reserved), 0)))
+        behind = conn.scalar(select(func.count()).where(RecurringExpense.next_run_on != date(2024, 3, 15)))
+        chains = conn.execute(select(Expense.user_id, Expense.approval_chain).distinct()).all()
+    if created != expected or stored != expected or distinct != expected:
+        failures.append(f"created {created}, stored {stored} ({distinct} distinct), expected {expected}")
+    if rerun:
+        failures.append(f"rerun created {rerun} duplicates")
+    if Decimal(reserved) != AMOUNT * expected:
+        failures.append(f"budgets reserved {reserved}, expected {AMOUNT * expected}")
+    if behind:
+        failures.append(f"{behind} templates not advanced to the next occurrence")
+    wrong = sum(chain != expected_chain(user_id) for user_id, chain in chains)
+    if wrong:
+        failures.append(f"{wrong} users got the wrong approval chain")
+    # A few statements per company and batch, whatever the batch size (no lookups per template)
+    batches = -(-args.templates // settings.RECURRING_BATCH_SIZE)
+    if statements[0] > (batches + 1) * (COMPANIES + 1) * 12:
+        failures.append(f"{statements[0]} SQL statements for {batches} batches")
+
+    engine.dispose()
+    if os.path.exists("bench_recurring.db"):
+        os.remove("bench_recurring.db")
+    if failures:
+        for failure in failures:
+            print(f"✗ {failure}")
+        sys.exit(1)
+    print(f"✓ {args.templates} templates: {created} expenses generated in {elapsed:.1f} s "
+          f"({created / elapsed:,.0f}/s, {statements[0]} SQL statements), rerun created none")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark for sparse fieldsets and response compression
+Reports the bytes on the wire for one page of GET /api/expenses with every field
+versus a dashboard's ?fields= selection, for each supported Content-Encoding.
+Uses a throwaway SQLite database and FastAPI's in-process test client.
+"""
+import os
+import sys
+import time
+from decimal import Decimal
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_response.db")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+from fastapi.testclient import TestClient
+from api.main import app
+from api.database import engine, SessionLocal, Base
+from api.models import Company, User, Expense
+from api.models.user import UserRole
+from api.models.expense import ExpenseCategory
+from api.utils.auth import create_access_token, token_claims
+
+PAGE = 100
+REPEAT = 50
+DASHBOARD_FIELDS = "title,amount,status,submitted_at"
+ENCODINGS = ["identity", "gzip", "br", "zstd"]
+
+
+def seed() -> str:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    company = Company(name="Bench Corp")
+    db.add(company)
+    db.flush()
+    user = User(email="bench@corp.test", hashed_password="x", full_name="Bench", role=UserRole.EMPLOYEE, company_id=company.id)
+    db.add(user)
+    db.flush()
+    for i in range(PAGE):
+        db.add(Expense(
+            title=f"Client visit {i}",
+            amount=Decimal("84.20"),
+            category=ExpenseCategory.TRAVEL,
+            description="Train tickets and a taxi from the station to the client office. " * 8,
+            user_id=user.id,
+            company_id=company.id,
+        ))
+    db.commit()
+    token = create_access_token(token_claims(user))
+    db.close()
+    return token
+
+
+def measure(client: TestClient, url: str, token: str, encoding: str) -> tuple[int, float]:
+    headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": encoding}
+    # The stream keeps the body as sent, before the client decodes it
+    with client.stream("GET", url, headers=headers) as response:
+        assert response.status_code == 200, response.read()
+        if encoding != "identity" and response.headers.get("content-encoding") != encoding:
+            return 0, 0.0  # Compression library not installed
+        size = len(b"".join(response.iter_raw()))
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        client.get(url, headers=headers)
+    return size, (time.perf_counter() - start) / REPEAT * 1000
+
+
+def main():
+    token = seed()
+    with TestClient(app) as client:
+        for label, url in [
+            ("All fields", f"/api/expenses/?limit={PAGE}"),
+            (f"fields={DASHBOARD_FIELDS}", f"/api/expenses/?limit={PAGE}&fields={DASHBOARD_FIELDS}"),
+        ]:
+            print(f"{label} ({PAGE} expenses)")
+            for encoding in ENCODINGS:
+                size, ms = measure(client, url, token, encoding)
+                if size:
+                    print(f"  {encoding:<10} {size:8d} bytes  {ms:6.2f} ms/request")
+                else:
+                    print(f"  {encoding:<10} (not installed)")
+    engine.dispose()
+    if os.path.exists("bench_response.db"):
+        os.remove("bench_response.db")
+
+
+if __name__ == "__main__":
+    main()
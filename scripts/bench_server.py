@@ -0,0 +1,134 @@
+"""
+Benchmark for the production server entry point
+Starts the app the way the dev launcher in api/main.py does (one process, asyncio
+loop, h11 parser) and then through `python -m api.server` (one worker per CPU, uvloop
+and httptools when installed), and drives both with keep-alive clients in several
+processes on GET /health and an authenticated GET /api/expenses/{id}.
+Uses a throwaway SQLite database. Gains scale with the cores available.
+"""
+import http.client
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from decimal import Decimal
+
+# Add parent directory to path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_server.db")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+from api.database import engine, SessionLocal, Base
+from api.models import Company, User, Expense
+from api.models.user import UserRole
+from api.models.expense import ExpenseCategory
+from api.server import available_cpus
+from api.utils.auth import create_access_token, token_claims
+
+PORT = 8765
+CLIENTS = 8
+DURATION = 5.0
+
+
+def seed() -> tuple[str, int]:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    company = Company(name="Bench Corp")
+    db.add(company)
+    db.flush()
+    user = User(email="bench@corp.test", hashed_password="x", full_name="Bench", role=UserRole.EMPLOYEE, company_id=company.id)
+    db.add(user)
+    db.flush()
+    expense = Expense(title="Taxi", amount=Decimal("12.00"), category=ExpenseCategory.TRAVEL, user_id=user.id, company_id=company.id)
+    db.add(expense)
+    db.commit()
+    token = create_access_token(token_claims(user))
+    expense_id = expense.id
+    db.close()
+    engine.dispose()
+    return token, expense_id
+
+
+def wait_until_up(timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", PORT, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def client(path: str, headers: dict, duration: float, results) -> None:
+    conn = http.client.HTTPConnection("127.0.0.1", PORT)
+    count = errors = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        if response.status == 200:
+            count += 1
+        else:
+            errors += 1
+    conn.close()
+    results.put((count, errors))
+
+
+def drive(path: str, headers: dict) -> float:
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=client, args=(path, headers, DURATION, results))
+        for _ in range(CLIENTS)
+    ]
+    for worker in workers:
+        worker.start()
+    totals = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    errors = sum(errors for _, errors in totals)
+    if errors:
+        raise RuntimeError(f"{errors} failed requests on {path}")
+    return sum(count for count, _ in totals) / DURATION
+
+
+def measure(label: str, command: list[str], token: str, expense_id: int) -> tuple[float, float]:
+    server = subprocess.Popen(command, cwd=ROOT, env=os.environ.copy(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up()
+        health = drive("/health", {})
+        expense = drive(f"/api/expenses/{expense_id}", {"Authorization": f"Bearer {token}"})
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+    print(f"{label:<28} /health {health:8.0f} req/s   /api/expenses/{{id}} {expense:8.0f} req/s")
+    return health, expense
+
+
+def main():
+    token, expense_id = seed()
+    print(f"{available_cpus()} CPU(s), {CLIENTS} keep-alive clients, {DURATION:.0f}s per endpoint\n")
+    before = measure(
+        "dev launcher (1 process)",
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(PORT),
+         "--loop", "asyncio", "--http", "h11", "--log-level", "warning"],
+        token, expense_id,
+    )
+    after = measure(
+        "api.server",
+        [sys.executable, "-m", "api.server", "--host", "127.0.0.1", "--port", str(PORT)],
+        token, expense_id,
+    )
+    print(f"\nSpeedup: /health {after[0] / before[0]:.2f}x, /api/expenses/{{id}} {after[1] / before[1]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
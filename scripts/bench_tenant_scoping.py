@@ -0,0 +1,132 @@
+"""
+Benchmark for tenant-scoped queries with 1,000 companies of skewed (Zipf) sizes
+Runs against DATABASE_URL (a throwaway SQLite file by default). The database is
+wiped and re-seeded. On PostgreSQL pass --partitions N to partition expenses first.
+
+Usage: python scripts/bench_tenant_scoping.py [--expenses 300000] [--partitions 16]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_tenants.db")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+
+from sqlalchemy import func, insert, text
+from api.database import engine, SessionLocal, Base, set_tenant
+from api.models import Company, User, Expense
+from api.models.user import UserRole
+from api.models.expense import ExpenseStatus, ExpenseCategory
+from api.services.partitioning import partition_expenses_by_company
+
+TENANTS = 1000
+REPEAT = 50
+
+
+def zipf_sizes(total: int, tenants: int, skew: float = 1.1) -> list[int]:
+    weights = [1 / (rank ** skew) for rank in range(1, tenants + 1)]
+    scale = total / sum(weights)
+    return [max(1, int(weight * scale)) for weight in weights]
+
+
+def seed(total_expenses: int) -> list[int]:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    sizes = zipf_sizes(total_expenses, TENANTS)
+
+    with engine.begin() as conn:
+        conn.execute(insert(Company), [{"id": i + 1, "name": f"Tenant {i + 1}"} for i in range(TENANTS)])
+        conn.execute(insert(User), [
+            {
+                "id": i + 1,
+                "email": f"user{i + 1}@tenant.test",
+                "hashed_password": "x",
+                "full_name": f"User {i + 1}",
+                "role": UserRole.EMPLOYEE,
+                "company_id": i + 1,
+            }
+            for i in range(TENANTS)
+        ])
+        statuses = list(ExpenseStatus)
+        categories = list(ExpenseCategory)
+        batch = []
+        for company_id, size in enumerate(sizes, start=1):
+            for _ in range(size):
+                batch.append({
+                    "title": "Expense",
+                    "amount": Decimal(random.randint(100, 100000)) / 100,
+                    "category": random.choice(categories),
+                    "status": random.choice(statuses),
+                    "user_id": company_id,
+                    "company_id": company_id,
+                })
+                if len(batch) >= 10_000:
+                    conn.execute(insert(Expense), batch)
+                    batch = []
+        if batch:
+            conn.execute(insert(Expense), batch)
+    return sizes
+
+
+def time_tenant(company_id: int) -> float:
+    """Average ms for a scoped page plus scoped stats for one tenant"""
+    db = SessionLocal()
+    try:
+        set_tenant(db, company_id)
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            db.query(Expense).filter(Expense.status == ExpenseStatus.PENDING).limit(100).all()
+            db.query(func.count(Expense.id), func.sum(Expense.amount)).one()
+        return (time.perf_counter() - start) / REPEAT * 1000
+    finally:
+        db.close()
+
+
+def report(label: str, buckets: dict[str, list[int]]) -> None:
+    print(f"\n{label}")
+    for name, company_ids in buckets.items():
+        timings = sorted(time_tenant(company_id) for company_id in company_ids)
+        print(f"  {name:<8} p50 {timings[len(timings) // 2]:8.3f} ms   max {timings[-1]:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--expenses", type=int, default=300_000)
+    parser.add_argument("--partitions", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"Seeding {args.expenses} expenses over {TENANTS} tenants ({engine.dialect.name})...")
+    sizes = seed(args.expenses)
+    print(f"Largest tenant: {sizes[0]} rows, median tenant: {sizes[TENANTS // 2]} rows")
+
+    # Tenant ids are ranked by size: 1 is the largest
+    buckets = {
+        "large": list(range(1, 11)),
+        "medium": list(range(100, 110)),
+        "small": list(range(990, 1001)),
+    }
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_expenses_company_id"))
+    report("Scoped queries without the company_id index", buckets)
+
+    for index in Expense.__table__.indexes:
+        if index.name == "ix_expenses_company_id":
+            index.create(engine)
+    report("Scoped queries with the company_id index", buckets)
+
+    if args.partitions:
+        large = buckets["large"]
+        partition_expenses_by_company(engine, args.partitions, large)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE expenses"))
+        report(f"Partitioned ({len(large)} dedicated + {args.partitions} hash partitions)", buckets)
+
+
+if __name__ == "__main__":
+    main()
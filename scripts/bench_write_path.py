@@ -0,0 +1,162 @@
+"""
+Benchmark for the RETURNING-based write path
+Compares approving an expense and editing its title the old way (load the caller,
+load the expense, check in Python, UPDATE, refresh with a SELECT) against the single
+UPDATE ... RETURNING statements in api/queries.py. Runs against a SQLite file, once
+as is and once with a simulated network round trip per statement, since that is
+what the saved statements cost on a real database server.
+"""
+import os
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_write_path.db")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+
+from sqlalchemy import event
+from api import queries
+from api.database import engine, SessionLocal, Base, set_tenant
+from api.models import Company, User, Expense
+from api.models.user import UserRole
+from api.models.expense import ExpenseStatus, ExpenseCategory
+from api.services.approvals import start_approval
+
+OPERATIONS = 1000
+ROUND_TRIP_SECONDS = 0.0005
+
+statements = 0
+round_trip = 0.0
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+    if round_trip:
+        time.sleep(round_trip)
+
+
+def seed() -> tuple[int, int, list[int]]:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    company = Company(name="Bench Corp")
+    db.add(company)
+    db.flush()
+    manager = User(email="manager@corp.test", hashed_password="x", full_name="Manager", role=UserRole.MANAGER, company_id=company.id)
+    db.add(manager)
+    db.flush()
+    employee = User(email="employee@corp.test", hashed_password="x", full_name="Employee", role=UserRole.EMPLOYEE, company_id=company.id, manager_id=manager.id)
+    db.add(employee)
+    db.flush()
+    expenses = []
+    for i in range(OPERATIONS * 4):
+        expense = Expense(
+            title=f"Taxi {i}", amount=Decimal("12.00"), category=ExpenseCategory.TRAVEL,
+            user_id=employee.id, company_id=company.id, manager_id=manager.id,
+        )
+        start_approval(expense, [manager.id])
+        expenses.append(expense)
+    db.add_all(expenses)
+    db.commit()
+    ids = [expense.id for expense in expenses]
+    result = (manager.id, employee.id, ids)
+    db.close()
+    return result
+
+
+def approve_before(db, manager_id: int, expense_id: int) -> None:
+    """Caller lookup, expense SELECT, checks in Python, UPDATE on commit, refresh SELECT"""
+    user = db.query(User).filter(User.id == manager_id).first()
+    set_tenant(db, user.company_id)
+    expense = db.query(Expense).filter(Expense.id == expense_id).first()
+    assert expense.status == ExpenseStatus.PENDING and expense.current_approver_id == user.id
+    if expense.approval_step + 1 < len(expense.approval_chain):
+        expense.approval_step += 1
+        expense.current_approver_id = expense.approval_chain[expense.approval_step]
+    else:
+        expense.status = ExpenseStatus.APPROVED
+        expense.current_approver_id = None
+        expense.reviewed_at = datetime.utcnow()
+    db.commit()
+    db.refresh(expense)
+
+
+def approve_after(db, manager_id: int, expense_id: int) -> None:
+    """Claims-based caller, one UPDATE ... RETURNING"""
+    set_tenant(db, 1)
+    expense = db.scalar(
+        queries.decide_expense_statement(True, True),
+        {"expense_id": expense_id, "approver_id": manager_id, "now": datetime.utcnow()},
+    )
+    assert expense is not None
+    db.commit()
+
+
+def edit_before(db, employee_id: int, expense_id: int) -> None:
+    user = db.query(User).filter(User.id == employee_id).first()
+    set_tenant(db, user.company_id)
+    expense = db.query(Expense).filter(Expense.id == expense_id).first()
+    assert expense.user_id == user.id and expense.status == ExpenseStatus.PENDING
+    expense.title = "Edited"
+    db.commit()
+    db.refresh(expense)
+
+
+def edit_after(db, employee_id: int, expense_id: int) -> None:
+    set_tenant(db, 1)
+    expense = db.scalar(
+        queries.edit_expense_statement(frozenset({"title"})),
+        {"expense_id": expense_id, "owner_id": employee_id, "new_title": "Edited"},
+    )
+    assert expense is not None
+    db.commit()
+
+
+def measure(operation, user_id: int, ids: list[int]) -> tuple[float, float]:
+    global statements
+    # expire_on_commit=True reproduces the old session setup, where refresh was needed
+    expire = operation in (approve_before, edit_before)
+    statements = 0
+    start = time.perf_counter()
+    for expense_id in ids:
+        db = SessionLocal(expire_on_commit=expire)
+        operation(db, user_id, expense_id)
+        db.close()
+    elapsed = time.perf_counter() - start
+    return len(ids) / elapsed, statements / len(ids)
+
+
+def main():
+    global round_trip
+    manager_id, employee_id, ids = seed()
+    batches = [ids[i * OPERATIONS:(i + 1) * OPERATIONS] for i in range(4)]
+    for label, delay in (("SQLite, in process", 0.0), (f"{ROUND_TRIP_SECONDS * 1000:.1f} ms per round trip", ROUND_TRIP_SECONDS)):
+        round_trip = delay
+        print(f"{label}, {OPERATIONS} operations each")
+        # Edits first: they need the expenses still pending
+        for name, before, after, user_id in (
+            ("Edit title", edit_before, edit_after, employee_id),
+            ("Approve", approve_before, approve_after, manager_id),
+        ):
+            old_rate, old_statements = measure(before, user_id, batches[0] if name == "Edit title" else batches[1])
+            new_rate, new_statements = measure(after, user_id, batches[2] if name == "Edit title" else batches[3])
+            print(
+                f"  {name:<11} before {old_rate:7.0f} ops/s ({old_statements:.0f} statements)"
+                f"   after {new_rate:7.0f} ops/s ({new_statements:.0f} statement)   {new_rate / old_rate:.2f}x"
+            )
+        if delay == 0.0:
+            # Fresh pending expenses for the second pass
+            manager_id, employee_id, ids = seed()
+            batches = [ids[i * OPERATIONS:(i + 1) * OPERATIONS] for i in range(4)]
+    engine.dispose()
+    if os.path.exists("bench_write_path.db"):
+        os.remove("bench_write_path.db")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Password hash cost calibration
+Times a password verify on this machine for each cost of the chosen scheme and
+suggests the highest cost that stays under the target. Run it on production
+hardware and put the printed settings in the environment; existing hashes are
+rehashed at the new cost on each user's next login.
+
+Usage: python scripts/calibrate_password_hash.py [--scheme bcrypt|argon2] [--target-ms 250]
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "calibration-secret-key")
+
+from api.utils.auth import build_pwd_context
+
+PASSWORD = "correct horse battery staple"
+REPEAT = 5
+COSTS = {
+    "bcrypt": range(10, 16),
+    "argon2": range(1, 9),
+}
+
+
+def time_verify(scheme: str, cost: int, memory_kib: int, parallelism: int) -> float:
+    """Median ms for one verify at the given cost"""
+    context = build_pwd_context([scheme], cost, cost, memory_kib, parallelism)
+    hashed = context.hash(PASSWORD)
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        context.verify(PASSWORD, hashed)
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)[REPEAT // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scheme", choices=sorted(COSTS), default="bcrypt")
+    parser.add_argument("--target-ms", type=float, default=250)
+    parser.add_argument("--argon2-memory-kib", type=int, default=65536)
+    parser.add_argument("--argon2-parallelism", type=int, default=4)
+    args = parser.parse_args()
+
+    cost_name = "rounds (log2)" if args.scheme == "bcrypt" else "time cost"
+    print(f"{args.scheme} verify time per {cost_name}, target {args.target_ms:.0f} ms")
+    best = None
+    for cost in COSTS[args.scheme]:
+        elapsed = time_verify(args.scheme, cost, args.argon2_memory_kib, args.argon2_parallelism)
+        marker = "✓" if elapsed <= args.target_ms else " "
+        print(f"  {marker} {cost:>3}  {elapsed:8.1f} ms")
+        if elapsed > args.target_ms:
+            break
+        best = cost
+
+    if best is None:
+        print("✗ Even the lowest cost is over target; raise --target-ms or use faster hardware")
+        sys.exit(1)
+
+    print("\nSuggested settings:")
+    if args.scheme == "bcrypt":
+        print('  PASSWORD_SCHEMES=["bcrypt"]')
+        print(f"  BCRYPT_ROUNDS={best}")
+    else:
+        # Keep bcrypt in the list so existing hashes still verify and get migrated
+        print('  PASSWORD_SCHEMES=["argon2", "bcrypt"]')
+        print(f"  ARGON2_TIME_COST={best}")
+        print(f"  ARGON2_MEMORY_COST={args.argon2_memory_kib}")
+        print(f"  ARGON2_PARALLELISM={args.argon2_parallelism}")
+
+
+if __name__ == "__main__":
+    main()
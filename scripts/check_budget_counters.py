@@ -0,0 +1,107 @@
+"""
+Budget counter check
+Many clients submit expenses against one budget at once with BUDGET_ENFORCEMENT=reject;
+exactly as many as fit may be accepted. Then the accepted expenses are approved,
+rejected or deleted, and the counters must equal what summing the expenses gives.
+Exits 1 on failure. Uses a throwaway SQLite database and FastAPI's in-process test client.
+"""
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./check_budgets.db")
+os.environ.setdefault("SECRET_KEY", "budget-check-secret-key")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["LOAD_SHEDDING_ENABLED"] = "false"
+os.environ["BUDGET_ENFORCEMENT"] = "reject"
+os.environ["LOG_DIR"] = ""
+
+from sqlalchemy import func, select
+from fastapi.testclient import TestClient
+from api.main import app
+from api.database import engine, SessionLocal, Base
+from api.models import Company, User, Expense
+from api.models.user import UserRole
+from api.models.expense import ExpenseStatus
+from api.utils.auth import create_access_token, token_claims
+
+CLIENTS = 8
+SUBMISSIONS = 40
+BUDGET = Decimal("250.00")
+AMOUNT = Decimal("10.00")
+
+
+def seed() -> tuple[dict, dict]:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    company = Company(name="Check Corp")
+    db.add(company)
+    db.flush()
+    admin = User(email="admin@corp.test", hashed_password="x", full_name="Admin", role=UserRole.ADMIN, company_id=company.id)
+    db.add(admin)
+    db.flush()
+    employee = User(email="employee@corp.test", hashed_password="x", full_name="Employee", role=UserRole.EMPLOYEE, company_id=company.id, manager_id=admin.id)
+    db.add(employee)
+    db.commit()
+    headers = [{"Authorization": f"Bearer {create_access_token(token_claims(user))}"} for user in (admin, employee)]
+    db.close()
+    return headers[0], headers[1]
+
+
+def expense_totals() -> tuple[Decimal, Decimal]:
+    with engine.connect() as conn:
+        def total(status):
+            return conn.execute(select(func.coalesce(func.sum(Expense.amount), 0)).where(
+                Expense.status == status, Expense.deleted_at.is_(None)
+            )).scalar()
+        return Decimal(total(ExpenseStatus.PENDING)), Decimal(total(ExpenseStatus.APPROVED))
+
+
+def main():
+    admin, employee = seed()
+    failures = []
+    with TestClient(app) as client, ThreadPoolExecutor(CLIENTS) as pool:
+        client.post("/api/budgets/", json={"category": "travel", "amount": str(BUDGET)}, headers=admin)
+
+        def submit(n):
+            return client.post("/api/expenses/", json={"title": f"Taxi {n}", "amount": str(AMOUNT), "category": "travel"}, headers=employee)
+
+        responses = list(pool.map(submit, range(SUBMISSIONS)))
+        accepted = [response.json()["id"] for response in responses if response.status_code == 201]
+        refused = sum(response.status_code == 400 for response in responses)
+        if len(accepted) != int(BUDGET / AMOUNT) or len(accepted) + refused != SUBMISSIONS:
+            failures.append(f"{len(accepted)} accepted and {refused} refused, expected {int(BUDGET / AMOUNT)} accepted")
+
+        def decide(item):
+            index, expense_id = item
+            if index % 3 == 0:
+                return client.patch(f"/api/expenses/{expense_id}/status", json={"status": "approved"}, headers=admin)
+            if index % 3 == 1:
+                return client.patch(f"/api/expenses/{expense_id}/status", json={"status": "rejected"}, headers=admin)
+            return client.delete(f"/api/expenses/{expense_id}", headers=employee)
+
+        list(pool.map(decide, enumerate(accepted[:len(accepted) // 2 * 2])))
+        budget = client.get("/api/budgets/", headers=admin).json()[0]
+        pending, approved = expense_totals()
+        if (Decimal(budget["reserved"]), Decimal(budget["spent"])) != (pending, approved):
+            failures.append(
+                f"counters reserved {budget['reserved']} spent {budget['spent']}, "
+                f"expenses sum to pending {pending} approved {approved}"
+            )
+
+    engine.dispose()
+    if os.path.exists("check_budgets.db"):
+        os.remove("check_budgets.db")
+    if failures:
+        for failure in failures:
+            print(f"✗ {failure}")
+        sys.exit(1)
+    print(f"✓ {SUBMISSIONS} concurrent submissions against a {BUDGET} budget: {len(accepted)} accepted, counters match the expenses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Lost-update check for optimistic concurrency
+Several clients read the same pending expense, then all send an edit with the
+ETag they read (If-Match) at once. Exactly one edit may succeed per version; the
+rest must get 412. Then an owner edit races a manager approval without If-Match,
+and whichever succeeds must stick. Exits 1 on failure.
+Uses a throwaway SQLite database and FastAPI's in-process test client.
+"""
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./check_concurrency.db")
+os.environ.setdefault("SECRET_KEY", "concurrency-check-secret-key")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["LOAD_SHEDDING_ENABLED"] = "false"
+
+from fastapi.testclient import TestClient
+from api.main import app
+from api.database import engine, SessionLocal, Base
+from api.models import Company, User
+from api.models.user import UserRole
+from api.utils.auth import create_access_token, token_claims
+
+CLIENTS = 8
+ROUNDS = 20
+
+
+def seed() -> tuple[dict, dict]:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    company = Company(name="Check Corp")
+    db.add(company)
+    db.flush()
+    manager = User(email="manager@corp.test", hashed_password="x", full_name="Manager", role=UserRole.MANAGER, company_id=company.id)
+    db.add(manager)
+    db.flush()
+    employee = User(email="employee@corp.test", hashed_password="x", full_name="Employee", role=UserRole.EMPLOYEE, company_id=company.id, manager_id=manager.id)
+    db.add(employee)
+    db.commit()
+    headers = [{"Authorization": f"Bearer {create_access_token(token_claims(user))}"} for user in (employee, manager)]
+    db.close()
+    return headers[0], headers[1]
+
+
+def main():
+    employee, manager = seed()
+    failures = []
+    with TestClient(app) as client, ThreadPoolExecutor(CLIENTS) as pool:
+        for round_number in range(ROUNDS):
+            expense = client.post("/api/expenses/", json={"title": "Taxi", "amount": "20", "category": "travel"}, headers=employee).json()
+            path = f"/api/expenses/{expense['id']}"
+            etag = client.get(path, headers=employee).headers["etag"]
+
+            def edit(n):
+                return client.put(path, json={"title": f"Edit {n}"}, headers={**employee, "If-Match": etag})
+
+            codes = sorted(response.status_code for response in pool.map(edit, range(CLIENTS)))
+            if codes != [200] + [412] * (CLIENTS - 1):
+                failures.append(f"round {round_number}: conditional edits returned {codes}")
+
+            # Unconditional edit racing an approval: the edit must not undo the decision
+            race = [
+                pool.submit(client.put, path, json={"title": "Late edit"}, headers=employee),
+                pool.submit(client.patch, f"{path}/status", json={"status": "approved"}, headers=manager),
+            ]
+            edit_response, decision_response = (future.result() for future in race)
+            final = client.get(path, headers=employee).json()
+            if decision_response.status_code == 200 and final["status"] != "approved":
+                failures.append(f"round {round_number}: approval lost, final status {final['status']}")
+            if edit_response.status_code == 200 and final["title"] != "Late edit":
+                failures.append(f"round {round_number}: edit lost, final title {final['title']}")
+
+    engine.dispose()
+    if os.path.exists("check_concurrency.db"):
+        os.remove("check_concurrency.db")
+    if failures:
+        for failure in failures:
+            print(f"✗ {failure}")
+        sys.exit(1)
+    print(f"✓ {ROUNDS} rounds of {CLIENTS} concurrent conditional edits: one winner each, no lost updates")
+
+
+if __name__ == "__main__":
+    main()
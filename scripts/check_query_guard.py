@@ -0,0 +1,117 @@
+"""
+Statement timeout and disconnect cancellation check (api/middleware/query_guard.py)
+Mounts endpoints running a query that never ends on its own, then checks that one
+with a short route timeout fails fast with 503, that one with a long timeout is
+interrupted as soon as its client disconnects, and that connections are usable
+afterwards.
+Exits 1 on failure. Uses a throwaway SQLite database.
+"""
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./check_query_guard.db")
+os.environ.setdefault("SECRET_KEY", "query-guard-check-secret-key")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["LOAD_SHEDDING_ENABLED"] = "false"
+os.environ["LOG_DIR"] = ""
+# The long timeout only stops the abandoned query if cancellation fails
+os.environ["ROUTE_STATEMENT_TIMEOUTS_MS"] = '{"GET /api/check/timed": 200, "GET /api/check/abandoned": 5000}'
+
+import anyio
+from fastapi import Depends
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from api.main import app
+from api.database import engine, get_db, Base
+
+ENDLESS = text("WITH RECURSIVE r(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM r) SELECT count(*) FROM r")
+DISCONNECT_AFTER = 0.3
+
+
+@app.get("/api/check/timed")
+def timed(db: Session = Depends(get_db)):
+    return {"rows": db.execute(ENDLESS).scalar()}
+
+
+@app.get("/api/check/abandoned")
+def abandoned(db: Session = Depends(get_db)):
+    return {"rows": db.execute(ENDLESS).scalar()}
+
+
+@app.get("/api/check/quick")
+def quick(db: Session = Depends(get_db)):
+    return {"one": db.execute(text("SELECT 1")).scalar()}
+
+
+async def request_then_disconnect(path: str) -> tuple[int, float]:
+    """Call the app directly, as a server would, with a client leaving after DISCONNECT_AFTER"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"check")], "client": ("127.0.0.1", 1), "server": ("check", 80),
+    }
+    sent_request = False
+
+    async def receive():
+        nonlocal sent_request
+        if not sent_request:
+            sent_request = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await anyio.sleep(DISCONNECT_AFTER)
+        return {"type": "http.disconnect"}
+
+    status_code = None
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    return status_code, time.perf_counter() - started
+
+
+def main():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    failures = []
+
+    with TestClient(app) as client:
+        started = time.perf_counter()
+        response = client.get("/api/check/timed")
+        timed_out_after = time.perf_counter() - started
+        if response.status_code != 503 or timed_out_after > 2:
+            failures.append(
+                f"timed route returned {response.status_code} after {timed_out_after:.1f} s, expected 503 after ~0.2 s"
+            )
+
+    status_code, cancelled_after = anyio.run(request_then_disconnect, "/api/check/abandoned")
+    if status_code != 499 or cancelled_after > DISCONNECT_AFTER + 1:
+        failures.append(
+            f"abandoned request ended with {status_code} after {cancelled_after:.1f} s, "
+            f"expected 499 after ~{DISCONNECT_AFTER} s"
+        )
+
+    with TestClient(app) as client:
+        response = client.get("/api/check/quick")
+        if response.status_code != 200:
+            failures.append(f"follow-up query returned {response.status_code}")
+
+    engine.dispose()
+    if os.path.exists("check_query_guard.db"):
+        os.remove("check_query_guard.db")
+    if failures:
+        for failure in failures:
+            print(f"✗ {failure}")
+        sys.exit(1)
+    print(f"✓ Route timeout answered 503 after {timed_out_after:.1f} s, abandoned query stopped "
+          f"{cancelled_after - DISCONNECT_AFTER:.2f} s after the client left, connections reusable")
+
+
+if __name__ == "__main__":
+    main()
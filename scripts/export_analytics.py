@@ -0,0 +1,33 @@
+"""
+Export the expenses changed since the last run as partitioned Parquet (needs pyarrow)
+Writes under EXPORT_DIR/expenses (or the directory given as an argument); the first
+run exports everything. Cheap to run often, e.g. hourly from cron.
+"""
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from api.database import engine
+from api.services.analytics_export import export_expenses
+
+
+def main():
+    export_dir = sys.argv[1] if len(sys.argv) > 1 else None
+    
+    try:
+        start = time.perf_counter()
+        result = export_expenses(engine, export_dir)
+        print(
+            f"✓ Exported {result.rows} changed expenses ({result.tombstones} tombstones) to {result.files} files "
+            f"up to {result.watermark.isoformat()} in {time.perf_counter() - start:.1f} s"
+        )
+    except Exception as e:
+        print(f"✗ Analytics export failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Generate the expenses of recurring templates that are due
+Run daily (e.g. from cron). Creates every occurrence due up to today, or up to the
+ISO date given as an argument, including occurrences missed while the job did not
+run. Safe to rerun or to run twice at once: occurrences are never duplicated.
+"""
+import sys
+import os
+import time
+from datetime import date
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from api.database import SessionLocal
+from api.services.recurring import generate_recurring_expenses
+
+
+def main():
+    today = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None
+    db = SessionLocal()
+    
+    try:
+        start = time.perf_counter()
+        created = generate_recurring_expenses(db, today)
+        print(f"✓ Generated {created} recurring expenses in {time.perf_counter() - start:.1f} s")
+    except Exception as e:
+        db.rollback()
+        print(f"✗ Recurring expense generation failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Render the monthly company and manager reports under REPORTS_DIR
+Months whose expenses have not changed since the last run are skipped, so this is
+cheap to run often (e.g. every 15 minutes from cron).
+
+Usage: python scripts/generate_reports.py [2026-09 2026-10 ...] [--company 3] [--force]
+Without months, the current and the previous month are rendered.
+"""
+import argparse
+import sys
+import os
+import time
+from datetime import date
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from api.services.reports import generate_monthly_reports, parse_month
+
+
+def default_months() -> list[date]:
+    this_month = date.today().replace(day=1)
+    previous = date(this_month.year - (this_month.month == 1), (this_month.month - 2) % 12 + 1, 1)
+    return [previous, this_month]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("months", nargs="*", type=parse_month)
+    parser.add_argument("--company", type=int, action="append", dest="companies")
+    parser.add_argument("--force", action="store_true", help="Render even if nothing changed")
+    args = parser.parse_args()
+    
+    try:
+        start = time.perf_counter()
+        generated, unchanged = generate_monthly_reports(args.months or default_months(), args.companies, args.force)
+        print(f"✓ {generated} company-months rendered, {unchanged} unchanged ({time.perf_counter() - start:.1f} s)")
+    except Exception as e:
+        print(f"✗ Report generation failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Partition the expenses table by company (PostgreSQL only)
+Uses EXPENSE_HASH_PARTITIONS and EXPENSE_DEDICATED_PARTITIONS from settings;
+pass company ids as arguments to give those tenants a dedicated partition later on
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import inspect
+from api.config import settings
+from api.database import engine
+from api.services.partitioning import partition_expenses_by_company, add_company_partition
+
+
+def main():
+    company_ids = [int(arg) for arg in sys.argv[1:]]
+    
+    try:
+        if company_ids:
+            for company_id in company_ids:
+                add_company_partition(engine, company_id)
+                print(f"✓ Company {company_id} moved to its own partition")
+            return
+        
+        if settings.EXPENSE_HASH_PARTITIONS < 1:
+            print("✗ Set EXPENSE_HASH_PARTITIONS to the number of hash partitions first")
+            sys.exit(1)
+        
+        partition_expenses_by_company(
+            engine,
+            settings.EXPENSE_HASH_PARTITIONS,
+            settings.EXPENSE_DEDICATED_PARTITIONS,
+        )
+        partitions = [name for name in inspect(engine).get_table_names() if name.startswith("expenses_")]
+        print(f"✓ expenses partitioned: {', '.join(sorted(partitions))}")
+    except Exception as e:
+        print(f"✗ Partitioning failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
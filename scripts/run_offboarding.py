@@ -0,0 +1,27 @@
+"""
+Run or resume offboarding jobs
+Picks up jobs left pending or running (e.g. the server restarted mid-purge); pass
+--failed to retry failed jobs too. Batches already done are not repeated.
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from api.database import engine
+from api.models.offboarding_job import OffboardingStatus
+from api.services.offboarding import run_pending_offboarding
+
+
+def main():
+    results = run_pending_offboarding(engine, include_failed="--failed" in sys.argv[1:])
+    failed = [job_id for job_id, status in results if status == OffboardingStatus.FAILED]
+    print(f"✓ Ran {len(results) - len(failed)} offboarding jobs")
+    if failed:
+        print(f"✗ Failed: {', '.join(map(str, failed))}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+Re-run the expense policy checks over historical data (needs numpy)
+Rewrites policy_violations for every live expense, or for one company when its id
+is given as an argument. Run after changing the POLICY_* settings.
+"""
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from api.database import engine
+from api.services.policy_checks import scan_policy_violations
+
+
+def main():
+    company_id = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    
+    try:
+        start = time.perf_counter()
+        found = scan_policy_violations(engine, company_id)
+        print(f"✓ {found} policy violations recorded in {time.perf_counter() - start:.1f} s")
+    except Exception as e:
+        print(f"✗ Policy scan failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()